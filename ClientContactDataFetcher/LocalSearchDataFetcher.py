@@ -1,7 +1,6 @@
 from playwright.sync_api import sync_playwright
 from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
 from bs4 import BeautifulSoup
-import csv
 import sys
 import argparse
 import json
@@ -11,6 +10,19 @@ import time
 from dotenv import load_dotenv
 from openai import OpenAI
 
+try:
+    from ClientContactDataFetcher.business_keys import is_new_or_changed
+    from ClientContactDataFetcher.business_record import BusinessRecord
+    from ClientContactDataFetcher.lead_merge import normalise_lead, merge_leads
+    from ClientContactDataFetcher.lead_store import LeadStore
+    from ClientContactDataFetcher.stage_timer import stage
+except ImportError:  # Run as a script from this directory
+    from business_keys import is_new_or_changed
+    from business_record import BusinessRecord
+    from lead_merge import normalise_lead, merge_leads
+    from lead_store import LeadStore
+    from stage_timer import stage
+
 def extract_page_num(url):
     parsed_url = urlparse(url)
     query_params = parse_qs(parsed_url.query)
@@ -38,15 +50,16 @@ def extract_json_ld_biz_data(soup):
                 state = address.get("addressRegion", "")
                 postcode = address.get("postalCode", "")
 
-                businesses.append({
-                    "name": name,
-                    "phone": phone,
-                    "url": url,
-                    "street": street,
-                    "suburb": suburb,
-                    "state": state,
-                    "postcode": postcode,
-                })
+                businesses.append(BusinessRecord(
+                    name=name,
+                    phone=phone,
+                    url=url,
+                    street=street,
+                    suburb=suburb,
+                    state=state,
+                    postcode=postcode,
+                    sources=["localsearch"],
+                ))
 
         except json.JSONDecodeError:
             continue
@@ -91,8 +104,10 @@ def create_playwright_page():
 def get_soup_page_with_numbers(page, url, attempt=1, max_attempts=2):
     original_page_num = extract_page_num(url)
 
-    page.goto(url)
-    page.wait_for_load_state("networkidle")
+    with stage('goto'):
+        page.goto(url)
+    with stage('load'):
+        page.wait_for_load_state("networkidle")
 
     final_url = page.url
     final_page_num = extract_page_num(final_url)
@@ -125,16 +140,19 @@ def get_soup_page_with_numbers(page, url, attempt=1, max_attempts=2):
             return None
 
     try:
-        page.wait_for_selector('[data-profileid]', timeout=10000)
+        with stage('wait'):
+            page.wait_for_selector('[data-profileid]', timeout=10000)
     except:
         print("⚠️ Warning: Couldn't find '[data-profileid]'")
         return None
 
     # Scroll to bottom to load lazy content
-    page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
-    page.wait_for_timeout(5000)
+    with stage('scroll'):
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight);")
+        page.wait_for_timeout(5000)
 
-    return BeautifulSoup(page.content(), 'html.parser')
+    with stage('parse'):
+        return BeautifulSoup(page.content(), 'html.parser')
 
 # Helper function to classify a business via DeepSeek
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
@@ -197,7 +215,36 @@ def batch_classify_businesses(businesses):
         raise RuntimeError(f"Failed to parse categories JSON: {e}\nContent: {content}")
     return categories
 
-def search_businesses(what, where, state, callback=None):
+def classify_businesses(businesses):
+    """Set 'category' on each business, in one batch call when there are many."""
+    # Batch classify when many entries for speed, else fallback to individual
+    if len(businesses) > 5:
+        print(f"Attempting batch classification for {len(businesses)} businesses...")
+        try:
+            cats = batch_classify_businesses(businesses)
+            print("Batch classification succeeded.")
+            for biz, cat in zip(businesses, cats):
+                biz['category'] = cat
+        except Exception as e:
+            print(f"Batch classification failed ({e}), falling back to individual calls.")
+            for biz in businesses:
+                info = ",".join([biz.get(k, '') for k in ['name','phone','url','street','suburb','state','postcode']])
+                try:
+                    biz['category'] = classify_business(info)
+                except Exception as err:
+                    print(f"Individual classify error: {err}")
+                    biz['category'] = 'Uncategorized'
+    else:
+        print(f"Using individual classification for {len(businesses)} businesses.")
+        for biz in businesses:
+            info = ",".join([biz.get(k, '') for k in ['name','phone','url','street','suburb','state','postcode']])
+            try:
+                biz['category'] = classify_business(info)
+            except Exception as err:
+                print(f"Individual classify error: {err}")
+                biz['category'] = 'Uncategorized'
+
+def search_businesses(what, where, state, callback=None, known=None, known_pages_to_stop=1):
     """
     Search for businesses and return the results.
     
@@ -207,9 +254,14 @@ def search_businesses(what, where, state, callback=None):
         state: State abbreviation (e.g., 'qld')
         callback: Optional callback function to report progress
                   callback(progress_pct, status_message, businesses_found_so_far)
+        known: Optional dict of business key -> fingerprint (see business_keys)
+               for businesses already stored. When given, only new or changed
+               businesses are classified and returned.
+        known_pages_to_stop: With `known`, stop after this many consecutive
+                             pages holding only known, unchanged businesses
     
     Returns:
-        A list of dictionaries containing business information
+        A list of BusinessRecords (see business_record)
     """
     base_url = f'https://www.localsearch.com.au/find/{what}/{where}-{state}'
     print("Starting URL: " + base_url)
@@ -219,6 +271,7 @@ def search_businesses(what, where, state, callback=None):
     
     try:
         page_num = 1
+        known_pages = 0
         
         while True:
             # Create URL with page number
@@ -238,43 +291,35 @@ def search_businesses(what, where, state, callback=None):
                 break
                 
             # Use the function to extract JSON-LD business data
-            businesses = extract_json_ld_biz_data(page_soup)
+            with stage('extract'):
+                businesses = extract_json_ld_biz_data(page_soup)
             print(f"Found {len(businesses)} businesses on page {page_num}")
             
             if len(businesses) == 0:
                 break
+            
+            if known is not None:
+                # Incremental crawl: keep only businesses that are new or changed
+                businesses = [biz for biz in businesses if is_new_or_changed(biz, known)]
+                print(f"{len(businesses)} new or changed businesses on page {page_num}")
+                known_pages = known_pages + 1 if not businesses else 0
+                if known_pages >= known_pages_to_stop:
+                    print(f"Only known businesses on the last {known_pages} page(s), stopping")
+                    break
                 
             all_businesses.extend(businesses)
             page_num += 1
             
+        # Collapse repeated listings of the same business before paying to classify them
+        merged = merge_leads([normalise_lead(biz, 'localsearch') for biz in all_businesses])
+        if len(merged) < len(all_businesses):
+            print(f"Merged {len(all_businesses) - len(merged)} duplicate listings")
+        all_businesses = merged
+            
         # Sort businesses by phone number for consistency
         all_businesses = sorted(all_businesses, key=lambda x: x["phone"])
-        # Batch classify when many entries for speed, else fallback to individual
-        if len(all_businesses) > 5:
-            print(f"Attempting batch classification for {len(all_businesses)} businesses...")
-            try:
-                cats = batch_classify_businesses(all_businesses)
-                print("Batch classification succeeded.")
-                for biz, cat in zip(all_businesses, cats):
-                    biz['category'] = cat
-            except Exception as e:
-                print(f"Batch classification failed ({e}), falling back to individual calls.")
-                for biz in all_businesses:
-                    info = ",".join([biz.get(k, '') for k in ['name','phone','url','street','suburb','state','postcode']])
-                    try:
-                        biz['category'] = classify_business(info)
-                    except Exception as err:
-                        print(f"Individual classify error: {err}")
-                        biz['category'] = 'Uncategorized'
-        else:
-            print(f"Using individual classification for {len(all_businesses)} businesses.")
-            for biz in all_businesses:
-                info = ",".join([biz.get(k, '') for k in ['name','phone','url','street','suburb','state','postcode']])
-                try:
-                    biz['category'] = classify_business(info)
-                except Exception as err:
-                    print(f"Individual classify error: {err}")
-                    biz['category'] = 'Uncategorized'
+        with stage('classify'):
+            classify_businesses(all_businesses)
         
         if callback:
             callback(100, f"Completed search for {what} in {where}, {state}. Found {len(all_businesses)} businesses.", all_businesses)
@@ -285,39 +330,34 @@ def search_businesses(what, where, state, callback=None):
         browser.close()
         playwright.stop()
 
-def save_to_csv(businesses, what, where):
-    """Save business data to CSV file"""
-    # Ensure directories exist
-    data_dir = "../ClientContactData"
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
-        
-    file_name = f"{data_dir}/{where}_{what}_data.csv"
-    
-    with open(file_name, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=["name", "phone", "url", "street", "suburb", "state", "postcode"])
-        writer.writeheader()
-        writer.writerows(businesses)
-        
-    print(f"Saved {len(businesses)} businesses to {file_name}")
-    return file_name
+def save_leads(businesses, what, where):
+    """Record business data in the consolidated lead store"""
+    store = LeadStore()
+    added = store.add_leads(businesses, 'localsearch', what, where)
+    print(f"Saved {added} new or changed of {len(businesses)} businesses to {store.path}")
+    return added
 
-def main(what, where, state, save_results=True, callback=None):
+def main(what, where, state, save_results=True, callback=None, known=None):
     """
-    Main function to search for businesses and optionally save to CSV.
+    Main function to search for businesses and optionally save them to the lead store.
     
     Args:
         what: Type of business to search (e.g., 'plumber')
         where: Location to search in (e.g., 'bungalow')
         state: State abbreviation (e.g., 'qld')
-        save_results: Whether to save results to CSV (default: True)
+        save_results: Whether to save results to the lead store (default: True)
         callback: Optional callback function to report progress
+        known: Optional dict of business key -> fingerprint; only new or changed
+               businesses are classified and returned
     
     Returns:
-        tuple: (list of business dictionaries, csv_path if saved or None)
+        list: BusinessRecords
     """
     # Run the search
-    businesses = search_businesses(what, where, state, callback)
+    businesses = search_businesses(what, where, state, callback, known)
+
+    if save_results:
+        save_leads(businesses, what, where)
     
     return businesses
 
@@ -326,12 +366,12 @@ if __name__ == "__main__":
     parser.add_argument("what", type=str, help="The type of business (e.g., 'plumber')")
     parser.add_argument("where", type=str, help="The location to search in (e.g., 'bungalow')")
     parser.add_argument("state", type=str, help="The state to search in (e.g., 'qld')")
-    parser.add_argument("--no-save", action="store_true", help="Don't save to CSV, just print results")
+    parser.add_argument("--no-save", action="store_true", help="Don't save to the lead store, just print results")
     
     args = parser.parse_args()
 
     # Use the main function
-    businesses, csv_path = main(args.what, args.where, args.state, not args.no_save)
+    businesses = main(args.what, args.where, args.state, not args.no_save)
     
     # Print output if --no-save flag is used
     if args.no_save:
@@ -1,10 +1,14 @@
 import time
 import requests
-import csv
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from playwright.sync_api import sync_playwright
 
+try:
+    from ClientContactDataFetcher.lead_store import LeadStore
+except ImportError:  # Run as a script from this directory
+    from lead_store import LeadStore
+
 h = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
                   "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -14,15 +18,15 @@ h = {
     "Connection": "keep-alive"
 }
 
-def write_agent_info_list_to_csv(agent_info_list, area_name):
-    file_name = f"{area_name}_realestate_data.csv"
-    with open(file_name, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        # Write header
-        writer.writerow(["Phone Number", "Agent Name", "Agency Description"])
-        # Write each agent's info
-        for agent_info in agent_info_list:
-            writer.writerow(agent_info)
+def save_agent_info_list(agent_info_list, area_name):
+    # Same columns as the legacy {area}_realestate_data.csv files
+    agents = [
+        {"Phone Number": phone, "Agent Name": name, "Agency Description": description}
+        for phone, name, description in agent_info_list
+    ]
+    store = LeadStore()
+    added = store.add_leads(agents, 'domain', 'realestate', area_name)
+    print(f"Saved {added} new or changed of {len(agents)} agents to {store.path}")
 
 def get_soup_page(url, headers=h, parser="html.parser"):
     time.sleep(1)
@@ -145,7 +149,7 @@ def get_all_agent_info_by_area(area):
         browser.close()
         playwright.stop()
 
-    write_agent_info_list_to_csv(agent_data_store, area)
+    save_agent_info_list(agent_data_store, area)
 
 if __name__ == '__main__':
     get_all_agent_info_by_area('cairns-qld-4870')
@@ -1,5 +1,6 @@
 from ClientContactDataFetcher.LocalSearchDataFetcher import classify_business
 from ClientContactDataFetcher.LocalSearchDataFetcher import create_playwright_page
+from ClientContactDataFetcher.lead_store import LeadStore
 from bs4 import BeautifulSoup
 import re
 
@@ -33,12 +34,13 @@ def scrape_yellowpages(what, where, state):
     soup = BeautifulSoup(html, 'html.parser')
 
     # Iterate each listing container to correctly pair name/info with its phone
-    containers = soup.findall('div', class_='Box__Div-sc-dws99b-0 dAyAhR')
+    containers = soup.find_all('div', class_='Box__Div-sc-dws99b-0 dAyAhR')
     businesses = []
     
     # Clean up Playwright resources and return
     browser.close()
     playwright.stop()
+    LeadStore().add_leads(businesses, 'yellowpages', what, where)
     return businesses
 
 if __name__ == "__main__":
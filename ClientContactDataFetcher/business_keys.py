@@ -0,0 +1,56 @@
+import hashlib
+
+try:
+    from ClientContactDataFetcher.phone_numbers import to_e164
+except ImportError:  # Run as a script from this directory
+    from phone_numbers import to_e164
+
+# Fields that make up a listing; a change in any of them means the stored copy is stale
+FINGERPRINT_FIELDS = ['name', 'phone', 'url', 'street', 'suburb', 'state', 'postcode']
+
+def _clean(value):
+    value = ' '.join(str(value or '').split()).lower()
+    return '' if value == 'n/a' else value
+
+def business_keys(business):
+    """
+    Identity keys for a scraped business, strongest first.
+
+    The LocalSearch profile URL identifies a listing even if its phone changes;
+    the E.164 phone identifies it when there is no URL.
+
+    Args:
+        business: Business dictionary (name, phone, url, ...)
+
+    Returns:
+        list: Keys such as "url:https://..." and "phone:+61..." (may be empty)
+    """
+    keys = []
+    url = _clean(business.get('url')).rstrip('/')
+    if url:
+        keys.append('url:' + url)
+    phone = to_e164(business.get('phone')) if _clean(business.get('phone')) else None
+    if phone:
+        keys.append('phone:' + phone)
+    return keys
+
+def business_fingerprint(business):
+    """Short hash of a business's listing fields, ignoring case and spacing."""
+    raw = '\x1f'.join(_clean(business.get(field)) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def is_new_or_changed(business, known):
+    """
+    Whether a scraped business is missing from, or differs from, the stored copy.
+
+    Args:
+        business: Business dictionary
+        known: Dict of business key -> fingerprint for stored businesses
+
+    Returns:
+        bool: True if no key matches, or the first matching key's fingerprint differs
+    """
+    for key in business_keys(business):
+        if key in known:
+            return known[key] != business_fingerprint(business)
+    return True
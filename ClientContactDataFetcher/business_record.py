@@ -0,0 +1,158 @@
+import sys
+
+# Fields of a business record; the same as lead_merge.LEAD_FIELDS
+FIELDS = ('name', 'phone', 'phone_e164', 'url', 'website', 'street', 'suburb', 'state',
+          'postcode', 'description', 'category', 'sources')
+
+# Low-cardinality fields whose values are shared between records
+_INTERNED = frozenset(('suburb', 'state', 'postcode', 'category'))
+
+class BusinessRecord:
+    """
+    Compact business record passed between the fetchers, the scrape pool and the importers.
+
+    Fields are slots rather than dict keys, and suburb, state, postcode and
+    category values are interned, so a crawl of a few thousand listings holds
+    one copy of "QLD" and "Trades & Maintenance". Records read like dicts
+    (record['name'], record.get('url', ''), 'category' in record, dict(record))
+    so code written for the plain dicts the fetchers used to return keeps
+    working. Convert with to_dict() at the API and JSON boundary.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, name='', phone='', phone_e164=None, url='', website='', street='', suburb='',
+                 state='', postcode='', description='', category='', sources=()):
+        self.name = name
+        self.phone = phone
+        self.phone_e164 = phone_e164
+        self.url = url
+        self.website = website
+        self.street = street
+        self.suburb = _intern(suburb)
+        self.state = _intern(state)
+        self.postcode = _intern(postcode)
+        self.description = description
+        self.category = _intern(category)
+        self.sources = tuple(_intern(source) for source in sources)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record from a business dictionary; unknown keys are ignored."""
+        if isinstance(data, cls):
+            return data
+        return cls(**{field: data[field] for field in FIELDS if data.get(field) is not None})
+
+    def to_dict(self):
+        """Plain dictionary for JSON responses and CSV writers."""
+        data = {field: getattr(self, field) for field in FIELDS}
+        data['sources'] = list(self.sources)
+        return data
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in FIELDS:
+            raise KeyError(key)
+        if key == 'sources':
+            value = tuple(_intern(source) for source in value)
+        elif key in _INTERNED:
+            value = _intern(value)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in FIELDS
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __eq__(self, other):
+        if isinstance(other, BusinessRecord):
+            return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"BusinessRecord(name={self.name!r}, phone={self.phone!r}, suburb={self.suburb!r})"
+
+    def get(self, key, default=None):
+        if key not in FIELDS:
+            return default
+        return getattr(self, key)
+
+    def keys(self):
+        return FIELDS
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in FIELDS]
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+def to_dicts(businesses):
+    """Plain dictionaries for a list of records or dictionaries, e.g. before json.dumps."""
+    return [business.to_dict() if isinstance(business, BusinessRecord) else dict(business)
+            for business in businesses]
+
+def to_records(businesses):
+    """Records for a list of dictionaries or records, e.g. after json.loads."""
+    return [BusinessRecord.from_dict(business) for business in businesses]
+
+if __name__ == '__main__':
+    # Memory benchmark: records vs the plain dicts the fetchers used to build
+    # (extract_json_ld_biz_data's seven address keys plus the classifier's
+    # category), from the legacy CSVs repeated up to the requested size. The
+    # records also hold phone_e164, website, description and sources.
+    # Usage: python business_record.py [count] [csv_dir]
+    import os
+    import csv
+    import gc
+    import pickle
+    import tracemalloc
+
+    try:
+        from ClientContactDataFetcher.lead_merge import normalise_lead
+    except ImportError:  # Run as a script from this directory
+        from lead_merge import normalise_lead
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    csv_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ClientContactData'
+    )
+    rows = []
+    for file_name in sorted(os.listdir(csv_dir)):
+        if file_name.endswith('.csv'):
+            with open(os.path.join(csv_dir, file_name), encoding='utf-8') as f:
+                rows.extend(csv.DictReader(f))
+    for index, row in enumerate(rows):
+        row['category'] = ['Trades & Maintenance', 'Building & Renovation', 'Cleaning Services'][index % 3]
+
+    def measure(build):
+        gc.collect()
+        tracemalloc.start()
+        # Fresh string copies per row, as a crawl parsing JSON-LD page by page would have
+        built = [build({key: ''.join(value) for key, value in rows[i % len(rows)].items()})
+                 for i in range(count)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return built, size
+
+    def as_fetcher_dict(row):
+        # Own key table, nothing interned
+        lead = normalise_lead(row, 'localsearch')
+        return {field: ''.join(list(lead[field]))
+                for field in ('name', 'phone', 'url', 'street', 'suburb', 'state', 'postcode', 'category')}
+
+    dicts, dict_bytes = measure(as_fetcher_dict)
+    records, record_bytes = measure(lambda row: normalise_lead(row, 'localsearch'))
+    print(f"{count} businesses from {len(rows)} CSV rows")
+    print(f"dicts:   {dict_bytes / 1e6:8.1f} MB  {dict_bytes / count:6.0f} B each  "
+          f"pickled {len(pickle.dumps(dicts)) / 1e6:.1f} MB")
+    print(f"records: {record_bytes / 1e6:8.1f} MB  {record_bytes / count:6.0f} B each  "
+          f"pickled {len(pickle.dumps(records)) / 1e6:.1f} MB")
+    print(f"saved:   {(1 - record_bytes / dict_bytes) * 100:.0f}%")
@@ -0,0 +1,176 @@
+import re
+from urllib.parse import urlparse
+
+try:
+    from ClientContactDataFetcher.phone_numbers import to_e164
+    from ClientContactDataFetcher.business_record import BusinessRecord, FIELDS
+except ImportError:  # Run as a script from this directory
+    from phone_numbers import to_e164
+    from business_record import BusinessRecord, FIELDS
+
+# Fields of a normalised lead, whatever source it came from
+LEAD_FIELDS = list(FIELDS)
+
+# When merged leads disagree, values from earlier sources win
+SOURCE_PRIORITY = ['localsearch', 'yellowpages', 'domain']
+
+# Column names used by each fetcher's records and CSVs -> lead field
+FIELD_ALIASES = {
+    'name': ['name', 'business_name', 'Agent Name'],
+    'phone': ['phone', 'business_phone', 'telephone', 'Phone Number'],
+    'url': ['url', 'profile_url'],
+    'website': ['website'],
+    'street': ['street'],
+    'suburb': ['suburb'],
+    'state': ['state'],
+    'postcode': ['postcode'],
+    'description': ['description', 'Agency Description'],
+    'category': ['category', 'job_type'],
+}
+
+# Listing sites: a URL on these is a directory profile, not the business's own website
+DIRECTORY_DOMAINS = ('localsearch.com.au', 'yellowpages.com.au', 'domain.com.au', 'realestate.com.au',
+                     'facebook.com', 'instagram.com', 'linkedin.com')
+
+# Words dropped from names before fuzzy matching ("Copeys Plumbing Pty Ltd" == "COPEYS PLUMBING")
+NAME_STOPWORDS = {'pty', 'ltd', 'limited', 'the', 'and', 'co', 'company', 'group', 'services',
+                  'service', 'au', 'australia'}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+def _value(value):
+    value = str(value or '').strip()
+    return '' if value.upper() == 'N/A' else value
+
+def normalise_lead(record, source):
+    """
+    Map a record from any fetcher into the common lead schema.
+
+    Args:
+        record: Business dictionary or CSV row from a fetcher
+        source: Fetcher it came from: 'localsearch', 'yellowpages' or 'domain'
+
+    Returns:
+        BusinessRecord: Lead with every LEAD_FIELDS field
+    """
+    lead = {}
+    for field, aliases in FIELD_ALIASES.items():
+        lead[field] = next((_value(record[alias]) for alias in aliases if _value(record.get(alias))), '')
+
+    # Domain agent phones are scraped from tel: links
+    if lead['phone'].startswith('tel:'):
+        lead['phone'] = lead['phone'][4:]
+    lead['phone_e164'] = to_e164(lead['phone'])
+    if not lead['phone']:
+        # Keep the "N/A" placeholder; stored jobs are keyed on the phone as scraped
+        lead['phone'] = next((str(record[alias]).strip() for alias in FIELD_ALIASES['phone'] if record.get(alias)), '')
+    lead['sources'] = record.get('sources') or [source]
+    return BusinessRecord(**lead)
+
+def website_domain(url):
+    """The business's own domain from a URL, or None for directory profiles and bad URLs."""
+    url = _value(url)
+    if not url:
+        return None
+    if '://' not in url:
+        url = 'http://' + url
+    domain = (urlparse(url).hostname or '').lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    if not domain or '.' not in domain or any(
+        domain == directory or domain.endswith('.' + directory) for directory in DIRECTORY_DOMAINS
+    ):
+        return None
+    return domain
+
+def fuzzy_name_key(name):
+    """Name reduced to lower-case words without punctuation, legal suffixes or filler words."""
+    words = _NON_ALNUM.sub(' ', _value(name).lower().replace('&', ' and ')).split()
+    key = ''.join(word for word in words if word not in NAME_STOPWORDS)
+    return key or None
+
+def _location(lead):
+    return (lead.get('postcode') or lead.get('suburb') or '').strip().lower()
+
+def _merge_group(leads):
+    leads = sorted(leads, key=lambda lead: min(
+        (SOURCE_PRIORITY.index(s) if s in SOURCE_PRIORITY else len(SOURCE_PRIORITY)) for s in lead['sources']
+    ))
+    merged = {}
+    for field in LEAD_FIELDS:
+        if field == 'sources':
+            merged[field] = list(dict.fromkeys(s for lead in leads for s in lead['sources']))
+        else:
+            merged[field] = next((lead[field] for lead in leads if lead.get(field)), '')
+    if not merged['website']:
+        # A lead's url may itself be the business website (e.g. from YellowPages)
+        merged['website'] = next((lead['url'] for lead in leads if website_domain(lead['url'])), '')
+    return BusinessRecord(**merged)
+
+def merge_leads(leads):
+    """
+    Collapse leads that are the same business, within or across sources.
+
+    Leads are the same business if they share an E.164 phone. Leads sharing a
+    website domain, or a fuzzy name key with no conflicting location (postcode
+    or suburb), are the same business unless both have phones that differ:
+    franchise operators share a name and website but not a number. Matches are
+    transitive. Each group is merged field by field, preferring sources in
+    SOURCE_PRIORITY order.
+
+    Args:
+        leads: Normalised leads (see normalise_lead)
+
+    Returns:
+        list: Merged BusinessRecords, in order of each business's first appearance
+    """
+    parent = list(range(len(leads)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(a, b):
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def same_phone_or_missing(a, b):
+        phone_a, phone_b = leads[a].get('phone_e164'), leads[b].get('phone_e164')
+        return not phone_a or not phone_b or phone_a == phone_b
+
+    by_phone = {}
+    by_domain = {}  # website domain -> [index]
+    by_name = {}  # fuzzy name key -> [index]
+    for index, lead in enumerate(leads):
+        phone = lead.get('phone_e164')
+        if phone:
+            union(by_phone.setdefault(phone, index), index)
+
+        domains = {website_domain(lead.get('website')), website_domain(lead.get('url'))} - {None}
+        for domain in domains:
+            candidates = by_domain.setdefault(domain, [])
+            for other in candidates:
+                if same_phone_or_missing(other, index):
+                    union(other, index)
+                    break
+            candidates.append(index)
+
+        name_key = fuzzy_name_key(lead.get('name'))
+        if name_key:
+            location = _location(lead)
+            candidates = by_name.setdefault(name_key, [])
+            for other in candidates:
+                other_location = _location(leads[other])
+                if (not location or not other_location or location == other_location) \
+                        and same_phone_or_missing(other, index):
+                    union(other, index)
+                    break
+            candidates.append(index)
+
+    groups = {}
+    for index, lead in enumerate(leads):
+        groups.setdefault(find(index), []).append(lead)
+    return [_merge_group(group) for group in groups.values()]
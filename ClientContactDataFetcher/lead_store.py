@@ -0,0 +1,266 @@
+import os
+import csv
+import sys
+import sqlite3
+import hashlib
+import argparse
+from datetime import datetime
+
+try:
+    from ClientContactDataFetcher.lead_merge import normalise_lead, merge_leads
+    from ClientContactDataFetcher.business_keys import business_keys
+    from ClientContactDataFetcher.business_record import to_dicts
+except ImportError:  # Run as a script from this directory
+    from lead_merge import normalise_lead, merge_leads
+    from business_keys import business_keys
+    from business_record import to_dicts
+
+# One store for every fetcher, next to the legacy CSVs
+DEFAULT_PATH = os.getenv('LEAD_STORE_PATH', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ClientContactData', 'leads.db'
+))
+
+# Columns written by export_csv, in the LocalSearch CSV layout plus category
+EXPORT_FIELDS = ['name', 'phone', 'url', 'street', 'suburb', 'state', 'postcode', 'category']
+
+# Fields that make an observation distinct; re-seeing an identical listing in the same search adds no row
+_OBSERVATION_FIELDS = ['source', 'search_what', 'search_where', 'name', 'phone', 'url', 'website', 'street',
+                       'suburb', 'state', 'postcode', 'description', 'category']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lead (
+    id INTEGER PRIMARY KEY,
+    business_key TEXT NOT NULL,
+    fingerprint TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    search_what TEXT COLLATE NOCASE,
+    search_where TEXT COLLATE NOCASE,
+    name TEXT NOT NULL,
+    phone TEXT,
+    phone_e164 TEXT,
+    url TEXT,
+    website TEXT,
+    street TEXT,
+    suburb TEXT COLLATE NOCASE,
+    state TEXT COLLATE NOCASE,
+    postcode TEXT,
+    description TEXT,
+    category TEXT COLLATE NOCASE,
+    seen_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_lead_phone_e164 ON lead (phone_e164);
+CREATE INDEX IF NOT EXISTS ix_lead_suburb ON lead (suburb);
+CREATE INDEX IF NOT EXISTS ix_lead_postcode ON lead (postcode);
+CREATE INDEX IF NOT EXISTS ix_lead_category ON lead (category);
+CREATE INDEX IF NOT EXISTS ix_lead_search_what ON lead (search_what);
+CREATE INDEX IF NOT EXISTS ix_lead_business_key ON lead (business_key, id);
+"""
+
+def _business_key(lead):
+    keys = business_keys(lead)
+    return keys[0] if keys else 'name:' + ' '.join(lead['name'].lower().split())
+
+def _fingerprint(lead, source, what, where):
+    observation = dict(lead.items(), source=source, search_what=what, search_where=where)
+    raw = '\x1f'.join(str(observation.get(field) or '').strip().lower() for field in _OBSERVATION_FIELDS)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _prefix_pattern(value):
+    # LIKE prefix pattern; NOCASE columns let SQLite answer it from the index
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def csv_source(fieldnames):
+    """Fetcher that wrote a legacy CSV, from its header."""
+    if 'Agent Name' in (fieldnames or []):
+        return 'domain'  # RealestateContactDataFetcher: Phone Number, Agent Name, Agency Description
+    return 'localsearch'
+
+def csv_search(csv_file):
+    """
+    (what, where) searched to produce a legacy CSV, from its file name.
+
+    LocalSearch files are named {where}_{what}_data.csv and Domain files
+    {area}_realestate_data.csv.
+    """
+    stem = os.path.basename(csv_file)
+    if stem.lower().endswith('_data.csv'):
+        stem = stem[:-len('_data.csv')]
+    where, _, what = stem.partition('_')
+    return what or None, where or None
+
+class LeadStore:
+    """
+    Append-only SQLite store of every lead any fetcher has found.
+
+    Each distinct observation of a listing is one row; seeing an identical
+    listing again adds nothing, and a changed listing adds a new row, so the
+    history is kept. Queries return the latest row for each business.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Scrape processes write concurrently: WAL lets readers continue and
+        # the busy timeout makes writers queue instead of failing
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        return conn
+
+    def add_leads(self, records, source, what=None, where=None):
+        """
+        Record leads found by a fetcher.
+
+        Args:
+            records: Business dictionaries or CSV rows in any fetcher's shape
+            source: 'localsearch', 'yellowpages' or 'domain'
+            what: Trade searched for, if any
+            where: Area searched, if any
+
+        Returns:
+            int: Number of new observations stored
+        """
+        leads = [normalise_lead(record, source) for record in records]
+        rows = []
+        seen_at = datetime.utcnow().isoformat()
+        for lead in leads:
+            if not lead['name']:
+                continue
+            rows.append((
+                _business_key(lead), _fingerprint(lead, source, what, where), source, what, where,
+                lead['name'], lead['phone'], lead['phone_e164'], lead['url'], lead['website'],
+                lead['street'], lead['suburb'], lead['state'], lead['postcode'],
+                lead['description'], lead['category'], seen_at
+            ))
+
+        conn = self._connect()
+        try:
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    'INSERT OR IGNORE INTO lead (business_key, fingerprint, source, search_what, search_where, '
+                    'name, phone, phone_e164, url, website, street, suburb, state, postcode, description, '
+                    'category, seen_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                return conn.total_changes - before
+        finally:
+            conn.close()
+
+    def query(self, trade=None, area=None, phone=None, limit=None):
+        """
+        Latest known details of each business matching the filters.
+
+        Args:
+            trade: Prefix of the category or searched trade, case-insensitive
+                   (e.g. 'plumb' matches 'Plumbing' and 'plumbers')
+            area: Suburb, postcode or searched area, case-insensitive
+            phone: E.164 phone number
+            limit: Most rows to return
+
+        Returns:
+            list: sqlite3.Row objects, ordered by name
+        """
+        criteria = []
+        params = []
+        if trade:
+            criteria.append("(category LIKE ? ESCAPE '\\' OR search_what LIKE ? ESCAPE '\\')")
+            params += [_prefix_pattern(trade)] * 2
+        if area:
+            criteria.append('(suburb = ? OR postcode = ? OR search_where = ?)')
+            params += [area, area, area]
+        if phone:
+            criteria.append('phone_e164 = ?')
+            params.append(phone)
+        where = f"WHERE {' AND '.join(criteria)}" if criteria else ''
+
+        sql = (f'SELECT * FROM lead WHERE id IN (SELECT MAX(id) FROM lead {where} GROUP BY business_key) '
+               'ORDER BY name COLLATE NOCASE')
+        if limit:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def import_csv(self, csv_file):
+        """
+        Load a legacy per-search CSV written by any fetcher.
+
+        Returns:
+            int: Number of new observations stored
+        """
+        what, where = csv_search(csv_file)
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            source = csv_source(reader.fieldnames)
+            rows = list(reader)
+        return self.add_leads(rows, source, what, where)
+
+    def export_csv(self, csv_file, trade=None, area=None, merge=True):
+        """
+        Write matching leads to a CSV in the LocalSearch layout plus category.
+
+        Args:
+            merge: Collapse the same business found by different sources
+
+        Returns:
+            int: Number of rows written
+        """
+        leads = [dict(row) for row in self.query(trade=trade, area=area)]
+        if merge:
+            for lead in leads:
+                lead['sources'] = [lead['source']]
+            leads = merge_leads([normalise_lead(lead, lead['source']) for lead in leads])
+
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(to_dicts(leads))
+        return len(leads)
+
+def _csv_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith('.csv'):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Query, import and export the consolidated lead store.')
+    parser.add_argument('--db', default=DEFAULT_PATH, help='Lead store path')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='Import legacy CSV files or directories of them')
+    import_parser.add_argument('paths', nargs='+')
+
+    for name, help_text in (('query', 'Print matching leads'), ('export', 'Export matching leads to CSV')):
+        command = commands.add_parser(name, help=help_text)
+        if name == 'export':
+            command.add_argument('csv_file')
+        command.add_argument('--trade', help="Category or searched trade prefix, e.g. 'plumb'")
+        command.add_argument('--area', help="Suburb, postcode or searched area, e.g. 'cairns'")
+        command.add_argument('--limit', type=int)
+
+    args = parser.parse_args()
+    store = LeadStore(args.db)
+
+    if args.command == 'import':
+        for csv_file in _csv_files(args.paths):
+            print(f"{csv_file}: {store.import_csv(csv_file)} new leads")
+    elif args.command == 'query':
+        rows = store.query(trade=args.trade, area=args.area, limit=args.limit)
+        for row in rows:
+            print(f"{row['name']} - {row['phone']} - {row['suburb']} - {row['category'] or row['search_what']}")
+        print(f"{len(rows)} leads", file=sys.stderr)
+    else:
+        print(f"Exported {store.export_csv(args.csv_file, trade=args.trade, area=args.area)} leads to {args.csv_file}")
@@ -0,0 +1,58 @@
+import re
+
+# Scraped listings are Australian, so local numbers get this country code
+DEFAULT_COUNTRY_CODE = '61'
+
+_NON_DIGITS = re.compile(r'\D')
+
+def to_e164(raw, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Convert a phone number as scraped or typed (e.g. "0400 31 9663") to E.164.
+
+    Args:
+        raw: Phone number string in any common format
+        country_code: Country code applied to local numbers with a leading 0
+
+    Returns:
+        The E.164 string (e.g. "+61400319663"), or None if there are no digits
+    """
+    if not raw:
+        return None
+
+    raw = str(raw).strip()
+    digits = _NON_DIGITS.sub('', raw)
+    if not digits:
+        return None
+
+    if raw.startswith('+'):
+        return '+' + digits
+    if digits.startswith('00'):
+        # International dialling prefix
+        return '+' + digits[2:]
+    if digits.startswith('0'):
+        # Local numbers: replace leading 0 with country code
+        return '+' + country_code + digits[1:]
+    return '+' + digits
+
+def add_e164(businesses, phone_key='phone', e164_key='phone_e164'):
+    """
+    Batch normaliser: fill the E.164 phone on each business dictionary in place.
+
+    Numbers repeat a lot across scraped pages (one agency, many listings), so
+    conversions are memoised for the duration of the batch.
+
+    Args:
+        businesses: Iterable of business dictionaries
+        phone_key: Key holding the raw phone number
+        e164_key: Key to store the normalised number under
+
+    Returns:
+        The same businesses, for chaining
+    """
+    seen = {}
+    for business in businesses:
+        raw = business.get(phone_key)
+        if raw not in seen:
+            seen[raw] = to_e164(raw)
+        business[e164_key] = seen[raw]
+    return businesses
@@ -0,0 +1,70 @@
+import os
+import re
+import csv
+from functools import lru_cache
+
+# Australian postcode centroids, bundled so geocoding needs no network access.
+# From the countries-states-cities database (ODbL v1.0): postcode, state, locality, latitude, longitude
+POSTCODES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'au_postcodes.csv')
+
+_NON_DIGITS = re.compile(r'\D')
+
+@lru_cache(maxsize=1)
+def _centroids():
+    # (postcode -> (latitude, longitude), (locality, state) -> (latitude, longitude)), read once per process
+    by_postcode = {}
+    by_locality = {}
+    with open(POSTCODES_PATH, newline='') as f:
+        for row in csv.DictReader(f):
+            point = (float(row['latitude']), float(row['longitude']))
+            by_postcode[row['postcode']] = point
+            by_locality.setdefault((row['locality'], row['state']), point)
+    return by_postcode, by_locality
+
+def normalise_postcode(raw):
+    """
+    Four-digit form of a postcode as scraped or typed (e.g. "800" -> "0800").
+
+    Returns:
+        The postcode string, or None if it is not 3 or 4 digits
+    """
+    digits = _NON_DIGITS.sub('', str(raw or ''))
+    if not 3 <= len(digits) <= 4:
+        return None
+    return digits.zfill(4)
+
+def locate(postcode=None, suburb=None, state=None):
+    """
+    Approximate coordinates of an Australian address from its postcode.
+
+    Falls back to the suburb (with the state abbreviation, e.g. "QLD") when
+    the postcode is missing or unknown; only the one locality listed for each
+    postcode is known by name.
+
+    Returns:
+        (latitude, longitude) of the postcode centroid, or None if not found
+    """
+    by_postcode, by_locality = _centroids()
+    point = by_postcode.get(normalise_postcode(postcode))
+    if point is None and suburb and state:
+        point = by_locality.get((str(suburb).strip().upper(), str(state).strip().upper()))
+    return point
+
+def add_coordinates(businesses, latitude_key='latitude', longitude_key='longitude'):
+    """
+    Batch geocoder: fill the coordinates of each business dictionary in place.
+
+    Businesses with no known postcode or suburb get None for both.
+
+    Args:
+        businesses: Iterable of business dictionaries (postcode, suburb, state)
+        latitude_key: Key to store the latitude under
+        longitude_key: Key to store the longitude under
+
+    Returns:
+        The same businesses, for chaining
+    """
+    for business in businesses:
+        point = locate(business.get('postcode'), business.get('suburb'), business.get('state')) or (None, None)
+        business[latitude_key], business[longitude_key] = point
+    return businesses
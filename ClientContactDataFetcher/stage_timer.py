@@ -0,0 +1,29 @@
+import time
+from contextlib import contextmanager
+
+# (stage, seconds) recorded by this process since the last drain_timings()
+_timings = []
+
+@contextmanager
+def stage(name):
+    """
+    Time a step of a crawl (page goto, waits, parsing, classification). Steps that
+    raise are recorded too, so timeouts show up as long waits.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _timings.append((name, time.perf_counter() - started))
+
+def drain_timings():
+    """
+    Take the timings recorded since the last call. Scrape pool processes send
+    them to the server process, which exports them (app/backend/utils/metrics.py).
+
+    Returns:
+        list: (stage, seconds) pairs, oldest first
+    """
+    timings = _timings[:]
+    del _timings[:len(timings)]
+    return timings
@@ -1,131 +1,222 @@
-from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime
-from twilio.rest import Client
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, func
+from sqlalchemy.exc import IntegrityError
 from twilio.twiml.messaging_response import MessagingResponse
+from functools import lru_cache
 
 import os
-import requests
-import subprocess
-import csv
-import threading
-import uuid
-import sys
 import logging
 import json
-import re
 
 from extensions import db
-from models.models import User, Job, Conversation, Message
+from models.models import Job, Conversation, Message, SearchJob, SavedSearch
 from flask_login import current_user, login_required
 
-# Add the root directory to sys.path to be able to import the scraper module
-# Go up one more level from project_root to reach the actual root where ClientContactDataFetcher is
-backend_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-app_dir = os.path.dirname(backend_dir)
-root_dir = os.path.dirname(app_dir)
-sys.path.insert(0, root_dir)
-print(f"Added path: {root_dir}")
-print(f"Current paths: {sys.path}")
-
-# Import the scraper module
-from ClientContactDataFetcher.LocalSearchDataFetcher import search_businesses, save_to_csv, main
+# ClientContactDataFetcher is importable from the repository root, which app.py puts on sys.path.
+# The scrapers themselves (Playwright, BeautifulSoup, OpenAI) are only imported by scrape pool processes.
+from ClientContactDataFetcher.phone_numbers import to_e164
+from ClientContactDataFetcher.business_keys import is_new_or_changed
+from ClientContactDataFetcher.business_record import to_dicts
+from utils.job_upsert import upsert_businesses, known_business_keys, apply_business_changes
+from utils.job_queries import page_jobs
+from utils.job_location import job_location, search_origin, distance_km
+from utils.job_bulk import (
+    BULK_ACTIONS, bulk_job_criteria, bulk_update_status, bulk_delete, bulk_create_conversations
+)
+from utils.message_queries import page_messages
+from utils.pagination import parse_limit, encode_cursor, decode_cursor
+from utils.http_cache import user_etag, version_etag, not_modified, with_etag
+from utils.sync import sync_state, sync_cursor, changes_since, CursorExpiredError
+from utils.events import publish, stream_events
+from utils.search_queue import search_queue, search_slug, QueueFullError, ACTIVE_STATUSES
+from utils.ttl_cache import TTLCache
+from utils.crawl_cache import normalise_query, get_cached_crawl, store_crawl
+from utils.scrape_pool import scrape_pool
+from utils.metrics import ExternalCall
+from utils.export import (
+    EXPORT_FORMATS, JOB_EXPORT_FIELDS, CONVERSATION_EXPORT_FIELDS,
+    parse_export_format, job_export_rows, conversation_export_rows, stream_export
+)
 
 api_bp = Blueprint('api', __name__)
 
-# Store search status for each user with multiple searches
-search_status = {}  # user_id -> { search_id -> status_dict }
 
 # Twilio configuration
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+
+@lru_cache(maxsize=1)
+def twilio_client():
+    # The REST client (and the Twilio API modules behind it) is only loaded when the first SMS is sent
+    from twilio.rest import Client
+    return Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
 
 # DeepSeek API configuration
 DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
 
 # Helper function to import businesses to database
-def import_businesses_to_db(businesses, user_id=None):
+def import_businesses_to_db(businesses, user_id=None, search_id=None):
     """
     Import businesses to the database, avoiding duplicates.
     
     Args:
         businesses (list): List of business dictionaries
         user_id (int): User ID to associate with the imported businesses
+        search_id (str): Slug of the search the businesses came from
     
     Returns:
-        int: Number of new businesses imported
+        tuple: (number of new businesses imported, number of existing jobs updated)
     """
     # If user_id is None, try to get it from current_user (for compatibility with direct calls)
     if user_id is None:
         if not current_user or not current_user.is_authenticated:
             logging.error("No authenticated user found when importing businesses")
-            return 0
+            return 0, 0
         user_id = current_user.id
-        
-    jobs_imported = 0
-    
-    for business in businesses:
-        # Check if the job already exists (same business and phone)
-        existing_job = Job.query.filter_by(
-            business_name=business['name'],
-            business_phone=business['phone'],
-            user_id=user_id
-        ).first()
-        
-        if existing_job:
-            # Update classification if changed
-            existing_job.job_type = business.get('category', existing_job.job_type)
-            continue
-        # Create a new job
-        new_job = Job(
-            business_name=business['name'],
-            business_phone=business['phone'],
-            url=business.get('url', ''),
-            street=business.get('street', ''),
-            suburb=business.get('suburb', ''),
-            state=business.get('state', ''),
-            postcode=business.get('postcode', ''),
-            job_type=business.get('category', 'General'),
-            status='pending',
-            user_id=user_id
-        )
-        
-        db.session.add(new_job)
-        jobs_imported += 1
-    
-    # Commit all job additions
-    db.session.commit()
     
-    return jobs_imported
+    return upsert_businesses(businesses, user_id, search_id=search_id)
+
+def serialize_job(job, has_conversation):
+    return {
+        'id': job.id,
+        'business_name': job.business_name,
+        'business_phone': job.business_phone,
+        'job_type': job.job_type,
+        'url': job.url,
+        'street': job.street,
+        'suburb': job.suburb,
+        'state': job.state,
+        'postcode': job.postcode,
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': (job.updated_at or job.created_at).isoformat(),
+        'has_conversation': has_conversation
+    }
 
 # Job routes
 @api_bp.route('/jobs', methods=['GET'])
 @jwt_required()
 def get_jobs():
+    """
+    List the current user's jobs, one page at a time.
+    
+    Query parameters: status, job_type, suburb, postcode, location, phone_prefix,
+    has_conversation, q, search, near, within_km, sort (newest, oldest, name,
+    name_desc, relevance, distance), limit and cursor (the next_cursor of the
+    previous page).
+    
+    search is a full-text search of the business name, job type, street, suburb
+    and postcode; every word must begin a word of the job ("plumb cai"). Results
+    are sorted by relevance unless another sort is given.
+    
+    near (a postcode) keeps the jobs within within_km kilometres (default 25) of
+    it, nearest first unless another sort is given, with each job's distance_km.
+    
+    Each page has a sync_cursor. Pass it as since=<cursor> to get just the jobs
+    created or changed after it (in change order, with has_conversation kept
+    current) and the ids of those deleted, with the cursor to use next time;
+    filters and sort are ignored. If has_more is true, call again at once with
+    the new cursor. An expired cursor gets a 410; fetch the list again.
+    
+    Conditional: answers 304 to an If-None-Match with the ETag of the last page
+    fetched with the same parameters if none of the user's jobs or
+    conversations have changed since.
+    """
     current_user_id = get_jwt_identity()
-    jobs = Job.query.filter_by(user_id=current_user_id).order_by(Job.created_at.desc()).all()
+    # One read of the user row gives the ETag, the sync cursor and the delta's bounds
+    state = sync_state(current_user_id)
+    etag = version_etag(current_user_id, 'data_version', state[0])
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
-    job_list = []
-    for job in jobs:
-        job_data = {
+    jobs_query = db.session.query(Job, Conversation.id).outerjoin(Conversation, Conversation.job_id == Job.id)
+    
+    if request.args.get('since'):
+        try:
+            rows, deleted, cursor, has_more = changes_since(jobs_query, Job, current_user_id, request.args, state)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        except CursorExpiredError as e:
+            return jsonify({'message': str(e)}), 410
+        return with_etag(jsonify({
+            'jobs': [serialize_job(job, conversation_id is not None) for job, conversation_id in rows],
+            'deleted': deleted,
+            'sync_cursor': cursor,
+            'has_more': has_more
+        }), etag), 200
+    
+    cursor = sync_cursor(state[0])
+    try:
+        origin = search_origin(request.args)
+        rows, total, next_cursor = page_jobs(current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    job_list = [serialize_job(job, conversation_id is not None) for job, conversation_id in rows]
+    if origin:
+        for job, (row, _) in zip(job_list, rows):
+            job['distance_km'] = round(distance_km(origin, row.latitude, row.longitude), 1)
+    
+    return with_etag(jsonify({
+        'jobs': job_list,
+        'total': total,
+        'next_cursor': next_cursor,
+        'sync_cursor': cursor
+    }), etag), 200
+
+def export_response(rows, fields, export_format, name):
+    # Streamed row by row from a server-side cursor, so memory use does not grow with the export
+    response = Response(
+        stream_with_context(stream_export(rows, fields, export_format)),
+        mimetype=EXPORT_FORMATS[export_format]
+    )
+    file_name = f"{name}-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+@api_bp.route('/jobs/export', methods=['GET'])
+@jwt_required()
+def export_jobs():
+    """
+    Export the current user's jobs as CSV or NDJSON (format=csv|ndjson).
+    
+    Takes the same filters and sort as GET /jobs; every matching job is
+    exported, with no paging.
+    """
+    current_user_id = get_jwt_identity()
+    
+    try:
+        export_format = parse_export_format(request.args.get('format'))
+        rows = job_export_rows(current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return export_response(rows, JOB_EXPORT_FIELDS, export_format, 'jobs')
+
+def duplicate_job_response(job):
+    # 409 for a job that would repeat one of the user's (uq_job_user_id_business_name_business_phone)
+    return jsonify({
+        'message': 'A job with this business name and phone already exists',
+        'job': {
             'id': job.id,
             'business_name': job.business_name,
             'business_phone': job.business_phone,
             'job_type': job.job_type,
-            'url': job.url,
-            'street': job.street,
-            'suburb': job.suburb,
-            'state': job.state,
-            'postcode': job.postcode,
-            'status': job.status,
-            'created_at': job.created_at.isoformat(),
-            'has_conversation': job.conversation is not None
+            'status': job.status
         }
-        job_list.append(job_data)
-    
-    return jsonify({'jobs': job_list}), 200
+    }), 409
+
+def find_duplicate_job(user_id, business_name, business_phone):
+    return Job.query.filter_by(
+        business_name=business_name,
+        business_phone=business_phone,
+        user_id=user_id
+    ).first()
 
 @api_bp.route('/jobs', methods=['POST'])
 @jwt_required()
@@ -138,40 +229,36 @@ def create_job():
         return jsonify({'message': 'Business name and phone are required'}), 400
     
     # Check for duplicate job
-    existing_job = Job.query.filter_by(
-        business_name=data['business_name'],
-        business_phone=data['business_phone'],
-        user_id=current_user_id
-    ).first()
-    
+    existing_job = find_duplicate_job(current_user_id, data['business_name'], data['business_phone'])
     if existing_job:
-        return jsonify({
-            'message': 'A job with this business name and phone already exists',
-            'job': {
-                'id': existing_job.id,
-                'business_name': existing_job.business_name,
-                'business_phone': existing_job.business_phone,
-                'job_type': existing_job.job_type,
-                'status': existing_job.status
-            }
-        }), 409
+        return duplicate_job_response(existing_job)
     
     # Create new job
     new_job = Job(
         business_name=data['business_name'],
         business_phone=data['business_phone'],
+        phone_e164=to_e164(data['business_phone']),
         job_type=data.get('job_type', ''),
         url=data.get('url', ''),
         street=data.get('street', ''),
         suburb=data.get('suburb', ''),
         state=data.get('state', ''),
         postcode=data.get('postcode', ''),
+        **job_location(data.get('postcode'), data.get('suburb'), data.get('state')),
         status='pending',
         user_id=current_user_id
     )
     
     db.session.add(new_job)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request created the same job after the check above
+        db.session.rollback()
+        existing_job = find_duplicate_job(current_user_id, data['business_name'], data['business_phone'])
+        if not existing_job:
+            raise
+        return duplicate_job_response(existing_job)
     
     return jsonify({
         'message': 'Job created successfully',
@@ -195,13 +282,34 @@ def update_job(job_id):
     
     data = request.get_json()
     
+    # A new name or phone must not make the job a duplicate of another
+    business_name = data.get('business_name', job.business_name)
+    business_phone = data.get('business_phone', job.business_phone)
+    if (business_name, business_phone) != (job.business_name, job.business_phone):
+        existing_job = find_duplicate_job(current_user_id, business_name, business_phone)
+        if existing_job and existing_job.id != job.id:
+            return duplicate_job_response(existing_job)
+    
     # Update job fields
     for field in ['business_name', 'business_phone', 'job_type', 'url', 
                  'street', 'suburb', 'state', 'postcode', 'status']:
         if field in data:
             setattr(job, field, data[field])
+    if 'business_phone' in data:
+        job.phone_e164 = to_e164(job.business_phone)
+    if any(field in data for field in ('suburb', 'state', 'postcode')):
+        for field, value in job_location(job.postcode, job.suburb, job.state).items():
+            setattr(job, field, value)
     
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request took the name and phone after the check above
+        db.session.rollback()
+        existing_job = find_duplicate_job(current_user_id, business_name, business_phone)
+        if not existing_job:
+            raise
+        return duplicate_job_response(existing_job)
     
     return jsonify({
         'message': 'Job updated successfully',
@@ -223,23 +331,48 @@ def delete_job(job_id):
     if not job:
         return jsonify({'message': 'Job not found'}), 404
     
-    # Delete associated conversation and messages if they exist
-    if job.conversation:
-        Message.query.filter_by(conversation_id=job.conversation.id).delete()
-        db.session.delete(job.conversation)
-    
+    # The conversation and its messages are deleted by the database (ON DELETE CASCADE)
     db.session.delete(job)
     db.session.commit()
     
     return jsonify({'message': 'Job deleted successfully'}), 200
 
 # New endpoint for web scraping jobs with multiple search tracking
+@api_bp.route('/jobs/bulk', methods=['POST'])
+@jwt_required()
+def bulk_jobs():
+    """
+    Apply one action to many of the current user's jobs in a single transaction.
+    
+    Body: action (update_status, delete or create_conversations), either ids (a
+    list of job ids) or filter (the GET /jobs filters as an object; {} selects
+    every job), and status for update_status.
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    action = data.get('action')
+    if action not in BULK_ACTIONS:
+        return jsonify({'message': f"action must be one of: {', '.join(BULK_ACTIONS)}"}), 400
+    
+    try:
+        criteria = bulk_job_criteria(current_user_id, data)
+        if action == 'update_status':
+            result = {'updated': bulk_update_status(criteria, data.get('status'))}
+        elif action == 'delete':
+            # Conversations and messages are removed by ON DELETE CASCADE
+            result = {'deleted': bulk_delete(criteria)}
+        else:
+            created, selected = bulk_create_conversations(criteria)
+            result = {'created': created, 'existing': selected - created}
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'message': 'Bulk action completed', 'action': action, **result}), 200
+
 @api_bp.route('/search-jobs', methods=['POST'])
 @jwt_required()
 def search_jobs():
-    # Get the actual Flask app instance from current_app
-    flask_app = current_app._get_current_object()
-    
     current_user_id = get_jwt_identity()
     data = request.get_json()
     
@@ -252,134 +385,481 @@ def search_jobs():
     state = data['state']
     
     # Create a unique search ID based on the search parameters
-    search_id = f"{what}_{where}_{state}".lower().replace(" ", "_")
+    search_id = search_slug(what, where, state)
     
-    # Check if job with same parameters already exists and is active
-    for job in search_status.get(current_user_id, {}):
-        if job == search_id and search_status[current_user_id][job]['status'] != "completed" and search_status[current_user_id][job]['status'] != "error":
-            return jsonify({
-                'status': 'exists',
-                'message': 'This search is already in progress',
-                'job_id': search_id
-            }), 409
-    
-    # Create a new job status entry
-    job_entry = {
-        'id': search_id,
-        'what': what,
-        'where': where,
-        'state': state,
-        'status': 'pending',
-        'progress': 0,
-        'message': 'Search job created',
-        'results': [],
-        'csv_path': None,
-        'created_at': datetime.now().isoformat(),
-        'completed_at': None
-    }
+    # Check if a search with the same parameters is already queued or running
+    active = SearchJob.query.filter(
+        SearchJob.user_id == current_user_id,
+        SearchJob.search_id == search_id,
+        SearchJob.status.in_(ACTIVE_STATUSES)
+    ).first()
+    if active:
+        return jsonify({
+            'status': 'exists',
+            'message': 'This search is already in progress',
+            'job_id': search_id
+        }), 409
     
-    # Add to job status list (remove existing completed job with same ID if exists)
-    search_status[current_user_id] = {**search_status.get(current_user_id, {}), search_id: job_entry}
+    # Replace any finished search with the same ID
+    SearchJob.query.filter(
+        SearchJob.user_id == current_user_id,
+        SearchJob.search_id == search_id
+    ).delete(synchronize_session=False)
     
-    # Start scraping in a background thread
-    def scrape_process():
-        try:
-            # Update status to running
-            job_entry['status'] = 'running'
-            job_entry['message'] = 'Scraping in progress...'
-            
-            # Progress update callback function
-            def update_progress(progress, message, businesses=None):
-                job_entry['progress'] = progress
-                job_entry['message'] = message
-                if businesses is not None:
-                    job_entry['results'] = businesses
-                    # Add a count of results for the frontend
-                    job_entry['results_count'] = len(businesses)
-            
-            # Use the new main function from LocalSearchDataFetcher (returns list only)
-            businesses = main(what, where, state, True, update_progress)
-            csv_path = None
-            
-            # Import businesses to database - Create an application context for database operations
-            # Use the actual Flask app instance with a proper app context
-            with flask_app.app_context():
-                try:
-                    jobs_imported = import_businesses_to_db(businesses, current_user_id)
-                    
-                    # Update job with results
-                    job_entry['results'] = businesses
-                    job_entry['csv_path'] = csv_path
-                    job_entry['status'] = 'completed'
-                    job_entry['progress'] = 100
-                    job_entry['message'] = f"Found {len(businesses)} businesses, imported {jobs_imported} new jobs"
-                    job_entry['results_count'] = len(businesses)
-                    job_entry['jobs_imported'] = jobs_imported
-                    job_entry['completed_at'] = datetime.now().isoformat()
-                except Exception as e:
-                    job_entry['status'] = 'error'
-                    job_entry['message'] = f"Database error: {str(e)}"
-                    job_entry['completed_at'] = datetime.now().isoformat()
-                    logging.exception("Error in database operations")
-            
-        except Exception as e:
-            job_entry['status'] = 'error'
-            job_entry['message'] = f"Error: {str(e)}"
-            job_entry['completed_at'] = datetime.now().isoformat()
-            logging.exception("Error in scrape_process")  # Log the full exception with traceback
+    try:
+        search = search_queue.enqueue(int(current_user_id), search_id, what, where, state)
+    except QueueFullError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e)}), 429
     
-    # Start the thread
-    thread = threading.Thread(target=scrape_process)
-    thread.daemon = True
-    thread.start()
+    publish(current_user_id, 'search.progress', serialize_search(search))
     
     return jsonify({
         'status': 'success',
-        'message': 'Search job started',
-        'job_id': search_id
+        'message': 'Search job queued',
+        'job_id': search_id,
+        'queue_position': search_queue.pending_position(search)
     }), 202
 
+# Businesses found by recent searches run in this process: results_key(search) -> list of BusinessRecords.
+# Once a search has finished its results are also available from the imported jobs.
+SEARCH_RESULTS_CACHE_SIZE = int(os.getenv('SEARCH_RESULTS_CACHE_SIZE', '20'))
+SEARCH_RESULTS_TTL = int(os.getenv('SEARCH_RESULTS_TTL', '1800'))  # seconds
+search_results = TTLCache(SEARCH_RESULTS_CACHE_SIZE, SEARCH_RESULTS_TTL)
+
+def results_key(search):
+    # SQLite can reuse the id of a deleted search, so the creation time is part of the key
+    return (search.id, search.created_at)
+
+def run_search_job(search_job_id):
+    """
+    Run a claimed search: crawl LocalSearch, import the results and record the outcome.
+    
+    If an identical search (any user) crawled within CRAWL_CACHE_TTL, its
+    businesses are imported instead of crawling again.
+    
+    Scheduled re-crawls of saved searches are incremental: businesses are
+    compared with the user's jobs by profile URL or phone, only new or changed
+    ones are classified and written, and the crawl stops at the first page
+    holding only known businesses.
+    
+    Called by the search queue workers inside an application context.
+    
+    Args:
+        search_job_id (int): Id of the SearchJob, already marked running
+    """
+    search = db.session.get(SearchJob, search_job_id)
+    user_id = search.user_id
+    query_key = search.query_key or normalise_query(search.what, search.where, search.state)
+    incremental = search.saved_search_id is not None
+    
+    def save_progress():
+        # Commits the row and pushes the status to the user's event stream
+        search.heartbeat_at = datetime.utcnow()
+        publish(user_id, 'search.progress', serialize_search(search))
+    
+    save_progress()
+    
+    try:
+        # Progress update callback function
+        def update_progress(progress, message, businesses=None):
+            search.progress = progress
+            search.message = message
+            if businesses is not None:
+                # The crawler appends to the same list, so this stores a reference, not a copy
+                search_results.set(results_key(search), businesses)
+                # Add a count of results for the frontend
+                search.results_count = len(businesses)
+            save_progress()
+            notify_waiting_searches(search)
+        
+        known, job_ids = known_business_keys(user_id) if incremental else (None, None)
+        
+        businesses = get_cached_crawl(query_key)
+        from_cache = businesses is not None
+        if from_cache and incremental:
+            businesses = [business for business in businesses if is_new_or_changed(business, known)]
+        if not from_cache:
+            # Crawl in a scrape process; progress is relayed back to this thread
+            businesses = scrape_pool.run(search.what, search.where, search.state, update_progress, known)
+            if not incremental:
+                store_crawl(query_key, businesses)
+        search_results.set(results_key(search), businesses)
+        
+        try:
+            if incremental:
+                jobs_imported, jobs_updated = apply_business_changes(businesses, user_id, job_ids, search.search_id)
+            else:
+                jobs_imported, jobs_updated = import_businesses_to_db(businesses, user_id, search.search_id)
+            
+            # Update search with results
+            search.status = 'completed'
+            search.progress = 100
+            source = ' from a recent identical search' if from_cache else ''
+            if incremental:
+                search.message = (f"Re-crawl{source} found {len(businesses)} new or changed businesses, "
+                                  f"imported {jobs_imported} new jobs and updated {jobs_updated}")
+            else:
+                search.message = f"Found {len(businesses)} businesses{source}, imported {jobs_imported} new jobs"
+            search.results_count = len(businesses)
+            search.jobs_imported = jobs_imported
+            search.jobs_updated = jobs_updated
+            search.completed_at = datetime.utcnow()
+            publish(user_id, 'jobs.imported', {
+                'search_id': search.search_id,
+                'jobs_imported': jobs_imported,
+                'jobs_updated': jobs_updated
+            })
+        except Exception as e:
+            db.session.rollback()
+            search.status = 'error'
+            search.message = f"Database error: {str(e)}"
+            search.completed_at = datetime.utcnow()
+            logging.exception("Error in database operations")
+        save_progress()
+        
+    except Exception as e:
+        db.session.rollback()
+        search.status = 'error'
+        search.message = f"Error: {str(e)}"
+        search.completed_at = datetime.utcnow()
+        logging.exception("Error in search job")  # Log the full exception with traceback
+        save_progress()
+
+def notify_waiting_searches(search):
+    # Show the crawl's progress on identical searches queued behind it;
+    # incremental re-crawls aren't cached, so nothing waits for them
+    if search.saved_search_id is not None:
+        return
+    waiting = SearchJob.query.filter(
+        SearchJob.query_key == search.query_key,
+        SearchJob.status == 'pending',
+        SearchJob.id != search.id
+    ).all()
+    for other in waiting:
+        other.progress = search.progress
+        other.message = f"Waiting for an identical search: {search.message}"
+    for other in waiting:
+        publish(other.user_id, 'search.progress', serialize_search(other))
+
+def serialize_search(search):
+    # Search status as returned by the API; id is the what_where_state slug.
+    # Results are paged separately by /search-results so this stays small.
+    return {
+        'id': search.search_id,
+        'what': search.what,
+        'where': search.where,
+        'state': search.state,
+        'status': search.status,
+        'progress': search.progress or 0,
+        'message': search.message,
+        'results_count': search.results_count or 0,
+        'jobs_imported': search.jobs_imported,
+        'jobs_updated': search.jobs_updated,
+        'attempts': search.attempts or 0,
+        'saved_search_id': search.saved_search_id,
+        'csv_path': None,
+        'created_at': search.created_at.isoformat() if search.created_at else None,
+        'started_at': search.started_at.isoformat() if search.started_at else None,
+        'completed_at': search.completed_at.isoformat() if search.completed_at else None
+    }
+
 # Updated endpoint to check multiple search statuses
 @api_bp.route('/search-status', methods=['GET'])
 @jwt_required()
 def get_search_status():
     current_user_id = get_jwt_identity()
+    etag = user_etag(current_user_id, 'search_version')
+    cached = not_modified(etag)
+    if cached:
+        return cached
     
     # Get the search_id parameter if provided
     search_id = request.args.get('search_id')
     
     if search_id:
         # Return the status for a specific search
-        if current_user_id in search_status and search_id in search_status[current_user_id]:
-            return jsonify(search_status[current_user_id][search_id]), 200
+        search = SearchJob.query.filter_by(user_id=current_user_id, search_id=search_id).order_by(
+            SearchJob.id.desc()
+        ).first()
+        if search:
+            data = serialize_search(search)
+            if search.status == 'pending':
+                # Moves as other users' searches start, so this response isn't tagged
+                data['queue_position'] = search_queue.pending_position(search)
+                return jsonify(data), 200
+            return with_etag(jsonify(data), etag), 200
         else:
             return jsonify({
                 'status': 'not_found',
                 'message': 'Search not found'
             }), 404
     else:
-        # Return all search statuses for this user
-        if current_user_id in search_status:
-            # Convert to a list and sort by creation time (newest first)
-            searches = list(search_status[current_user_id].values())
-            searches.sort(key=lambda x: x.get('created_at', ''), reverse=True)
-            
-            # Limit to the most recent 10 searches
-            searches = searches[:10]
-            
-            return jsonify({
-                'searches': searches
-            }), 200
-        else:
-            return jsonify({
-                'searches': []
-            }), 200
+        # Return the most recent 10 searches for this user, newest first
+        searches = SearchJob.query.filter_by(user_id=current_user_id).order_by(
+            SearchJob.created_at.desc(), SearchJob.id.desc()
+        ).limit(10).all()
+        
+        return with_etag(jsonify({
+            'searches': [serialize_search(search) for search in searches]
+        }), etag), 200
+
+def job_to_business(job):
+    # Imported job in the shape the crawler returns businesses
+    return {
+        'name': job.business_name,
+        'phone': job.business_phone,
+        'url': job.url,
+        'street': job.street,
+        'suburb': job.suburb,
+        'state': job.state,
+        'postcode': job.postcode,
+        'category': job.job_type
+    }
+
+@api_bp.route('/search-results', methods=['GET'])
+@jwt_required()
+def get_search_results():
+    """
+    Page through the businesses found by one of the current user's searches.
+    
+    Query parameters: search_id (required), limit and cursor (the next_cursor of
+    the previous page). While the search runs, and for a while after, results
+    come from the crawl held by the process that ran it (source "crawl");
+    otherwise they are the jobs the search imported (source "jobs").
+    """
+    current_user_id = get_jwt_identity()
+    
+    search_id = request.args.get('search_id')
+    if not search_id:
+        return jsonify({'message': 'search_id is required'}), 400
+    
+    search = SearchJob.query.filter_by(user_id=current_user_id, search_id=search_id).order_by(
+        SearchJob.id.desc()
+    ).first()
+    if not search:
+        return jsonify({
+            'status': 'not_found',
+            'message': 'Search not found'
+        }), 404
+    
+    cursor = request.args.get('cursor')
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor_values = decode_cursor(cursor) if cursor else []
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Crawl cursors hold an offset; job cursors hold (created_at, id)
+    businesses = search_results.get(results_key(search))
+    if businesses is not None and len(cursor_values) <= 1:
+        offset = cursor_values[0] if cursor_values else 0
+        if not isinstance(offset, int) or offset < 0:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        
+        page = businesses[offset:offset + limit]
+        next_offset = offset + len(page)
+        return jsonify({
+            'search_id': search_id,
+            'status': search.status,
+            'source': 'crawl',
+            'results': to_dicts(page),
+            'total': len(businesses),
+            'next_cursor': encode_cursor([next_offset]) if next_offset < len(businesses) else None
+        }), 200
+    
+    try:
+        rows, total, next_cursor = page_jobs(current_user_id, {
+            'search_id': search_id,
+            'sort': 'oldest',
+            'limit': limit,
+            'cursor': cursor
+        })
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({
+        'search_id': search_id,
+        'status': search.status,
+        'source': 'jobs',
+        'results': [job_to_business(job) for job, _ in rows],
+        'total': total,
+        'next_cursor': next_cursor
+    }), 200
+
+# Saved searches, re-crawled on a schedule by the search queue
+def serialize_saved_search(saved):
+    return {
+        'id': saved.id,
+        'what': saved.what,
+        'where': saved.where,
+        'state': saved.state,
+        'search_id': search_slug(saved.what, saved.where, saved.state),
+        'interval_hours': saved.interval_hours,
+        'enabled': saved.enabled,
+        'next_run_at': saved.next_run_at.isoformat() if saved.next_run_at else None,
+        'last_run_at': saved.last_run_at.isoformat() if saved.last_run_at else None,
+        'created_at': saved.created_at.isoformat() if saved.created_at else None
+    }
+
+def parse_interval_hours(value):
+    try:
+        interval_hours = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('interval_hours must be a whole number of hours')
+    if interval_hours < 1:
+        raise ValueError('interval_hours must be at least 1')
+    return interval_hours
+
+@api_bp.route('/saved-searches', methods=['GET'])
+@jwt_required()
+def get_saved_searches():
+    current_user_id = get_jwt_identity()
+    saved_searches = SavedSearch.query.filter_by(user_id=current_user_id).order_by(SavedSearch.created_at.desc()).all()
+    
+    return jsonify([serialize_saved_search(saved) for saved in saved_searches]), 200
+
+@api_bp.route('/saved-searches', methods=['POST'])
+@jwt_required()
+def create_saved_search():
+    """
+    Save a search to be re-crawled every interval_hours (default 24).
+    
+    Re-crawls only import new or changed businesses; run the search once
+    with POST /search-jobs first to import everything it currently finds.
+    """
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate required fields
+    if not data or not data.get('what') or not data.get('where') or not data.get('state'):
+        return jsonify({'message': 'Search parameters (what, where, state) are required'}), 400
+    
+    try:
+        interval_hours = parse_interval_hours(data.get('interval_hours', 24))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    saved = SavedSearch(
+        what=data['what'],
+        where=data['where'],
+        state=data['state'],
+        interval_hours=interval_hours,
+        next_run_at=datetime.utcnow() + timedelta(hours=interval_hours),
+        user_id=current_user_id
+    )
+    db.session.add(saved)
+    db.session.commit()
+    
+    return jsonify(serialize_saved_search(saved)), 201
+
+@api_bp.route('/saved-searches/<int:saved_search_id>', methods=['PUT'])
+@jwt_required()
+def update_saved_search(saved_search_id):
+    current_user_id = get_jwt_identity()
+    saved = SavedSearch.query.filter_by(id=saved_search_id, user_id=current_user_id).first()
+    
+    if not saved:
+        return jsonify({'message': 'Saved search not found'}), 404
+    
+    data = request.get_json() or {}
+    
+    if 'interval_hours' in data:
+        try:
+            saved.interval_hours = parse_interval_hours(data['interval_hours'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        base = saved.last_run_at or saved.created_at
+        saved.next_run_at = base + timedelta(hours=saved.interval_hours)
+    if 'enabled' in data:
+        saved.enabled = bool(data['enabled'])
+    
+    db.session.commit()
+    
+    return jsonify(serialize_saved_search(saved)), 200
+
+@api_bp.route('/saved-searches/<int:saved_search_id>', methods=['DELETE'])
+@jwt_required()
+def delete_saved_search(saved_search_id):
+    current_user_id = get_jwt_identity()
+    saved = SavedSearch.query.filter_by(id=saved_search_id, user_id=current_user_id).first()
+    
+    if not saved:
+        return jsonify({'message': 'Saved search not found'}), 404
+    
+    # Searches already run keep their status; they just stop pointing here
+    SearchJob.query.filter_by(saved_search_id=saved.id).update(
+        {'saved_search_id': None}, synchronize_session=False
+    )
+    db.session.delete(saved)
+    db.session.commit()
+    
+    return jsonify({'message': 'Saved search deleted successfully'}), 200
+
+@api_bp.route('/saved-searches/<int:saved_search_id>/run', methods=['POST'])
+@jwt_required()
+def run_saved_search(saved_search_id):
+    """Make a saved search due now; the search queue picks it up within seconds."""
+    current_user_id = get_jwt_identity()
+    saved = SavedSearch.query.filter_by(id=saved_search_id, user_id=current_user_id).first()
+    
+    if not saved:
+        return jsonify({'message': 'Saved search not found'}), 404
+    
+    saved.next_run_at = datetime.utcnow()
+    db.session.commit()
+    
+    return jsonify({
+        'status': 'success',
+        'message': 'Saved search scheduled',
+        'job_id': search_slug(saved.what, saved.where, saved.state)
+    }), 202
+
+# Push channel
+@api_bp.route('/events', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def events():
+    """
+    Stream the current user's events as server-sent events.
+    
+    Events: search.progress, jobs.imported, message.received and message.sent.
+    EventSource cannot set headers, so the token may be passed as ?token=.
+    Reconnecting clients resume from the Last-Event-ID header.
+    """
+    current_user_id = get_jwt_identity()
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return jsonify({'message': 'Invalid Last-Event-ID'}), 400
+    
+    response = Response(
+        stream_with_context(stream_events(current_user_id, last_event_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
 
 # Conversation routes
 @api_bp.route('/jobs/<int:job_id>/conversation', methods=['GET'])
 @jwt_required()
 def get_conversation(job_id):
+    """
+    Get a job's conversation with one page of its messages.
+    
+    Returns the latest messages by default; page with before=<message id> or
+    after=<message id> and limit. since=<message id> returns only the messages
+    newer than that id, without the conversation envelope, for polling.
+    Conditional, like GET /jobs.
+    """
     current_user_id = get_jwt_identity()
+    etag = user_etag(current_user_id, 'data_version')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
     job = Job.query.filter_by(id=job_id, user_id=current_user_id).first()
     
     if not job:
@@ -391,30 +871,37 @@ def get_conversation(job_id):
         return jsonify({'message': 'No conversation found for this job'}), 404
     
     # Get messages
-    messages = Message.query.filter_by(conversation_id=conversation.id).order_by(Message.timestamp).all()
-    
-    message_list = []
-    for message in messages:
-        message_data = {
-            'id': message.id,
-            'text': message.text,
-            'is_from_user': message.is_from_user,
-            'timestamp': message.timestamp.isoformat()
-        }
-        message_list.append(message_data)
+    try:
+        messages, has_more = page_messages(conversation.id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    return jsonify({
+    # Viewing the conversation marks received messages as read
+    if conversation.unread_count:
+        conversation.unread_count = 0
+        db.session.commit()
+    
+    message_list = [serialize_message(message) for message in messages]
+    
+    if request.args.get('since'):
+        return with_etag(jsonify({
+            'messages': message_list,
+            'has_more': has_more
+        }), etag), 200
+    
+    return with_etag(jsonify({
         'conversation': {
             'id': conversation.id,
             'created_at': conversation.created_at.isoformat(),
             'messages': message_list,
+            'has_more': has_more,
             'job': {
                 'id': job.id,
                 'business_name': job.business_name,
                 'business_phone': job.business_phone
             }
         }
-    }), 200
+    }), etag), 200
 
 @api_bp.route('/jobs/<int:job_id>/conversation', methods=['POST'])
 @jwt_required()
@@ -437,7 +924,16 @@ def create_conversation(job_id):
     )
     
     db.session.add(new_conversation)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request created it after the check above (conversation.job_id is unique)
+        db.session.rollback()
+        existing = Conversation.query.filter_by(job_id=job_id).first()
+        if not existing:
+            raise
+        return jsonify({'message': 'Conversation already exists for this job',
+                        'conversation_id': existing.id}), 409
     
     return jsonify({
         'message': 'Conversation created successfully',
@@ -448,6 +944,44 @@ def create_conversation(job_id):
     }), 201
 
 # Message routes
+def serialize_message(message):
+    return {
+        'id': message.id,
+        'text': message.text,
+        'is_from_user': message.is_from_user,
+        'timestamp': message.timestamp.isoformat()
+    }
+
+@api_bp.route('/conversations/<int:conversation_id>/messages', methods=['GET'])
+@jwt_required()
+def get_messages(conversation_id):
+    """
+    Get one page of a conversation's messages, oldest first.
+    
+    Same paging arguments as GET /jobs/<job_id>/conversation: limit, before,
+    after and since (message ids).
+    """
+    current_user_id = get_jwt_identity()
+    conversation = Conversation.query.filter_by(id=conversation_id, user_id=current_user_id).first()
+    
+    if not conversation:
+        return jsonify({'message': 'Conversation not found'}), 404
+    
+    try:
+        messages, has_more = page_messages(conversation.id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Viewing the conversation marks received messages as read
+    if conversation.unread_count:
+        conversation.unread_count = 0
+        db.session.commit()
+    
+    return jsonify({
+        'messages': [serialize_message(message) for message in messages],
+        'has_more': has_more
+    }), 200
+
 @api_bp.route('/conversations/<int:conversation_id>/messages', methods=['POST'])
 @jwt_required()
 def create_message(conversation_id):
@@ -470,17 +1004,24 @@ def create_message(conversation_id):
         conversation_id=conversation_id
     )
     
-    # Update conversation last message time
-    conversation.last_message_time = datetime.utcnow()
-    
     db.session.add(new_message)
+    db.session.flush()
+    
+    # Update conversation last message summary
+    conversation.apply_message(new_message)
     db.session.commit()
+    publish(current_user_id, 'message.sent', {
+        'conversation_id': conversation.id,
+        'job_id': conversation.job_id,
+        'message': serialize_message(new_message)
+    })
     
     # Send SMS via Twilio or HTTPS SMS depending on user setting
     job = conversation.job
-    user = User.query.get(current_user_id)
+    user = get_current_user()
     if user.messaging_provider == 'httpssms':
         try:
+            import requests  # Loaded on first use; most requests never make an outbound call
             url = 'https://api.httpsms.com/v1/messages/send'
             headers = {
                 'x-api-key': user.httpssms_api_key,
@@ -488,26 +1029,8 @@ def create_message(conversation_id):
                 'Content-Type': 'application/json'
             }
             # Sanitize and format phone numbers to E.164
-            raw_to = job.business_phone or ''
-            has_plus_to = raw_to.strip().startswith('+')
-            digits_to = re.sub(r'\D', '', raw_to)
-            if has_plus_to:
-                to_number = '+' + digits_to
-            elif digits_to.startswith('0'):
-                # Australian local numbers: replace leading 0 with country code
-                to_number = '+61' + digits_to[1:]
-            else:
-                to_number = '+' + digits_to
-
-            raw_from = user.phone_number or ''
-            has_plus_from = raw_from.strip().startswith('+')
-            digits_from = re.sub(r'\D', '', raw_from)
-            if has_plus_from:
-                from_number = '+' + digits_from
-            elif digits_from.startswith('0'):
-                from_number = '+61' + digits_from[1:]
-            else:
-                from_number = '+' + digits_from
+            to_number = job.phone_e164 or to_e164(job.business_phone)
+            from_number = to_e164(user.phone_number)
 
             payload = {
                 'content': data['text'],
@@ -515,7 +1038,10 @@ def create_message(conversation_id):
                 'to': to_number
             }
             # Send per docs using raw JSON string in body
-            resp = requests.post(url, headers=headers, data=json.dumps(payload))
+            with ExternalCall('sms', 'httpssms') as call:
+                resp = requests.post(url, headers=headers, data=json.dumps(payload))
+                if resp.status_code != 200:
+                    call.failed()
             resp_data = resp.json()
             if resp.status_code != 200:
                 logging.error(f"HTTPSMS error {resp.status_code}: {resp_data}")
@@ -530,11 +1056,12 @@ def create_message(conversation_id):
     else:
         # Default to Twilio
         try:
-            message = twilio_client.messages.create(
-                body=data['text'],
-                from_=TWILIO_PHONE_NUMBER,
-                to=job.business_phone
-            )
+            with ExternalCall('sms', 'twilio'):
+                message = twilio_client().messages.create(
+                    body=data['text'],
+                    from_=TWILIO_PHONE_NUMBER,
+                    to=job.phone_e164 or to_e164(job.business_phone)
+                )
             new_message.twilio_sid = message.sid
             db.session.commit()
             if job.status == 'pending':
@@ -547,10 +1074,7 @@ def create_message(conversation_id):
     return jsonify({
         'message': 'Message sent successfully',
         'message_data': {
-            'id': new_message.id,
-            'text': new_message.text,
-            'is_from_user': new_message.is_from_user,
-            'timestamp': new_message.timestamp.isoformat(),
+            **serialize_message(new_message),
             'twilio_sid': new_message.twilio_sid
         }
     }), 201
@@ -571,6 +1095,7 @@ def generate_message():
     job_type = data['job_type']
     
     try:
+        import requests
         api_key = DEEPSEEK_API_KEY
         headers = {
             'Authorization': f'Bearer {api_key}',
@@ -600,10 +1125,11 @@ def generate_message():
             'temperature': 0.7
         }
         
-        response = requests.post('https://api.deepseek.com/v1/chat/completions', headers=headers, json=payload)
-        response_data = response.json()
-        
-        generated_message = response_data['choices'][0]['message']['content']
+        # A reply without a message (an API error) counts as a failed call
+        with ExternalCall('llm', 'deepseek'):
+            response = requests.post('https://api.deepseek.com/v1/chat/completions', headers=headers, json=payload)
+            response_data = response.json()
+            generated_message = response_data['choices'][0]['message']['content']
         
         return jsonify({'generated_message': generated_message}), 200
         
@@ -617,65 +1143,148 @@ def twilio_webhook():
     from_number = request.form.get('From')
     body = request.form.get('Body')
     
-    if not from_number or not body:
+    # A sender with no usable number would match every job without one (phone_e164 IS NULL)
+    from_e164 = to_e164(from_number) if from_number else None
+    if not from_e164 or not body:
         return str(MessagingResponse()), 400
     
-    # Find job by business phone number
-    job = Job.query.filter_by(business_phone=from_number).first()
+    # Find conversations by normalised business phone number. The same
+    # business can be a job for several users, so deliver to each of them.
+    conversations = Conversation.query.join(Job, Conversation.job_id == Job.id).filter(
+        Job.phone_e164 == from_e164
+    ).all()
     
-    if not job or not job.conversation:
+    if not conversations:
         # No matching job or conversation found
         return str(MessagingResponse()), 404
     
-    # Create new message in the conversation
-    new_message = Message(
-        text=body,
-        is_from_user=False,  # Message from employer
-        conversation_id=job.conversation.id
-    )
-    
-    # Update conversation last message time
-    job.conversation.last_message_time = datetime.utcnow()
+    received = []
+    for conversation in conversations:
+        # Create new message in the conversation
+        new_message = Message(
+            text=body,
+            is_from_user=False,  # Message from employer
+            conversation_id=conversation.id
+        )
+        db.session.add(new_message)
+        db.session.flush()
+        
+        # Update conversation last message summary and unread count
+        conversation.apply_message(new_message)
+        received.append((conversation, new_message))
     
-    db.session.add(new_message)
     db.session.commit()
     
+    for conversation, new_message in received:
+        publish(conversation.user_id, 'message.received', {
+            'conversation_id': conversation.id,
+            'job_id': conversation.job_id,
+            'message': serialize_message(new_message),
+            'unread_count': conversation.unread_count
+        })
+    
     # Return empty TwiML response to acknowledge receipt
     return str(MessagingResponse()), 200
 
-@api_bp.route('/conversations', methods=['GET'])
+def serialize_conversation(conversation, job):
+    return {
+        'id': conversation.id,
+        'job_id': job.id,
+        'business_name': job.business_name,
+        'job_title': job.job_type,
+        'business_phone': job.business_phone,
+        'last_message': conversation.last_message_text,
+        'last_message_id': conversation.last_message_id,
+        'unread_count': conversation.unread_count,
+        'updated_at': conversation.last_message_time.isoformat(),
+        'created_at': conversation.created_at.isoformat()
+    }
+
+@api_bp.route('/conversations/export', methods=['GET'])
 @jwt_required()
-def get_conversations():
+def export_conversations():
+    """
+    Export the current user's conversations with their messages as CSV or
+    NDJSON (format=csv|ndjson), one row per message.
+    """
     current_user_id = get_jwt_identity()
     
-    # Get all conversations for the current user
-    conversations = Conversation.query.filter_by(user_id=current_user_id).order_by(Conversation.last_message_time.desc()).all()
+    try:
+        export_format = parse_export_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
-    if not conversations:
-        return jsonify({
-            'conversations': []
-        }), 200
+    return export_response(
+        conversation_export_rows(current_user_id), CONVERSATION_EXPORT_FIELDS, export_format, 'conversations'
+    )
+
+@api_bp.route('/conversations', methods=['GET'])
+@jwt_required()
+def get_conversations():
+    """
+    List the current user's conversations, most recently active first.
     
-    conversations_data = []
-    for conversation in conversations:
-        # Get associated job
-        job = Job.query.get(conversation.job_id)
-        
-        # Get last message
-        last_message = Message.query.filter_by(conversation_id=conversation.id).order_by(Message.timestamp.desc()).first()
-        last_message_text = last_message.text if last_message else None
+    Served from a single query over conversations joined to their jobs, using the
+    denormalised last-message fields. Paginated with limit and cursor (the
+    next_cursor of the previous page). since=<sync_cursor> returns just the
+    conversations created, changed or deleted since, like GET /jobs.
+    Conditional, like GET /jobs.
+    """
+    current_user_id = get_jwt_identity()
+    state = sync_state(current_user_id)
+    # Read marks don't bump data_version (utils/data_versions.py), but the list
+    # shows unread counts, so its tag also covers their total
+    unread = db.session.query(func.coalesce(func.sum(Conversation.unread_count), 0)).filter(
+        Conversation.user_id == current_user_id
+    ).scalar()
+    etag = version_etag(current_user_id, 'data_version', f'{state[0]}.{unread}')
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    query = db.session.query(Conversation, Job).join(Job, Conversation.job_id == Job.id)
+    
+    if request.args.get('since'):
+        try:
+            rows, deleted, cursor, has_more = changes_since(query, Conversation, current_user_id, request.args, state)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        except CursorExpiredError as e:
+            return jsonify({'message': str(e)}), 410
+        return with_etag(jsonify({
+            'conversations': [serialize_conversation(conversation, job) for conversation, job in rows],
+            'deleted': deleted,
+            'sync_cursor': cursor,
+            'has_more': has_more
+        }), etag), 200
+    
+    sync = sync_cursor(state[0])
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor = request.args.get('cursor')
+        query = query.filter(Conversation.user_id == current_user_id)
         
-        conversations_data.append({
-            'id': conversation.id,
-            'job_id': job.id,
-            'business_name': job.business_name,
-            'job_title': job.job_type,
-            'business_phone': job.business_phone,
-            'last_message': last_message_text,
-            'updated_at': conversation.last_message_time.isoformat(),
-            'created_at': conversation.created_at.isoformat()
-        })
-    
-    return jsonify({
-        'conversations': conversations_data
-    }), 200 
\ No newline at end of file
+        if cursor:
+            last_time, last_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Conversation.last_message_time < last_time,
+                and_(Conversation.last_message_time == last_time, Conversation.id < last_id)
+            ))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    rows = query.order_by(
+        Conversation.last_message_time.desc(), Conversation.id.desc()
+    ).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_conversation = rows[-1][0]
+        next_cursor = encode_cursor([last_conversation.last_message_time, last_conversation.id])
+    
+    return with_etag(jsonify({
+        'conversations': [serialize_conversation(conversation, job) for conversation, job in rows],
+        'next_cursor': next_cursor,
+        'sync_cursor': sync
+    }), etag), 200
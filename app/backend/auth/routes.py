@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_current_user
 import bcrypt
 
 from extensions import db
 from models.models import User
+from utils.user_cache import invalidate_user
+
+# Settings a user can change with PUT /auth/user
+USER_SETTINGS = ('phone_number', 'twilio_account_sid', 'twilio_auth_token', 'messaging_provider', 'httpssms_api_key')
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -77,62 +81,44 @@ def login():
     else:
         return jsonify({'message': 'Invalid credentials'}), 401
 
+def serialize_user(user):
+    return {
+        'id': user.id,
+        'email': user.email,
+        'phone_number': user.phone_number,
+        'twilio_account_sid': user.twilio_account_sid,
+        'twilio_auth_token': user.twilio_auth_token,
+        'messaging_provider': user.messaging_provider,
+        'httpssms_api_key': user.httpssms_api_key
+    }
+
 @auth_bp.route('/user', methods=['GET'])
 @jwt_required()
 def get_user():
-    # Get user ID from JWT
-    current_user_id = get_jwt_identity()
-    
-    # Find user by ID
-    user = User.query.get(current_user_id)
+    # The user the JWT was resolved to, cached (utils/user_cache.py)
+    user = get_current_user()
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
-    return jsonify({
-        'user': {
-            'id': user.id,
-            'email': user.email,
-            'phone_number': user.phone_number,
-            'twilio_account_sid': user.twilio_account_sid,
-            'twilio_auth_token': user.twilio_auth_token,
-            'messaging_provider': user.messaging_provider,
-            'httpssms_api_key': user.httpssms_api_key
-        }
-    }), 200
+    return jsonify({'user': serialize_user(user)}), 200
 
 @auth_bp.route('/user', methods=['PUT'])
 @jwt_required()
 def update_user():
     # Update user settings (phone and Twilio credentials)
-    current_user_id = get_jwt_identity()
     data = request.get_json()
-    user = User.query.get(current_user_id)
+    user = get_current_user()
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
-    # Update fields if provided
-    if 'phone_number' in data:
-        user.phone_number = data['phone_number']
-    if 'twilio_account_sid' in data:
-        user.twilio_account_sid = data['twilio_account_sid']
-    if 'twilio_auth_token' in data:
-        user.twilio_auth_token = data['twilio_auth_token']
-    if 'messaging_provider' in data:
-        user.messaging_provider = data['messaging_provider']
-    if 'httpssms_api_key' in data:
-        user.httpssms_api_key = data['httpssms_api_key']
-    
-    db.session.commit()
+    # Update fields if provided, without loading the user again
+    changes = {field: data[field] for field in USER_SETTINGS if field in data}
+    if changes:
+        User.query.filter(User.id == user.id).update(changes, synchronize_session=False)
+        db.session.commit()
+        invalidate_user(user.id)
     
     return jsonify({
         'message': 'Settings updated successfully',
-        'user': {
-            'id': user.id,
-            'email': user.email,
-            'phone_number': user.phone_number,
-            'twilio_account_sid': user.twilio_account_sid,
-            'twilio_auth_token': user.twilio_auth_token,
-            'messaging_provider': user.messaging_provider,
-            'httpssms_api_key': user.httpssms_api_key
-        }
-    }), 200 
\ No newline at end of file
+        'user': {**serialize_user(user), **changes}
+    }), 200
@@ -1,4 +1,9 @@
+import os
+import sqlite3
+
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
@@ -7,14 +12,42 @@ db = SQLAlchemy()
 jwt = JWTManager()
 cors = CORS()
 
+# How long a SQLite writer waits for another connection's write lock before "database is locked"
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '30000'))
+
+# Pragmas set on every SQLite connection. API requests, webhooks and search
+# workers all write to one file: in WAL mode readers never block the writer
+# (or each other) and writers queue on the busy timeout instead of failing.
+SQLITE_PRAGMAS = [
+    ('foreign_keys', 'ON'),  # Only enforced (with ON DELETE CASCADE) when asked, per connection
+    ('journal_mode', 'WAL'),  # Persistent; recorded in the database file
+    ('synchronous', 'NORMAL'),  # Safe with WAL; a power cut can only lose the last commits
+    ('busy_timeout', SQLITE_BUSY_TIMEOUT_MS),
+    ('cache_size', -int(os.getenv('SQLITE_CACHE_KB', '20000'))),  # Negative: KiB rather than pages
+    ('temp_store', 'MEMORY'),  # Sorts and temporary indexes stay off disk
+]
+
+def apply_sqlite_pragmas(dbapi_connection):
+    """Set SQLITE_PRAGMAS on a sqlite3 connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_sqlite_pragmas(dbapi_connection)
+
 # JWT Identity handler to convert user IDs to strings
 @jwt.user_identity_loader
 def user_identity_lookup(user_id):
     return str(user_id)
 
-# JWT User loader to verify user exists
+# JWT User loader to verify user exists. Runs once per request; routes get the
+# user it returned with get_current_user() instead of querying again.
 @jwt.user_lookup_loader
 def user_lookup_callback(_jwt_header, jwt_data):
-    from models.models import User
+    from utils.user_cache import load_user
     identity = jwt_data["sub"]
-    return User.query.filter_by(id=int(identity)).first() 
\ No newline at end of file
+    return load_user(identity)
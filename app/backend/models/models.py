@@ -11,6 +11,11 @@ class User(db.Model):
     twilio_auth_token = db.Column(db.String(100))  # User's Twilio Auth Token
     messaging_provider = db.Column(db.String(20), default='twilio')  # 'twilio' or 'httpssms'
     httpssms_api_key = db.Column(db.String(200))  # API key if using HTTPS SMS
+    # Change counters for conditional GETs, bumped by triggers (utils/data_versions.py)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Jobs, conversations, messages
+    search_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Searches
+    # Oldest data_version a since= cursor may hold; raised as tombstones are pruned (utils/sync.py)
+    sync_floor = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     jobs = db.relationship('Job', backref='user', lazy=True)
@@ -20,32 +25,73 @@ class Job(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     business_name = db.Column(db.String(100), nullable=False)
     business_phone = db.Column(db.String(20), nullable=False)
+    phone_e164 = db.Column(db.String(20), index=True)  # Normalised phone for webhook lookups
     job_type = db.Column(db.String(50))
     url = db.Column(db.String(200))
     street = db.Column(db.String(100))
     suburb = db.Column(db.String(50))
     state = db.Column(db.String(20))
     postcode = db.Column(db.String(10))
+    latitude = db.Column(db.Float)  # Postcode centroid, geocoded when the job is stored
+    longitude = db.Column(db.Float)
+    geo_band = db.Column(db.Integer)  # Latitude band for proximity searches, see utils/job_location.py
     status = db.Column(db.String(20), default='pending')  # pending, contacted, interview, rejected, hired
+    search_id = db.Column(db.String(200), index=True)  # Slug of the search that imported the job
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)  # User data_version of the last change, set by triggers
     
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
     # Relationships
-    conversation = db.relationship('Conversation', backref='job', lazy=True, uselist=False)
+    # Deleting a job deletes its conversation and messages in the database (ON DELETE CASCADE)
+    conversation = db.relationship('Conversation', backref='job', lazy=True, uselist=False,
+                                   cascade='all, delete', passive_deletes=True)
+    
+    __table_args__ = (
+        # A user has one job per business; also serves every per-user job query and the name sorts
+        db.Index('uq_job_user_id_business_name_business_phone', 'user_id', 'business_name', 'business_phone',
+                 unique=True),
+        db.Index('ix_job_user_id_created_at', 'user_id', 'created_at', 'id'),
+        # Proximity searches: a longitude range within each latitude band
+        db.Index('ix_job_user_id_geo_band', 'user_id', 'geo_band', 'longitude', 'latitude'),
+        # Delta sync: the jobs changed since a cursor
+        db.Index('ix_job_user_id_sync_version', 'user_id', 'sync_version'),
+    )
     
 class Conversation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_message_time = db.Column(db.DateTime, default=datetime.utcnow)
+    last_message_id = db.Column(db.Integer)  # Denormalised so conversation lists need no message query
+    last_message_text = db.Column(db.String(500))
+    unread_count = db.Column(db.Integer, nullable=False, default=0)  # Received messages not yet viewed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    sync_version = db.Column(db.Integer)  # User data_version of the last change, set by triggers
     
     # Foreign keys
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), nullable=False)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), nullable=False,
+                       unique=True, index=True)  # One conversation per job
     
     # Relationships
-    messages = db.relationship('Message', backref='conversation', lazy=True, order_by='Message.timestamp')
+    messages = db.relationship('Message', backref='conversation', lazy=True, order_by='Message.timestamp',
+                               cascade='all, delete', passive_deletes=True)
+    
+    __table_args__ = (
+        # Conversation lists, most recently active first
+        db.Index('ix_conversation_user_id_last_message_time', 'user_id', 'last_message_time', 'id'),
+        db.Index('ix_conversation_user_id_sync_version', 'user_id', 'sync_version'),
+    )
+    
+    def apply_message(self, message):
+        """Update the last-message summary for a message that has been flushed."""
+        self.last_message_time = message.timestamp or datetime.utcnow()
+        self.last_message_id = message.id
+        self.last_message_text = message.text
+        if not message.is_from_user:
+            self.unread_count = (self.unread_count or 0) + 1
 
 class Message(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -55,4 +101,98 @@ class Message(db.Model):
     twilio_sid = db.Column(db.String(50))  # Twilio message ID for tracking
     
     # Foreign key
-    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), nullable=False) 
\ No newline at end of file
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id', ondelete='CASCADE'), nullable=False)
+    
+    __table_args__ = (
+        # Messages are paged by id within a conversation
+        db.Index('ix_message_conversation_id_id', 'conversation_id', 'id'),
+    )
+
+# Jobs and conversations deleted, kept for a while so delta sync clients hear of
+# the deletion (utils/sync.py). Written by the delete triggers in utils/data_versions.py.
+class Tombstone(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # job or conversation
+    row_id = db.Column(db.Integer, nullable=False)  # Id of the deleted row
+    sync_version = db.Column(db.Integer, nullable=False)  # User data_version the deletion bumped it to
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Foreign key
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_tombstone_user_id_kind_sync_version', 'user_id', 'kind', 'sync_version'),
+    )
+
+# Per-user notifications streamed to clients over /api/events (server-sent events)
+class Event(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. search.progress, message.received
+    payload = db.Column(db.Text, nullable=False)  # JSON encoded
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Foreign key
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_event_user_id_id', 'user_id', 'id'),
+    )
+
+# Queued and running LocalSearch crawls, shared by every worker process
+class SearchJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    search_id = db.Column(db.String(200), nullable=False)  # what_where_state slug shown to clients
+    query_key = db.Column(db.String(300), index=True)  # Normalised what|where|state shared by identical searches
+    what = db.Column(db.String(100), nullable=False)
+    where = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, error
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(500))
+    results_count = db.Column(db.Integer, nullable=False, default=0)
+    jobs_imported = db.Column(db.Integer)
+    jobs_updated = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, nullable=False, default=0)  # Times claimed by a worker
+    worker_id = db.Column(db.String(100))  # host:pid:thread of the worker running it
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed while running; stale rows are re-queued
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    
+    # Foreign keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    saved_search_id = db.Column(db.Integer, db.ForeignKey('saved_search.id'), index=True)  # Set for scheduled incremental re-crawls
+    
+    __table_args__ = (
+        db.Index('ix_search_job_status_created_at', 'status', 'created_at'),
+        db.Index('ix_search_job_user_id_search_id', 'user_id', 'search_id'),
+    )
+
+# Businesses found by a recent crawl, reused by identical searches from any user
+class CrawlResult(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    query_key = db.Column(db.String(300), unique=True, nullable=False)  # Normalised what|where|state
+    results = db.Column(db.Text, nullable=False)  # JSON list of classified businesses
+    results_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+# Searches re-crawled on a schedule to pick up new and changed businesses
+class SavedSearch(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    what = db.Column(db.String(100), nullable=False)
+    where = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(20), nullable=False)
+    interval_hours = db.Column(db.Integer, nullable=False, default=24)
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    last_run_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Foreign key
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+
+# Schema migrations applied to this database (see utils/schema.py)
+class SchemaMigration(db.Model):
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
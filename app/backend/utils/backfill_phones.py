@@ -0,0 +1,60 @@
+import os
+import sys
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..')))
+
+from sqlalchemy import update
+
+from extensions import db
+from models.models import Job
+from ClientContactDataFetcher.phone_numbers import to_e164
+
+def backfill_job_phones(batch_size=500):
+    """
+    Fill Job.phone_e164 for rows imported before the column existed.
+
+    Args:
+        batch_size (int): Number of rows to normalise and write per batch
+
+    Returns:
+        int: Number of jobs updated
+    """
+    updated = 0
+    last_id = 0
+
+    while True:
+        # Walk the table in primary key order so each batch is an index range scan
+        rows = db.session.query(Job.id, Job.business_phone).filter(
+            Job.phone_e164.is_(None),
+            Job.id > last_id
+        ).order_by(Job.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        last_id = rows[-1].id
+        changes = [
+            {'id': row.id, 'phone_e164': to_e164(row.business_phone)}
+            for row in rows
+        ]
+        changes = [change for change in changes if change['phone_e164']]
+        if changes:
+            db.session.execute(update(Job), changes)
+            db.session.commit()
+            updated += len(changes)
+
+    return updated
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Normalise stored job phone numbers to E.164.')
+    parser.add_argument('--batch-size', type=int, default=500, help='Rows to update per batch')
+
+    args = parser.parse_args()
+
+    from app import create_app
+    app = create_app(start_workers=False)
+
+    with app.app_context():
+        count = backfill_job_phones(args.batch_size)
+        print(f"Backfilled E.164 phone numbers for {count} jobs.")
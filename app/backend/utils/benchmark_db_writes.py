@@ -0,0 +1,162 @@
+import os
+import sys
+import time
+import random
+import shutil
+import sqlite3
+import tempfile
+import argparse
+import threading
+from datetime import datetime
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from extensions import db, apply_sqlite_pragmas
+from models.models import User, Job, Conversation
+from utils.job_upsert import upsert_businesses
+from ClientContactDataFetcher.business_record import to_records
+
+def build_database(path, jobs, conversations):
+    """Create the app schema at path with one user's jobs and conversations."""
+    app = create_app(start_workers=False, config={'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    with app.app_context():
+        user = User(email='benchmark@example.com', password='x')
+        db.session.add(user)
+        db.session.commit()
+        upsert_businesses(to_records([{
+            'name': f'Business {index}',
+            'phone': f'04{12000000 + index:08d}',
+            'suburb': 'Cairns',
+            'state': 'QLD',
+            'postcode': '4870',
+            'category': 'Plumbing'
+        } for index in range(jobs)]), user.id)
+        job_ids = [job_id for (job_id,) in db.session.query(Job.id).limit(conversations)]
+        db.session.add_all(Conversation(user_id=user.id, job_id=job_id) for job_id in job_ids)
+        db.session.commit()
+        db.engine.dispose()
+
+def connect(path, tuned):
+    if tuned:
+        connection = sqlite3.connect(path, check_same_thread=False)
+        apply_sqlite_pragmas(connection)
+    else:
+        # What the app used before: the sqlite3 defaults (rollback journal, 5 second lock wait)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        connection.execute('PRAGMA foreign_keys=ON')
+    return connection
+
+def run(path, tuned, writers, writes, readers):
+    """
+    Run writer threads recording received messages (as the Twilio webhook
+    does) while reader threads page through conversations and jobs.
+
+    Returns:
+        dict: Write latencies, locked errors, reads done and elapsed seconds
+    """
+    conversation_ids = [row[0] for row in sqlite3.connect(path).execute('SELECT id FROM conversation')]
+    latencies = []
+    errors = []
+    reads = [0]
+    lock = threading.Lock()
+    writing = threading.Event()
+    writing.set()
+
+    def write():
+        connection = connect(path, tuned)
+        for number in range(writes):
+            conversation_id = random.choice(conversation_ids)
+            now = datetime.utcnow().isoformat(' ')
+            started = time.perf_counter()
+            try:
+                cursor = connection.execute(
+                    'INSERT INTO message (text, is_from_user, timestamp, conversation_id) VALUES (?, 0, ?, ?)',
+                    (f'Reply {number}', now, conversation_id)
+                )
+                connection.execute(
+                    'UPDATE conversation SET last_message_time = ?, last_message_id = ?, last_message_text = ?, '
+                    'unread_count = unread_count + 1 WHERE id = ?',
+                    (now, cursor.lastrowid, f'Reply {number}', conversation_id)
+                )
+                connection.commit()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            except sqlite3.OperationalError as e:
+                connection.rollback()
+                with lock:
+                    errors.append(str(e))
+        connection.close()
+
+    def read():
+        connection = connect(path, tuned)
+        while writing.is_set():
+            try:
+                connection.execute(
+                    'SELECT conversation.*, job.business_name FROM conversation JOIN job ON job.id = conversation.job_id '
+                    'WHERE conversation.user_id = 1 ORDER BY last_message_time DESC, conversation.id DESC LIMIT 50'
+                ).fetchall()
+                # Export-sized read: every job with its conversation
+                connection.execute(
+                    'SELECT job.*, conversation.id FROM job LEFT JOIN conversation ON conversation.job_id = job.id '
+                    'WHERE job.user_id = 1 ORDER BY job.created_at DESC, job.id DESC'
+                ).fetchall()
+                with lock:
+                    reads[0] += 1
+            except sqlite3.OperationalError as e:
+                with lock:
+                    errors.append(str(e))
+        connection.close()
+
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=write) for _ in range(writers)]
+    started = time.perf_counter()
+    for thread in reader_threads + writer_threads:
+        thread.start()
+    for thread in writer_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writing.clear()
+    for thread in reader_threads:
+        thread.join()
+
+    return {'latencies': sorted(latencies), 'errors': errors, 'reads': reads[0], 'elapsed': elapsed}
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare concurrent writes to the SQLite database with the old default journal '
+                    'and with WAL mode plus busy timeout (extensions.SQLITE_PRAGMAS).'
+    )
+    parser.add_argument('--writers', type=int, default=8, help='Writer threads')
+    parser.add_argument('--writes', type=int, default=200, help='Messages written per writer')
+    parser.add_argument('--readers', type=int, default=4, help='Reader threads')
+    parser.add_argument('--jobs', type=int, default=5000, help='Jobs in the database')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    try:
+        template = os.path.join(scratch, 'template.db')
+        build_database(template, args.jobs, conversations=200)
+
+        for name, tuned in (('rollback journal', False), ('WAL + busy timeout', True)):
+            path = os.path.join(scratch, f'{"wal" if tuned else "rollback"}.db')
+            shutil.copy(template, path)
+            # The template is in WAL mode (the app set it); switch the copy back for the old behaviour
+            connection = sqlite3.connect(path)
+            connection.execute(f"PRAGMA journal_mode={'WAL' if tuned else 'DELETE'}")
+            connection.close()
+
+            result = run(path, tuned, args.writers, args.writes, args.readers)
+            latencies = result['latencies']
+
+            def percentile(fraction):
+                return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000 if latencies else 0
+
+            print(f"{name}: {len(latencies)}/{args.writers * args.writes} writes in {result['elapsed']:.1f}s "
+                  f"({len(latencies) / result['elapsed']:.0f}/s), {len(result['errors'])} 'database is locked' "
+                  f"errors, write latency p50 {percentile(0.5):.1f} ms p95 {percentile(0.95):.1f} ms "
+                  f"max {percentile(1):.1f} ms, {result['reads'] / result['elapsed']:.1f} reads/s")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
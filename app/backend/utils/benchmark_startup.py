@@ -0,0 +1,113 @@
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Modules an API process must not import while starting. The scrapers run in
+# scrape pool processes; the Twilio REST client and requests load on first use.
+LAZY_MODULES = ('playwright', 'bs4', 'openai', 'twilio.rest', 'requests')
+
+# Started in a fresh interpreter for each run, so nothing is imported yet
+_PROBE = '''
+import sys, time, json
+started = time.perf_counter()
+sys.path.insert(0, {backend!r})
+from app import create_app
+imported = time.perf_counter()
+create_app(start_workers=False, config={{'SQLALCHEMY_DATABASE_URI': {uri!r}}})
+ready = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (ready - imported) * 1000,
+    'modules': sorted(sys.modules)
+}}))
+'''
+
+# "import time:  self [us] | cumulative | <indent>module"
+_IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+def probe(uri, importtime=False):
+    """
+    Start the app against a database in a new Python process.
+
+    Returns:
+        tuple: (dict of import_ms, create_app_ms and the loaded modules,
+                the process's stderr: its log and any -X importtime report)
+    """
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    result = subprocess.run(
+        command + ['-c', _PROBE.format(backend=BACKEND_DIR, uri=uri)],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'App failed to start:\n{result.stderr[-2000:]}')
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+def slowest_imports(report, count):
+    """
+    The modules that took longest to import, counting what they import in
+    turn, from a -X importtime report.
+
+    Returns:
+        list: (milliseconds, module) of the `count` slowest, nested under at most one other
+    """
+    found = []
+    for line in report.splitlines():
+        match = _IMPORT_TIME.match(line)
+        if match and len(match.group(3)) <= 3:
+            found.append((int(match.group(2)) / 1000, match.group(4)))
+    return sorted(found, reverse=True)[:count]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time app imports and create_app() in fresh Python processes against a scratch '
+                    'SQLite database, and fail if startup loads a module that should load on first use '
+                    'or takes longer than the budget.'
+    )
+    parser.add_argument('--runs', type=int, default=5, help='Starts against the existing database to time')
+    parser.add_argument('--max-ms', type=float, default=2000,
+                        help='Budget for the median import and create_app() time, in milliseconds')
+    parser.add_argument('--verbose', action='store_true', help='List the slowest imports')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    try:
+        uri = f"sqlite:///{os.path.join(scratch, 'jobs.db')}"
+        # The first start creates the schema; later ones find it current
+        first, _ = probe(uri)
+        runs = [probe(uri)[0] for _ in range(args.runs)]
+        report = probe(uri, importtime=True)[1] if args.verbose else ''
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    import_ms = statistics.median(run['import_ms'] for run in runs)
+    create_app_ms = statistics.median(run['create_app_ms'] for run in runs)
+    print(f"New database: import {first['import_ms']:.0f} ms, create_app {first['create_app_ms']:.0f} ms")
+    print(f"Current database (median of {args.runs}): import {import_ms:.0f} ms, "
+          f"create_app {create_app_ms:.0f} ms, total {import_ms + create_app_ms:.0f} ms")
+    if args.verbose:
+        for milliseconds, module in slowest_imports(report, 15):
+            print(f'  {milliseconds:7.1f} ms  {module}')
+
+    failed = False
+    loaded = [
+        module for module in LAZY_MODULES
+        if any(name == module or name.startswith(f'{module}.') for name in runs[0]['modules'])
+    ]
+    if loaded:
+        print(f"Loaded at startup: {', '.join(loaded)}")
+        failed = True
+    if import_ms + create_app_ms > args.max_ms:
+        print(f'Startup is over the {args.max_ms:.0f} ms budget')
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
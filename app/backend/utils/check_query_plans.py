@@ -0,0 +1,205 @@
+import os
+import re
+import sys
+import shutil
+import tempfile
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models.models import User
+from utils.job_upsert import upsert_businesses
+from ClientContactDataFetcher.business_record import to_records
+
+# Tables the API may scan in full: table -> why. Keep it empty unless a scan is cheaper than an index
+ALLOWED_SCANS = {}
+
+# Statements worth planning; inserts of literal rows never scan
+_PLANNED = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT INTO \S+ \([^)]*\) SELECT)\b', re.IGNORECASE)
+
+# "SCAN job" is a full scan; "SCAN job USING INDEX ..." walks an index in order
+_FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+def _businesses(count):
+    suburbs = ['Cairns', 'Townsville', 'Mackay', 'Brisbane']
+    categories = ['Plumbing', 'Electrical', 'Cleaning Services', 'Landscaping']
+    return [{
+        'name': f'Business {index}',
+        'phone': f'04{12000000 + index:08d}',
+        'url': f'https://www.localsearch.com.au/profile/business-{index}',
+        'street': f'{index} Main St',
+        'suburb': suburbs[index % len(suburbs)],
+        'state': 'QLD',
+        'postcode': str(4870 + index % len(suburbs)),
+        'category': categories[index % len(categories)]
+    } for index in range(count)]
+
+class QueryRecorder:
+    """Records the SQL statements run while each request is made, by request."""
+
+    def __init__(self, engine):
+        self.label = None
+        self.statements = {}  # statement -> (label, parameters) of its first run
+        event.listen(engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.label is None or not _PLANNED.match(statement):
+            return
+        if executemany:
+            parameters = parameters[0]
+        self.statements.setdefault(statement, (self.label, parameters))
+
+def exercise_api(client, recorder, jobs_per_user):
+    """Make every API request a client can, recording the SQL each one runs."""
+
+    def call(method, url, token=None, **kwargs):
+        recorder.label = f'{method.upper()} {url.split("?")[0]}'
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = getattr(client, method)(url, headers=headers, **kwargs)
+        body = response.get_json(silent=True) if response.mimetype == 'application/json' else response.data
+        recorder.label = None
+        return response.status_code, body
+
+    tokens = []
+    for email in ('first@example.com', 'second@example.com'):
+        call('post', '/auth/register', json={'email': email, 'password': 'password'})
+        tokens.append(call('post', '/auth/login', json={'email': email, 'password': 'password'})[1]['access_token'])
+    token = tokens[0]
+    call('get', '/auth/user', token)
+    call('put', '/auth/user', token, json={'phone_number': '0400000000'})
+
+    # Both users get the same businesses, so incoming SMS match several jobs. The
+    # first gets them as BusinessRecords, as crawls and imports pass them, the
+    # second as plain dictionaries; both must be accepted.
+    first, second = User.query.order_by(User.id).all()
+    upsert_businesses(to_records(_businesses(jobs_per_user)), first.id, search_id='plumbers_cairns_qld')
+    upsert_businesses(_businesses(jobs_per_user), second.id, search_id='plumbers_cairns_qld')
+
+    job_id = call('post', '/api/jobs', token,
+                  json={'business_name': 'Acme Plumbing', 'business_phone': '0411111111'})[1]['job']['id']
+    call('post', '/api/jobs', token, json={'business_name': 'Acme Plumbing', 'business_phone': '0411111111'})  # Duplicate
+    call('put', f'/api/jobs/{job_id}', token, json={'status': 'contacted'})
+
+    page = call('get', '/api/jobs?limit=20', token)[1]
+    jobs, sync_cursor = page['jobs'], page['sync_cursor']
+    for job in jobs[:5]:
+        conversation_id = call('post', f'/api/jobs/{job["id"]}/conversation', token)[1]['conversation']['id']
+    call('post', f'/api/jobs/{jobs[0]["id"]}/conversation', token)
+    for number in range(30):
+        call('post', '/api/twilio_webhook', data={'From': jobs[0]['business_phone'], 'Body': f'Reply {number}'})
+    call('post', f'/api/conversations/{conversation_id}/messages', token, json={'text': 'Hello'})
+
+    for sort in ('newest', 'oldest', 'name', 'name_desc'):
+        cursor = call('get', f'/api/jobs?sort={sort}&limit=10', token)[1]['next_cursor']
+        call('get', f'/api/jobs?sort={sort}&limit=10&cursor={cursor}', token)
+    for args in ('status=pending,contacted', 'job_type=plumb', 'suburb=cairns', 'postcode=4870', 'location=cai',
+                 'phone_prefix=0412', 'has_conversation=true', 'has_conversation=false',
+                 'search_id=plumbers_cairns_qld', 'q=business', 'search=busi', 'search=business cai&sort=name',
+                 'near=4870', 'near=4810&within_km=400&sort=oldest'):
+        call('get', f'/api/jobs?{args}', token)
+    call('get', '/api/jobs/export?format=csv', token)
+    call('get', '/api/jobs/export?format=ndjson&sort=name&status=pending', token)
+    call('get', '/api/jobs/export?search=plumbing', token)
+    call('get', '/api/jobs/export?near=4870&within_km=50', token)
+
+    call('get', f'/api/jobs?since={sync_cursor}&limit=10', token)
+    call('get', f'/api/conversations?since={sync_cursor}', token)
+
+    cursor = call('get', '/api/conversations?limit=2', token)[1]['next_cursor']
+    call('get', f'/api/conversations?limit=2&cursor={cursor}', token)
+    call('get', '/api/conversations/export', token)
+    messages = call('get', f'/api/jobs/{jobs[0]["id"]}/conversation?limit=10', token)[1]['conversation']['messages']
+    call('get', f'/api/jobs/{jobs[0]["id"]}/conversation?since={messages[0]["id"]}', token)
+    conversation_id = call('get', '/api/conversations', token)[1]['conversations'][0]['id']
+    call('get', f'/api/conversations/{conversation_id}/messages?before={messages[0]["id"]}', token)
+    call('get', f'/api/conversations/{conversation_id}/messages?after={messages[0]["id"]}', token)
+
+    call('post', '/api/search-jobs', token, json={'what': 'plumbers', 'where': 'townsville', 'state': 'QLD'})
+    call('get', '/api/search-status', token)
+    call('get', '/api/search-status?search_id=plumbers_townsville_qld', token)
+    call('get', '/api/search-results?search_id=plumbers_townsville_qld', token)
+    saved_id = call('post', '/api/saved-searches', token,
+                    json={'what': 'electricians', 'where': 'cairns', 'state': 'QLD'})[1]['id']
+    call('get', '/api/saved-searches', token)
+    call('put', f'/api/saved-searches/{saved_id}', token, json={'interval_hours': 12})
+    call('post', f'/api/saved-searches/{saved_id}/run', token)
+    call('delete', f'/api/saved-searches/{saved_id}', token)
+    call('get', '/metrics')
+
+    # The event stream never ends; read the retry frame and the first event
+    recorder.label = 'GET /api/events'
+    response = client.get('/api/events?last_event_id=0', headers={'Authorization': f'Bearer {token}'}, buffered=False)
+    frames = iter(response.response)
+    next(frames)
+    next(frames)
+    response.close()
+    recorder.label = None
+
+    job_ids = [job['id'] for job in jobs]
+    call('post', '/api/jobs/bulk', token, json={'action': 'update_status', 'ids': job_ids[5:10], 'status': 'contacted'})
+    call('post', '/api/jobs/bulk', token, json={'action': 'create_conversations', 'filter': {'suburb': 'mackay'}})
+    call('post', '/api/jobs/bulk', token, json={'action': 'update_status', 'filter': {'near': '4871', 'within_km': 5},
+                                                'status': 'interview'})
+    call('post', '/api/jobs/bulk', token, json={'action': 'update_status', 'filter': {'search': 'landscaping'},
+                                                'status': 'rejected'})
+    call('post', '/api/jobs/bulk', token, json={'action': 'delete', 'ids': job_ids[10:15]})
+    call('post', '/api/jobs/bulk', token, json={'action': 'delete', 'filter': {'status': 'contacted'}})
+    call('delete', f'/api/jobs/{jobs[0]["id"]}', token)
+    call('get', f'/api/jobs?since={sync_cursor}', token)
+
+def full_scans(connection, statements):
+    """
+    Plan each recorded statement and find the tables it reads without an index.
+
+    Returns:
+        list: (request, table, statement, plan) for every full scan not in ALLOWED_SCANS
+    """
+    found = []
+    for statement, (label, parameters) in statements.items():
+        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+        details = [row[-1] for row in plan]
+        for detail in details:
+            match = _FULL_SCAN.match(detail)
+            if match and match.group(1) not in ALLOWED_SCANS:
+                found.append((label, match.group(1), statement, details))
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Make every API request against a scratch SQLite database and fail if any query '
+                    'scans a whole table instead of using an index.'
+    )
+    parser.add_argument('--jobs', type=int, default=500, help='Jobs seeded per user')
+    parser.add_argument('--verbose', action='store_true', help='Print the plan of every query')
+    args = parser.parse_args()
+
+    scratch = tempfile.mkdtemp()
+    try:
+        app = create_app(start_workers=False, config={
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(scratch, 'jobs.db')}"
+        })
+        with app.app_context():
+            recorder = QueryRecorder(db.engine)
+            exercise_api(app.test_client(), recorder, args.jobs)
+            with db.engine.connect() as connection:
+                if args.verbose:
+                    for statement, (label, parameters) in recorder.statements.items():
+                        plan = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).fetchall()
+                        print(f"{label}\n  {' '.join(statement.split())}")
+                        for row in plan:
+                            print(f'    {row[-1]}')
+                scans = full_scans(connection, recorder.statements)
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for label, table, statement, details in scans:
+        print(f"{label}: full scan of {table}\n  {' '.join(statement.split())}\n  plan: {'; '.join(details)}")
+    print(f"{len(recorder.statements)} queries checked, {len(scans)} full table scans")
+    return 1 if scans else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
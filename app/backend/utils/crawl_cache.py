@@ -0,0 +1,67 @@
+import os
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models.models import CrawlResult
+from ClientContactDataFetcher.business_record import to_dicts, to_records
+
+logger = logging.getLogger(__name__)
+
+# How long a crawl's businesses are reused by identical searches
+CRAWL_CACHE_TTL = timedelta(seconds=int(os.getenv('CRAWL_CACHE_TTL', '21600')))
+
+def normalise_query(what, where, state):
+    """
+    Key shared by searches that would crawl the same LocalSearch pages.
+
+    Case and surrounding or repeated whitespace are ignored, e.g.
+    ("Plumber ", "cairns", "qld") and ("plumber", "Cairns", "QLD") share a key.
+    """
+    return '|'.join(' '.join(part.split()).lower() for part in (what, where, state))
+
+def get_cached_crawl(query_key):
+    """
+    Businesses from a crawl of the query completed within CRAWL_CACHE_TTL.
+
+    Returns:
+        list: BusinessRecords, or None if there is no fresh crawl
+    """
+    cached = CrawlResult.query.filter(
+        CrawlResult.query_key == query_key,
+        CrawlResult.created_at >= datetime.utcnow() - CRAWL_CACHE_TTL
+    ).first()
+    if cached is None:
+        return None
+    return to_records(json.loads(cached.results))
+
+def store_crawl(query_key, businesses):
+    """Save a completed crawl's businesses, replacing any earlier crawl of the query."""
+    CrawlResult.query.filter(CrawlResult.query_key == query_key).delete(synchronize_session=False)
+    db.session.add(CrawlResult(
+        query_key=query_key,
+        results=json.dumps(to_dicts(businesses)),
+        results_count=len(businesses)
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same query first; its results are as fresh
+        db.session.rollback()
+        logger.info(f"Crawl of {query_key} already cached")
+
+def prune_crawl_cache():
+    """
+    Delete crawls older than CRAWL_CACHE_TTL.
+
+    Returns:
+        int: Number of crawls deleted
+    """
+    deleted = CrawlResult.query.filter(
+        CrawlResult.created_at < datetime.utcnow() - CRAWL_CACHE_TTL
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
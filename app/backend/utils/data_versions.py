@@ -0,0 +1,144 @@
+from sqlalchemy import text
+
+from extensions import db
+
+# Per-user change counters on the user row, bumped by database triggers whenever
+# one of the user's rows changes, so every write path counts: ORM flushes, bulk
+# statements, raw SQL and cascading deletes. Conditional GETs (utils/http_cache.py)
+# build their ETags from them.
+# table -> (counter, user id of a row, columns whose updates count or None for any)
+VERSIONED_TABLES = {
+    'message': ('data_version', '(SELECT user_id FROM conversation WHERE id = {row}.conversation_id)', None),
+    # Worker heartbeats don't change what the search status shows
+    'search_job': ('search_version', '{row}.user_id',
+                   'status, progress, message, results_count, jobs_imported, jobs_updated, attempts, '
+                   'saved_search_id, started_at, completed_at'),
+}
+
+# Tables whose rows also record the data_version of their last change in sync_version,
+# and leave a tombstone when deleted, for delta sync (utils/sync.py).
+# table -> (SQL expression for the job whose has_conversation a change affects or None,
+#           columns whose updates alone don't count as a change)
+SYNCED_TABLES = {
+    'job': (None, ()),
+    # Viewing a conversation resets unread_count (and the ORM stamps updated_at);
+    # that mustn't invalidate every ETag of the user or show up as a sync change
+    'conversation': ('{row}.job_id', ('unread_count', 'updated_at')),
+}
+
+def _counted_columns(table, ignored):
+    # Columns whose updates count, or None when every update does
+    if not ignored:
+        return None
+    return [column.name for column in db.metadata.tables[table].columns
+            if column.name not in ignored and column.name != 'sync_version']
+
+_BUMP = 'UPDATE "user" SET {counter} = {counter} + 1 WHERE id = {user_id}'
+
+def _sqlite_ddl():
+    ddl = []
+    for table, (counter, user_id, columns) in VERSIONED_TABLES.items():
+        for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+            when = f'UPDATE OF {columns}' if event == 'update' and columns else event.upper()
+            ddl += [
+                f'DROP TRIGGER IF EXISTS {table}_{event}_version',
+                f'CREATE TRIGGER {table}_{event}_version AFTER {when} ON {table} BEGIN '
+                f'{_BUMP.format(counter=counter, user_id=user_id.format(row=row))}; END',
+            ]
+
+    for table, (job_id, ignored) in SYNCED_TABLES.items():
+        counted = _counted_columns(table, ignored)
+        for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+            version = f'(SELECT data_version FROM "user" WHERE id = {row}.user_id)'
+            body = [_BUMP.format(counter='data_version', user_id=f'{row}.user_id')]
+            if event == 'delete':
+                body.append(
+                    f"INSERT INTO tombstone (user_id, kind, row_id, sync_version, deleted_at) "
+                    f"VALUES (old.user_id, '{table}', old.id, {version}, CURRENT_TIMESTAMP)"
+                )
+            else:
+                body.append(f'UPDATE {table} SET sync_version = {version} WHERE id = new.id')
+            if job_id:
+                body.append(f'UPDATE job SET sync_version = {version} WHERE id = {job_id.format(row=row)}')
+            # Setting sync_version is itself an update; only count the others
+            when = ' WHEN new.sync_version IS old.sync_version' if event == 'update' else ''
+            if event == 'update' and counted:
+                changed = ' OR '.join(f'new.{column} IS NOT old.{column}' for column in counted)
+                when += f' AND ({changed})'
+            ddl += [
+                f'DROP TRIGGER IF EXISTS {table}_{event}_version',
+                f'CREATE TRIGGER {table}_{event}_version AFTER {event.upper()} ON {table}{when} BEGIN '
+                f"{'; '.join(body)}; END",
+            ]
+    return ddl
+
+def _postgres_ddl():
+    ddl = []
+    for table, (counter, user_id, columns) in VERSIONED_TABLES.items():
+        function = f'{table}_version'
+        bump = f'UPDATE "user" SET {counter} = {counter} + 1 WHERE id = '
+        update = f'UPDATE OF {columns}' if columns else 'UPDATE'
+        ddl += [
+            f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ BEGIN "
+            f"IF TG_OP = 'DELETE' THEN {bump}{user_id.format(row='OLD')}; "
+            f"ELSE {bump}{user_id.format(row='NEW')}; END IF; RETURN NULL; END $$ LANGUAGE plpgsql",
+            f'DROP TRIGGER IF EXISTS {function} ON {table}',
+            f'CREATE TRIGGER {function} AFTER INSERT OR DELETE OR {update} ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {function}()',
+        ]
+
+    # BEFORE triggers, so the new version is written into the row being saved
+    for table, (job_id, ignored) in SYNCED_TABLES.items():
+        counted = _counted_columns(table, ignored)
+        unchanged = ''
+        if counted:
+            new = ', '.join(f'NEW.{column}' for column in counted)
+            old = ', '.join(f'OLD.{column}' for column in counted)
+            unchanged = f' OR ({new}) IS NOT DISTINCT FROM ({old})'
+        function = f'{table}_version'
+        bump = {
+            row: _BUMP.format(counter='data_version', user_id=f'{row}.user_id') + ' RETURNING data_version INTO version'
+            for row in ('OLD', 'NEW')
+        }
+        touch_job = {
+            row: f'UPDATE job SET sync_version = version WHERE id = {job_id.format(row=row)}; ' if job_id else ''
+            for row in ('OLD', 'NEW')
+        }
+        ddl += [
+            f"CREATE OR REPLACE FUNCTION {function}() RETURNS trigger AS $$ DECLARE version integer; BEGIN "
+            f"IF TG_OP = 'DELETE' THEN "
+            f"{bump['OLD']}; "
+            f"INSERT INTO tombstone (user_id, kind, row_id, sync_version, deleted_at) "
+            f"VALUES (OLD.user_id, '{table}', OLD.id, version, now() AT TIME ZONE 'utc'); "
+            f"{touch_job['OLD']}RETURN OLD; END IF; "
+            # Setting sync_version is itself an update; only count the others
+            f"IF TG_OP = 'UPDATE' AND (NEW.sync_version IS DISTINCT FROM OLD.sync_version{unchanged}) "
+            f"THEN RETURN NEW; END IF; "
+            f"{bump['NEW']}; NEW.sync_version := version; "
+            f"{touch_job['NEW']}RETURN NEW; END $$ LANGUAGE plpgsql",
+            f'DROP TRIGGER IF EXISTS {function} ON {table}',
+            f'CREATE TRIGGER {function} BEFORE INSERT OR UPDATE OR DELETE ON {table} '
+            f'FOR EACH ROW EXECUTE FUNCTION {function}()',
+        ]
+    return ddl
+
+def create_version_triggers():
+    """
+    Create the triggers that keep the user change counters, row sync versions
+    and tombstones up to date, replacing any earlier versions of them.
+    """
+    ddl = _postgres_ddl() if db.engine.dialect.name == 'postgresql' else _sqlite_ddl()
+    for statement in ddl:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+def drop_version_triggers():
+    """
+    Drop the triggers create_version_triggers() makes, so a migration can add
+    the columns they use and backfill rows before they are created again.
+    """
+    ddl = _postgres_ddl() if db.engine.dialect.name == 'postgresql' else _sqlite_ddl()
+    for statement in ddl:
+        if statement.startswith('DROP TRIGGER'):
+            db.session.execute(text(statement))
+    db.session.commit()
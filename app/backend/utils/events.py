@@ -0,0 +1,104 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from extensions import db
+from models.models import Event
+
+logger = logging.getLogger(__name__)
+
+# How long events are kept for clients that reconnect with Last-Event-ID
+EVENT_TTL = timedelta(hours=1)
+# Prune expired events after this many publishes
+PRUNE_EVERY = 500
+# Longest a stream waits before re-checking the database. Publishes in this
+# process wake streams immediately; this bounds latency for events published
+# by other worker processes.
+POLL_SECONDS = 2
+# Comment line sent on idle streams so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+# Maximum events sent per database read
+BATCH_SIZE = 100
+
+_new_event = threading.Condition()
+_publish_count = 0
+
+def publish(user_id, kind, payload):
+    """
+    Record an event for a user and wake streams waiting in this process.
+
+    Must be called inside an application context. Commits the current session.
+
+    Args:
+        user_id (int): User to notify
+        kind (str): Event type, sent as the SSE event name
+        payload (dict): JSON-serialisable event data
+    """
+    global _publish_count
+
+    db.session.add(Event(user_id=int(user_id), kind=kind, payload=json.dumps(payload)))
+    db.session.commit()
+
+    _publish_count += 1
+    if _publish_count % PRUNE_EVERY == 0:
+        prune_events()
+
+    with _new_event:
+        _new_event.notify_all()
+
+def prune_events():
+    """Delete events older than EVENT_TTL."""
+    cutoff = datetime.utcnow() - EVENT_TTL
+    deleted = Event.query.filter(Event.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    if deleted:
+        logger.debug(f"Pruned {deleted} expired events")
+
+def _format_event(event):
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {event.payload}\n\n"
+
+def stream_events(user_id, last_event_id=None):
+    """
+    Generate server-sent event frames for a user until the client disconnects.
+
+    Must run inside an application context (use flask.stream_with_context).
+
+    Args:
+        user_id (int): User whose events to stream
+        last_event_id (int): Resume after this event id; None starts from now
+
+    Yields:
+        str: SSE frames
+    """
+    user_id = int(user_id)
+    if last_event_id is None:
+        last_event_id = db.session.query(db.func.max(Event.id)).filter(Event.user_id == user_id).scalar() or 0
+        db.session.rollback()
+
+    # Tell the client how long to wait before reconnecting
+    yield f"retry: {POLL_SECONDS * 1000}\n\n"
+
+    last_sent = time.monotonic()
+    while True:
+        events = db.session.query(Event.id, Event.kind, Event.payload).filter(
+            Event.user_id == user_id,
+            Event.id > last_event_id
+        ).order_by(Event.id).limit(BATCH_SIZE).all()
+        # End the read transaction so the connection goes back to the pool while idle
+        db.session.rollback()
+
+        if events:
+            for event in events:
+                yield _format_event(event)
+            last_event_id = events[-1].id
+            last_sent = time.monotonic()
+            if len(events) == BATCH_SIZE:
+                continue
+        elif time.monotonic() - last_sent >= HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+
+        with _new_event:
+            _new_event.wait(POLL_SECONDS)
@@ -0,0 +1,158 @@
+import io
+import os
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from extensions import db
+from models.models import Job, Conversation, Message
+from utils.job_queries import filter_jobs, job_sort
+
+# Rows fetched from the database per round trip, and written per chunk of the response
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+
+# Export format -> mimetype
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+JOB_EXPORT_FIELDS = ['id', 'business_name', 'business_phone', 'phone_e164', 'job_type', 'url', 'street',
+                     'suburb', 'state', 'postcode', 'status', 'search_id', 'created_at', 'has_conversation']
+
+# One row per message; conversations without messages get one row with empty message fields
+CONVERSATION_EXPORT_FIELDS = ['conversation_id', 'job_id', 'business_name', 'business_phone', 'job_type',
+                              'conversation_created_at', 'message_id', 'is_from_user', 'text', 'timestamp']
+
+# Export fields holding datetimes, written as ISO 8601 like the JSON API
+DATETIME_FIELDS = {'created_at', 'conversation_created_at', 'timestamp'}
+
+def parse_export_format(value):
+    """
+    Validate the format argument of an export request.
+
+    Raises:
+        ValueError: If the format is not one of EXPORT_FORMATS
+    """
+    export_format = (value or 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Invalid format '{value}', expected one of: {', '.join(EXPORT_FORMATS)}")
+    return export_format
+
+def _stream(query):
+    # yield_per streams rows with a server-side cursor instead of buffering the whole result
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+def job_export_rows(user_id, args):
+    """
+    Stream a user's jobs as export rows.
+
+    Args:
+        user_id (int): Owner of the jobs
+        args (dict): Request query arguments; filters and sort as for the job list
+
+    Returns:
+        generator: Tuples of JOB_EXPORT_FIELDS values
+
+    Raises:
+        ValueError: If sort or a filter is invalid (raised before the first row)
+    """
+    column, descending = job_sort(args)
+    query, rank = filter_jobs(select(
+        *[getattr(Job, field) for field in JOB_EXPORT_FIELDS[:-1]],
+        Conversation.id.label('conversation_id')
+    ).outerjoin(Conversation, Conversation.job_id == Job.id), user_id, args, ranked=column is None)
+    if column is None:
+        column = rank
+    if descending:
+        query = query.order_by(column.desc(), Job.id.desc())
+    else:
+        query = query.order_by(column.asc(), Job.id.asc())
+
+    def rows():
+        for row in _stream(query):
+            # The conversation id becomes has_conversation
+            yield tuple(row[:-1]) + (row[-1] is not None,)
+
+    return rows()
+
+def conversation_export_rows(user_id):
+    """
+    Stream a user's conversations and their messages as export rows, one per
+    message, oldest conversation first and messages in order.
+
+    Returns:
+        generator: Rows of CONVERSATION_EXPORT_FIELDS values
+    """
+    query = select(
+        Conversation.id.label('conversation_id'),
+        Job.id.label('job_id'),
+        Job.business_name,
+        Job.business_phone,
+        Job.job_type,
+        Conversation.created_at.label('conversation_created_at'),
+        Message.id.label('message_id'),
+        Message.is_from_user,
+        Message.text,
+        Message.timestamp
+    ).join(
+        Job, Conversation.job_id == Job.id
+    ).outerjoin(
+        Message, Message.conversation_id == Conversation.id
+    ).where(
+        Conversation.user_id == user_id
+    ).order_by(Conversation.id.asc(), Message.id.asc())
+
+    return _stream(query)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+def stream_export(rows, fields, export_format):
+    """
+    Encode export rows as CSV (with a header) or NDJSON, in chunks of
+    EXPORT_BATCH_SIZE rows, for a streamed response.
+
+    Args:
+        rows: Iterable of value sequences, in the order of fields
+        fields (list): Column names
+        export_format (str): 'csv' or 'ndjson'
+
+    Yields:
+        str: Chunks of the encoded export
+    """
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        datetime_columns = [index for index, field in enumerate(fields) if field in DATETIME_FIELDS]
+
+        def write(row):
+            if datetime_columns:
+                row = list(row)
+                for index in datetime_columns:
+                    if row[index] is not None:
+                        row[index] = row[index].isoformat()
+            writer.writerow(row)
+    else:
+        encoder = json.JSONEncoder(default=_json_default)
+
+        def write(row):
+            buffer.write(encoder.encode(dict(zip(fields, row))))
+            buffer.write('\n')
+
+    for count, row in enumerate(rows, 1):
+        write(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
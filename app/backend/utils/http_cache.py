@@ -0,0 +1,92 @@
+import os
+import gzip
+import hashlib
+
+from flask import request, make_response
+
+from extensions import db
+from models.models import User
+
+try:
+    import brotli
+except ImportError:  # Optional; responses fall back to gzip
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compressing them saves too little
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_MIMETYPES = {'application/json', 'text/plain', 'text/html', 'text/csv'}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # Close to gzip's speed with smaller output
+
+def user_etag(user_id, counter):
+    """
+    Weak ETag for a GET built from one of a user's change counters.
+
+    The counter is read before the response is built, so a change made while
+    it is being built gives the next poll a new tag rather than a stale 304.
+
+    Args:
+        user_id (int): User the response is for
+        counter (str): User column counting the changes the response depends on,
+                       'data_version' or 'search_version'
+
+    Returns:
+        str: Tag unique to the user, counter value and request URL
+    """
+    version = db.session.query(getattr(User, counter)).filter(User.id == user_id).scalar()
+    return version_etag(user_id, counter, version)
+
+def version_etag(user_id, counter, version):
+    """
+    The user_etag() for a counter value the caller has already read, so a
+    handler that needs the value itself reads the user row once.
+    """
+    url = hashlib.sha1(f'{user_id} {request.full_path}'.encode()).hexdigest()[:16]
+    return f'{counter}-{version}-{url}'
+
+def _cache_headers(response, etag):
+    response.set_etag(etag, weak=True)
+    # Browsers keep the body but revalidate it on every request
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def not_modified(etag):
+    """
+    The 304 Not Modified response when the request's If-None-Match has the tag.
+
+    Returns:
+        Response, or None if the client's copy is out of date (or it has none)
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    return _cache_headers(make_response('', 304), etag)
+
+def with_etag(response, etag):
+    """Tag a response so the client can revalidate it with If-None-Match."""
+    return _cache_headers(response, etag)
+
+def compress_response(response):
+    """
+    after_request hook compressing large text and JSON bodies with brotli (when
+    installed) or gzip, whichever the client accepts.
+
+    Streamed responses (exports, the event stream) are left alone so they
+    keep flowing chunk by chunk.
+    """
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESS_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(data, GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -1,67 +1,89 @@
 import csv
 import os
 import sys
+import time
 import argparse
 from flask import Flask
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from app import create_app, db
-from models.models import Job, User
+from app import create_app
+from models.models import User
+from utils.job_upsert import upsert_businesses
+from ClientContactDataFetcher.lead_merge import normalise_lead, merge_leads
+from ClientContactDataFetcher.lead_store import LeadStore, csv_source
+
+def read_csv_rows(csv_file):
+    """Read business rows from a fetcher's CSV file as normalised leads with a name and phone."""
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        source = csv_source(reader.fieldnames)
+        leads = [normalise_lead(row, source) for row in reader]
+    return [lead for lead in leads if lead['name'] and lead['phone']]
+
+def collect_csv_files(path):
+    """Return the CSV files at a path: the file itself, or every CSV in a directory."""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith('.csv')
+        )
+    return [path]
+
+def read_store_rows(trade=None, area=None):
+    """Read the latest leads matching a trade and area from the lead store as normalised leads."""
+    leads = [normalise_lead(dict(row), row['source']) for row in LeadStore().query(trade=trade, area=area)]
+    return [lead for lead in leads if lead['name'] and lead['phone']]
+
+def import_jobs_from_csv(csv_path, user_id, trade=None, area=None):
+    """
+    Import jobs into the database from a CSV file, a directory of CSV files,
+    or (with no csv_path) the lead store filtered by trade and area.
+    """
+    app = create_app(start_workers=False)
 
-def import_jobs_from_csv(csv_file, user_id):
-    """Import jobs from a CSV file into the database."""
-    app = create_app()
-    
     with app.app_context():
         # Check if user exists
         user = User.query.get(user_id)
         if not user:
             print(f"Error: User with ID {user_id} not found.")
             return
-        
-        # Read CSV file
-        jobs_added = 0
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Check if job already exists based on business name and phone
-                existing_job = Job.query.filter_by(
-                    business_name=row['name'], 
-                    business_phone=row['phone'],
-                    user_id=user_id
-                ).first()
-                
-                if not existing_job:
-                    # Create new job
-                    new_job = Job(
-                        business_name=row['name'],
-                        business_phone=row['phone'],
-                        url=row.get('url', ''),
-                        street=row.get('street', ''),
-                        suburb=row.get('suburb', ''),
-                        state=row.get('state', ''),
-                        postcode=row.get('postcode', ''),
-                        status='pending',
-                        user_id=user_id
-                    )
-                    
-                    db.session.add(new_job)
-                    jobs_added += 1
-        
-        # Commit changes
-        db.session.commit()
-        print(f"Successfully imported {jobs_added} jobs from {csv_file}.")
+
+        started = time.perf_counter()
+
+        # Read every CSV up front so the whole import is one set-based upsert
+        rows = []
+        if csv_path:
+            csv_files = collect_csv_files(csv_path)
+            for csv_file in csv_files:
+                rows.extend(read_csv_rows(csv_file))
+            source = f"{len(csv_files)} file(s) in {csv_path}"
+        else:
+            rows = read_store_rows(trade, area)
+            source = "the lead store"
+
+        # The same business often appears in several files and sources
+        leads = merge_leads(rows)
+
+        jobs_added, jobs_updated = upsert_businesses(leads, user_id, update_existing=False)
+
+        elapsed = time.perf_counter() - started
+        print(f"Successfully imported {jobs_added} jobs from {source} "
+              f"({jobs_updated} updated, {len(rows)} rows read, {len(rows) - len(leads)} duplicates merged, "
+              f"{elapsed:.3f}s).")
+        return jobs_added, jobs_updated
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Import jobs from CSV file.')
-    parser.add_argument('csv_file', help='Path to CSV file')
+    parser.add_argument('csv_file', nargs='?', help='Path to CSV file or directory of CSV files')
     parser.add_argument('user_id', type=int, help='User ID to associate with the jobs')
-    
+    parser.add_argument('--trade', help='Without a CSV file: import lead store leads in this trade')
+    parser.add_argument('--area', help='Without a CSV file: import lead store leads in this area')
+
     args = parser.parse_args()
-    
+
     # Validate CSV file
-    if not os.path.exists(args.csv_file):
+    if args.csv_file and not os.path.exists(args.csv_file):
         print(f"Error: CSV file {args.csv_file} not found.")
         sys.exit(1)
-    
-    import_jobs_from_csv(args.csv_file, args.user_id) 
\ No newline at end of file
+
+    import_jobs_from_csv(args.csv_file, args.user_id, args.trade, args.area)
@@ -0,0 +1,21 @@
+import os
+import sys
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app
+from utils.schema import MIGRATIONS
+
+def main():
+    argparse.ArgumentParser(
+        description='Create the database tables and apply pending migrations. Run once per deploy, '
+                    'before starting the server processes, so they find the schema current and start '
+                    'without touching it.'
+    ).parse_args()
+
+    # create_app prepares the schema whenever it is behind
+    create_app(start_workers=False)
+    print(f"Database schema is current (migration {MIGRATIONS[-1][0]})")
+
+if __name__ == '__main__':
+    main()
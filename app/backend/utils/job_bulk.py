@@ -0,0 +1,111 @@
+from datetime import datetime
+
+from sqlalchemy import select, update, delete, insert, exists, func, literal, DateTime, Integer
+
+from extensions import db
+from models.models import Job, Conversation
+from utils.job_queries import job_filter_criteria, JOB_FILTERS
+
+# Statuses a job can be set to
+JOB_STATUSES = ('pending', 'contacted', 'interview', 'rejected', 'hired')
+
+# Most ids accepted in one request; select larger sets with a filter instead
+BULK_MAX_IDS = 5000
+
+BULK_ACTIONS = ('update_status', 'delete', 'create_conversations')
+
+def bulk_job_criteria(user_id, data):
+    """
+    Criteria selecting the jobs a bulk request applies to.
+
+    The request body names jobs either by "ids" (a list of job ids) or by
+    "filter" (an object with the same filters as GET /api/jobs; only an
+    explicit {} selects every job). Unknown filter names and null values are
+    refused rather than ignored, so a typo can't widen the selection to every
+    job. Jobs of other users are never selected.
+
+    Args:
+        user_id (int): Owner of the jobs
+        data (dict): Request body
+
+    Returns:
+        list: SQLAlchemy criteria on Job
+
+    Raises:
+        ValueError: If neither or both of ids and filter are given, or they are invalid
+    """
+    ids = data.get('ids')
+    job_filter = data.get('filter')
+    if (ids is None) == (job_filter is None):
+        raise ValueError('Give either ids or filter')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(job_id, int) and not isinstance(job_id, bool) for job_id in ids):
+            raise ValueError('ids must be a list of job ids')
+        if len(ids) > BULK_MAX_IDS:
+            raise ValueError(f'At most {BULK_MAX_IDS} ids per request; use a filter for more')
+        return [Job.user_id == user_id, Job.id.in_(ids)]
+
+    if not isinstance(job_filter, dict):
+        raise ValueError('filter must be an object of job list filters')
+    unknown = sorted(key for key in job_filter if key not in JOB_FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown filter {', '.join(unknown)}, expected any of: {', '.join(JOB_FILTERS)}")
+    invalid = sorted(key for key, value in job_filter.items() if not isinstance(value, (str, int, float, bool)))
+    if invalid:
+        raise ValueError(f"Filter {', '.join(invalid)} must be a string, number or boolean")
+    # Filter values arrive as JSON; the job list reads them as query strings
+    return job_filter_criteria(user_id, {key: str(value) for key, value in job_filter.items()})
+
+def bulk_update_status(criteria, status):
+    """
+    Set the status of every selected job in one UPDATE.
+
+    Returns:
+        int: Number of jobs updated
+    """
+    if status not in JOB_STATUSES:
+        raise ValueError(f"Invalid status '{status}', expected one of: {', '.join(JOB_STATUSES)}")
+    result = db.session.execute(
+        update(Job).where(*criteria).values(status=status).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def bulk_delete(criteria):
+    """
+    Delete every selected job in one DELETE.
+
+    Conversations and their messages go with them through the ON DELETE
+    CASCADE foreign keys.
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    result = db.session.execute(
+        delete(Job).where(*criteria).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount
+
+def bulk_create_conversations(criteria):
+    """
+    Create a conversation for every selected job that has none, in one INSERT ... SELECT.
+
+    Returns:
+        tuple: (number of conversations created, number of selected jobs)
+    """
+    now = datetime.utcnow()
+    selected = db.session.query(func.count(Job.id)).filter(*criteria).scalar()
+    without_conversation = select(
+        Job.user_id, Job.id, literal(now, DateTime), literal(now, DateTime), literal(0, Integer)
+    ).where(
+        *criteria, ~exists().where(Conversation.job_id == Job.id)
+    )
+    result = db.session.execute(
+        insert(Conversation).from_select(
+            ['user_id', 'job_id', 'created_at', 'last_message_time', 'unread_count'], without_conversation
+        )
+    )
+    db.session.commit()
+    return result.rowcount, selected
@@ -0,0 +1,151 @@
+import os
+import math
+
+from sqlalchemy import text
+
+from extensions import db
+from models.models import Job
+from ClientContactDataFetcher.postcodes import locate
+
+# Height of the latitude bands jobs are indexed by (about 11 km). A proximity
+# search reads the bands its circle crosses and, within each, a longitude range
+# of the (user_id, geo_band, longitude) index: a grid without a cell per square.
+GEO_BAND_DEGREES = 0.1
+
+# Kilometres per degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = 111.195
+
+# Radius used when near is given without within_km, and the largest accepted
+DEFAULT_RADIUS_KM = int(os.getenv('DEFAULT_RADIUS_KM', '25'))
+MAX_RADIUS_KM = int(os.getenv('MAX_RADIUS_KM', '500'))
+
+def geo_band(latitude):
+    """The latitude band index of a latitude, or None if it is None."""
+    if latitude is None:
+        return None
+    return math.floor(latitude / GEO_BAND_DEGREES)
+
+def job_location(postcode=None, suburb=None, state=None):
+    """
+    Job column values placing an address at its postcode centroid.
+
+    Returns:
+        dict: latitude, longitude and geo_band (all None if the address can't be placed)
+    """
+    latitude, longitude = locate(postcode, suburb, state) or (None, None)
+    return {'latitude': latitude, 'longitude': longitude, 'geo_band': geo_band(latitude)}
+
+def search_origin(args):
+    """
+    Centre of a proximity search: the centroid of the near postcode.
+
+    Returns:
+        (latitude, longitude), or None without a near argument
+
+    Raises:
+        ValueError: If the postcode is unknown
+    """
+    near = args.get('near', '').strip()
+    if not near:
+        return None
+    origin = locate(near)
+    if origin is None:
+        raise ValueError(f"Unknown postcode '{near}'")
+    return origin
+
+def _parse_radius(value):
+    if value is None or value == '':
+        return DEFAULT_RADIUS_KM
+    try:
+        radius = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('within_km must be a number')
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise ValueError(f'within_km must be more than 0 and at most {MAX_RADIUS_KM}')
+    return radius
+
+def _squared_distance(origin, latitude, longitude):
+    # Equirectangular approximation in square kilometres: plain arithmetic, so it
+    # runs (and sorts) in any database, and is within 1% of the great-circle
+    # distance out to 300 km
+    scale = KM_PER_DEGREE * math.cos(math.radians(origin[0]))
+    north = (latitude - origin[0]) * KM_PER_DEGREE
+    east = (longitude - origin[1]) * scale
+    return north * north + east * east
+
+def proximity_criteria(args):
+    """
+    Criteria for the jobs within within_km kilometres of the near postcode.
+
+    Args:
+        args (dict): Request query arguments
+
+    Returns:
+        tuple: (list of SQLAlchemy criteria on Job, squared distance in km² to
+                order by), or ([], None) without a near argument
+
+    Raises:
+        ValueError: If the postcode is unknown or within_km is invalid
+    """
+    origin = search_origin(args)
+    if origin is None:
+        return [], None
+    radius = _parse_radius(args.get('within_km'))
+
+    latitude_span = radius / KM_PER_DEGREE
+    longitude_span = latitude_span / max(math.cos(math.radians(origin[0])), 0.01)
+    bands = range(geo_band(origin[0] - latitude_span), geo_band(origin[0] + latitude_span) + 1)
+    squared_distance = _squared_distance(origin, Job.latitude, Job.longitude)
+
+    criteria = [
+        Job.geo_band.in_(list(bands)),
+        Job.longitude.between(origin[1] - longitude_span, origin[1] + longitude_span),
+        squared_distance <= radius * radius
+    ]
+    return criteria, squared_distance
+
+def distance_km(origin, latitude, longitude):
+    """Distance in kilometres from a search origin, as proximity searches measure it."""
+    if latitude is None or longitude is None:
+        return None
+    return math.sqrt(_squared_distance(origin, latitude, longitude))
+
+def geocode_jobs(batch_size=500):
+    """
+    Fill the coordinates of jobs stored without them, from their postcode or suburb.
+
+    Args:
+        batch_size (int): Number of rows to geocode and write per batch
+
+    Returns:
+        int: Number of jobs geocoded
+    """
+    geocoded = 0
+    last_id = 0
+
+    while True:
+        # Walk the table in primary key order so each batch is an index range scan
+        rows = db.session.query(Job.id, Job.postcode, Job.suburb, Job.state).filter(
+            Job.latitude.is_(None),
+            Job.id > last_id
+        ).order_by(Job.id).limit(batch_size).all()
+
+        if not rows:
+            break
+
+        last_id = rows[-1].id
+        changes = [
+            {'id': row.id, **job_location(row.postcode, row.suburb, row.state)}
+            for row in rows
+        ]
+        changes = [change for change in changes if change['latitude'] is not None]
+        if changes:
+            # Plain SQL rather than the model, which would also set columns
+            # added by later migrations (updated_at)
+            db.session.execute(text(
+                'UPDATE job SET latitude = :latitude, longitude = :longitude, geo_band = :geo_band WHERE id = :id'
+            ), changes)
+            db.session.commit()
+            geocoded += len(changes)
+
+    return geocoded
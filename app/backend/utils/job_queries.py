@@ -0,0 +1,218 @@
+from sqlalchemy import and_, or_, func, exists, select
+
+from extensions import db
+from models.models import Job, Conversation
+from utils.job_search import matching_jobs
+from utils.job_location import proximity_criteria
+from utils.pagination import parse_limit, encode_cursor, decode_cursor
+
+# Sort options for job lists: name -> (column, descending). relevance orders
+# the matches of a full-text search by rank, best first; distance orders the
+# jobs of a proximity search nearest first.
+JOB_SORTS = {
+    'newest': (Job.created_at, True),
+    'oldest': (Job.created_at, False),
+    'name': (Job.business_name, False),
+    'name_desc': (Job.business_name, True),
+    'relevance': (None, False),
+    'distance': (None, False),
+}
+
+# Filter arguments read by job_filter_criteria
+JOB_FILTERS = ('status', 'job_type', 'suburb', 'postcode', 'location', 'phone_prefix', 'has_conversation',
+               'search_id', 'q', 'search', 'near', 'within_km')
+
+def _contains(column, value):
+    # Case-insensitive substring match that treats % and _ in user input literally
+    return func.lower(column).contains(value.lower(), autoescape=True)
+
+def _sort_name(args):
+    # Proximity searches default to nearest first, text searches to best match first
+    if args.get('sort'):
+        return args['sort']
+    if args.get('near', '').strip():
+        return 'distance'
+    if args.get('search', '').strip():
+        return 'relevance'
+    return 'newest'
+
+def job_filter_criteria(user_id, args, search=True):
+    """
+    Build SQL filter criteria for a user's jobs from request arguments.
+
+    Supported arguments: status (comma separated), job_type, suburb, postcode,
+    location (suburb, state or postcode), phone_prefix, has_conversation
+    (true/false), search_id (jobs imported by that search), q (text query
+    over name, phone, job type and suburb), search (full-text search over
+    name, job type, street, suburb and postcode, matching word prefixes) and
+    near (a postcode) with within_km (jobs within that many kilometres of it).
+
+    Args:
+        user_id (int): Owner of the jobs
+        args (dict): Request query arguments
+        search (bool): Include the search argument; filter_jobs joins it instead
+
+    Returns:
+        list: SQLAlchemy criteria to pass to filter()
+    """
+    criteria = [Job.user_id == user_id]
+
+    status = args.get('status', '').strip()
+    if status:
+        criteria.append(Job.status.in_([s.strip() for s in status.split(',') if s.strip()]))
+
+    job_type = args.get('job_type', '').strip()
+    if job_type:
+        criteria.append(_contains(Job.job_type, job_type))
+
+    suburb = args.get('suburb', '').strip()
+    if suburb:
+        criteria.append(func.lower(Job.suburb) == suburb.lower())
+
+    postcode = args.get('postcode', '').strip()
+    if postcode:
+        criteria.append(Job.postcode == postcode)
+
+    location = args.get('location', '').strip()
+    if location:
+        criteria.append(or_(
+            _contains(Job.suburb, location),
+            _contains(Job.state, location),
+            Job.postcode.startswith(location, autoescape=True)
+        ))
+
+    phone_prefix = args.get('phone_prefix', '').strip()
+    if phone_prefix:
+        criteria.append(Job.business_phone.startswith(phone_prefix, autoescape=True))
+
+    has_conversation = args.get('has_conversation', '').strip().lower()
+    if has_conversation in ('true', '1', 'false', '0'):
+        conversation_exists = exists().where(Conversation.job_id == Job.id).correlate(Job)
+        criteria.append(conversation_exists if has_conversation in ('true', '1') else ~conversation_exists)
+
+    search_id = args.get('search_id', '').strip()
+    if search_id:
+        criteria.append(Job.search_id == search_id)
+
+    q = args.get('q', '').strip()
+    if q:
+        criteria.append(or_(
+            _contains(Job.business_name, q),
+            Job.business_phone.contains(q, autoescape=True),
+            _contains(Job.job_type, q),
+            _contains(Job.suburb, q)
+        ))
+
+    search_text = args.get('search', '').strip()
+    if search and search_text:
+        criteria.append(Job.id.in_(select(matching_jobs(search_text).c.job_id)))
+
+    criteria.extend(proximity_criteria(args)[0])
+
+    return criteria
+
+def filter_jobs(query, user_id, args, ranked=False):
+    """
+    Restrict a query over Job to a user's jobs matching request arguments.
+
+    A search argument joins the full-text matches rather than filtering with
+    IN, so the query is driven from the search index instead of visiting every
+    one of the user's jobs.
+
+    Args:
+        query: ORM query or select() over Job
+        user_id (int): Owner of the jobs
+        args (dict): Request query arguments; filters as for job_filter_criteria
+        ranked (bool): Also return the column the relevance or distance sort orders by
+
+    Returns:
+        tuple: (filtered query, rank column if ranked, else None)
+    """
+    rank = None
+    sort = _sort_name(args)
+    search = args.get('search', '').strip()
+    if search:
+        matches = matching_jobs(search, ranked=ranked and sort == 'relevance')
+        query = query.join(matches, matches.c.job_id == Job.id)
+        if ranked and sort == 'relevance':
+            rank = matches.c.rank
+    if ranked and sort == 'distance':
+        rank = proximity_criteria(args)[1]
+    return query.filter(*job_filter_criteria(user_id, args, search=False)), rank
+
+def job_sort(args):
+    """
+    The (column, descending) ordering named by the sort argument. By default
+    distance when there is a near argument, else relevance when there is a
+    search argument, otherwise newest. The column is None for relevance and
+    distance; order by the rank from filter_jobs.
+
+    Raises:
+        ValueError: If sort is not one of JOB_SORTS, or is relevance without a
+                    search or distance without near
+    """
+    sort = _sort_name(args)
+    if sort not in JOB_SORTS:
+        raise ValueError(f"Invalid sort '{sort}', expected one of: {', '.join(JOB_SORTS)}")
+    if sort == 'relevance' and not args.get('search', '').strip():
+        raise ValueError('sort=relevance needs a search')
+    if sort == 'distance' and not args.get('near', '').strip():
+        raise ValueError('sort=distance needs near')
+    return JOB_SORTS[sort]
+
+def page_jobs(user_id, args):
+    """
+    Fetch one keyset-paginated page of a user's jobs.
+
+    Args:
+        user_id (int): Owner of the jobs
+        args (dict): Request query arguments; filters as for job_filter_criteria
+                     plus sort, limit and cursor
+
+    Returns:
+        tuple: (list of (Job, conversation_id or None) rows, total matching jobs,
+                cursor for the next page or None)
+
+    Raises:
+        ValueError: If sort, limit or cursor are invalid
+    """
+    column, descending = job_sort(args)
+    limit = parse_limit(args.get('limit'))
+
+    total = filter_jobs(db.session.query(func.count(Job.id)).select_from(Job), user_id, args)[0].scalar()
+
+    # has_conversation comes from the join instead of a lazy load per job
+    query, rank = filter_jobs(
+        db.session.query(Job, Conversation.id).outerjoin(Conversation, Conversation.job_id == Job.id),
+        user_id, args, ranked=column is None
+    )
+    if column is None:
+        column = rank
+    # The sort value is selected again for the cursor, since a rank is not on Job
+    query = query.add_columns(column)
+
+    cursor = args.get('cursor')
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise ValueError('Invalid cursor')
+        last_value, last_id = values
+        if descending:
+            query = query.filter(or_(column < last_value, and_(column == last_value, Job.id < last_id)))
+        else:
+            query = query.filter(or_(column > last_value, and_(column == last_value, Job.id > last_id)))
+
+    if descending:
+        query = query.order_by(column.desc(), Job.id.desc())
+    else:
+        query = query.order_by(column.asc(), Job.id.asc())
+
+    # Fetch one extra row to know whether another page exists
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_job, _, sort_value = rows[-1]
+        next_cursor = encode_cursor([sort_value, last_job.id])
+
+    return [(job, conversation_id) for job, conversation_id, _ in rows], total, next_cursor
@@ -0,0 +1,115 @@
+import re
+
+from sqlalchemy import inspect, select, table, column, func, literal, literal_column, text
+
+from extensions import db
+from models.models import Job
+
+# Job columns in the full-text index and their ranking weights: a word in the business name
+# counts most, then the trade, then the suburb and postcode, then the street
+SEARCH_COLUMNS = [('business_name', 10.0), ('job_type', 5.0), ('street', 1.0), ('suburb', 3.0), ('postcode', 3.0)]
+
+_COLUMN_LIST = ', '.join(name for name, _ in SEARCH_COLUMNS)
+_NEW_VALUES = ', '.join(f'new.{name}' for name, _ in SEARCH_COLUMNS)
+_OLD_VALUES = ', '.join(f'old.{name}' for name, _ in SEARCH_COLUMNS)
+
+# SQLite: an FTS5 index that reads its text from the job table (external content). Triggers keep
+# it in step with every write, including executemany upserts, bulk SQL and cascading deletes.
+# prefix='2 3' adds prefix indexes so short search-as-you-type prefixes stay fast.
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS job_search USING fts5({_COLUMN_LIST}, content='job', "
+    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER IF NOT EXISTS job_search_insert AFTER INSERT ON job BEGIN "
+    f"INSERT INTO job_search (rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS job_search_delete AFTER DELETE ON job BEGIN "
+    f"INSERT INTO job_search (job_search, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS job_search_update AFTER UPDATE OF {_COLUMN_LIST} ON job BEGIN "
+    f"INSERT INTO job_search (job_search, rowid, {_COLUMN_LIST}) VALUES ('delete', old.id, {_OLD_VALUES}); "
+    f"INSERT INTO job_search (rowid, {_COLUMN_LIST}) VALUES (new.id, {_NEW_VALUES}); END",
+]
+
+# PostgreSQL: a generated tsvector column, which the database keeps up to date itself, with a
+# GIN index. The 'simple' configuration matches words as typed, without stemming, like FTS5.
+POSTGRES_DDL = [
+    "ALTER TABLE job ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(business_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(job_type, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(suburb, '') || ' ' || coalesce(postcode, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(street, '')), 'D')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_job_search_vector ON job USING GIN (search_vector)",
+]
+
+_job_search = table('job_search', column('rowid'))
+
+# Letters and digits; everything else separates words, as in both indexes
+_WORD = re.compile(r'[^\W_]+')
+
+def create_job_search_index():
+    """
+    Create the full-text index over jobs if it is missing, filling it from the existing jobs.
+
+    Returns:
+        bool: Whether the index was created
+    """
+    if db.engine.dialect.name == 'postgresql':
+        if 'search_vector' in {column['name'] for column in inspect(db.engine).get_columns('job')}:
+            return False
+        for ddl in POSTGRES_DDL:
+            db.session.execute(text(ddl))
+        db.session.commit()
+        return True
+
+    if 'job_search' in inspect(db.engine).get_table_names():
+        return False
+    for ddl in SQLITE_DDL:
+        db.session.execute(text(ddl))
+    db.session.execute(text("INSERT INTO job_search (job_search) VALUES ('rebuild')"))
+    db.session.commit()
+    return True
+
+def search_terms(search):
+    """
+    Words of a search, lower-cased.
+
+    Raises:
+        ValueError: If the search has no letters or digits
+    """
+    terms = [word.lower() for word in _WORD.findall(search)]
+    if not terms:
+        raise ValueError('search must contain letters or digits')
+    return terms
+
+def matching_jobs(search, ranked=False):
+    """
+    Subquery of the jobs matching a full-text search.
+
+    Every word of the search must begin a word in the business name, job type,
+    street, suburb or postcode ("plumb cai" matches a plumber in Cairns).
+
+    Args:
+        search (str): Words to search for
+        ranked (bool): Also select a rank column; lower is a better match
+
+    Returns:
+        Subquery with a job_id column (and rank if ranked)
+
+    Raises:
+        ValueError: If the search has no letters or digits
+    """
+    terms = search_terms(search)
+
+    if db.engine.dialect.name == 'postgresql':
+        query = func.to_tsquery('simple', ' & '.join(f'{term}:*' for term in terms))
+        vector = literal_column('job.search_vector')
+        columns = [Job.id.label('job_id')]
+        if ranked:
+            columns.append((-func.ts_rank(vector, query)).label('rank'))
+        return select(*columns).where(vector.op('@@')(query)).subquery('search_match')
+
+    fts = literal_column('job_search')
+    columns = [_job_search.c.rowid.label('job_id')]
+    if ranked:
+        # bm25 is negative, more so for better matches
+        columns.append(func.bm25(fts, *[literal(weight) for _, weight in SEARCH_COLUMNS]).label('rank'))
+    expression = ' '.join(f'"{term}"*' for term in terms)
+    return select(*columns).select_from(_job_search).where(fts.op('MATCH')(expression)).subquery('search_match')
@@ -0,0 +1,189 @@
+from sqlalchemy import update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models.models import Job
+from utils.job_location import job_location
+from ClientContactDataFetcher.phone_numbers import add_e164
+from ClientContactDataFetcher.business_keys import business_keys, business_fingerprint
+
+# Rows per executemany batch. Keeps statements well under SQLite's variable limit.
+CHUNK_SIZE = 500
+
+# Columns of uq_job_user_id_business_name_business_phone: one job per business for each user
+JOB_KEY = ('user_id', 'business_name', 'business_phone')
+
+def _insert_new_jobs():
+    # Rows another writer (a concurrent import or search for the same user)
+    # inserted since the existing keys were read are skipped, not an IntegrityError
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(Job.__table__).on_conflict_do_nothing(index_elements=list(JOB_KEY))
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def upsert_businesses(businesses, user_id, update_existing=True, search_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Insert or update a batch of businesses as jobs for a user using set-based writes.
+
+    Existing (business_name, business_phone) keys for the user are fetched in a
+    single query; new jobs are inserted and changed jobs updated with chunked
+    executemany statements, then committed once. New jobs that another writer
+    inserts in the meantime are left as that writer stored them.
+
+    Args:
+        businesses (list): BusinessRecords or business dictionaries (name, phone,
+                           url, street, suburb, state, postcode and optionally category)
+        user_id (int): User ID to associate with the jobs
+        update_existing (bool): Whether to refresh the category of existing jobs
+        search_id (str): Slug of the search the businesses came from, recorded
+                         on inserted jobs
+        chunk_size (int): Rows per executemany batch
+
+    Returns:
+        tuple: (number of jobs inserted, number of jobs updated)
+    """
+    # Normalise phone numbers once for the whole batch
+    add_e164(businesses)
+
+    # Collapse duplicates within the batch, last one wins
+    incoming = {}
+    for business in businesses:
+        incoming[(business['name'], business['phone'])] = business
+
+    # One query for every existing key of this user
+    existing = {
+        (row.business_name, row.business_phone): row
+        for row in db.session.query(
+            Job.id, Job.business_name, Job.business_phone, Job.job_type, Job.phone_e164
+        ).filter(Job.user_id == user_id)
+    }
+
+    inserts = []
+    updates = []
+    for key, business in incoming.items():
+        row = existing.get(key)
+        if row is None:
+            inserts.append({
+                'business_name': business['name'],
+                'business_phone': business['phone'],
+                'phone_e164': business['phone_e164'],
+                'url': business.get('url', ''),
+                'street': business.get('street', ''),
+                'suburb': business.get('suburb', ''),
+                'state': business.get('state', ''),
+                'postcode': business.get('postcode', ''),
+                # Geocoded into the row, not onto the business: BusinessRecords only hold their FIELDS
+                **job_location(business.get('postcode'), business.get('suburb'), business.get('state')),
+                'job_type': business.get('category') or 'General',
+                'status': 'pending',
+                'search_id': search_id,
+                'user_id': user_id
+            })
+            continue
+
+        if not update_existing:
+            continue
+        # Update classification if changed
+        job_type = business.get('category') or row.job_type
+        if job_type != row.job_type or business['phone_e164'] != row.phone_e164:
+            updates.append({
+                'id': row.id,
+                'job_type': job_type,
+                'phone_e164': business['phone_e164']
+            })
+
+    inserted = 0
+    statement = _insert_new_jobs()
+    for chunk in _chunks(inserts, chunk_size):
+        result = db.session.execute(statement, chunk)
+        # Drivers that can't count an executemany report -1; assume every row was new
+        inserted += result.rowcount if result.rowcount >= 0 else len(chunk)
+    for chunk in _chunks(updates, chunk_size):
+        # Bulk UPDATE by primary key
+        db.session.execute(update(Job), chunk)
+
+    db.session.commit()
+
+    return inserted, len(updates)
+
+def known_business_keys(user_id):
+    """
+    Identity keys and fingerprints of a user's jobs, for incremental crawls.
+
+    Args:
+        user_id (int): Owner of the jobs
+
+    Returns:
+        tuple: (dict of business key -> fingerprint, dict of business key -> job id)
+    """
+    fingerprints = {}
+    job_ids = {}
+    rows = db.session.query(
+        Job.id, Job.business_name, Job.business_phone, Job.url,
+        Job.street, Job.suburb, Job.state, Job.postcode
+    ).filter(Job.user_id == user_id)
+    for row in rows:
+        business = {
+            'name': row.business_name,
+            'phone': row.business_phone,
+            'url': row.url,
+            'street': row.street,
+            'suburb': row.suburb,
+            'state': row.state,
+            'postcode': row.postcode
+        }
+        fingerprint = business_fingerprint(business)
+        for key in business_keys(business):
+            fingerprints.setdefault(key, fingerprint)
+            job_ids.setdefault(key, row.id)
+    return fingerprints, job_ids
+
+def apply_business_changes(businesses, user_id, job_ids, search_id=None, chunk_size=CHUNK_SIZE):
+    """
+    Write the new and changed businesses found by an incremental crawl.
+
+    Businesses matching an existing job by profile URL or phone overwrite its
+    listing fields and category; the rest are inserted as new jobs.
+
+    Args:
+        businesses (list): New or changed business dictionaries
+        user_id (int): Owner of the jobs
+        job_ids (dict): Business key -> job id, from known_business_keys
+        search_id (str): Slug of the search, recorded on inserted jobs
+        chunk_size (int): Rows per executemany batch
+
+    Returns:
+        tuple: (number of jobs inserted, number of jobs updated)
+    """
+    add_e164(businesses)
+
+    new = []
+    updates = {}
+    for business in businesses:
+        job_id = next((job_ids[key] for key in business_keys(business) if key in job_ids), None)
+        if job_id is None:
+            new.append(business)
+            continue
+        updates[job_id] = {
+            'id': job_id,
+            'business_name': business['name'],
+            'business_phone': business['phone'],
+            'phone_e164': business['phone_e164'],
+            'url': business.get('url', ''),
+            'street': business.get('street', ''),
+            'suburb': business.get('suburb', ''),
+            'state': business.get('state', ''),
+            'postcode': business.get('postcode', ''),
+            **job_location(business.get('postcode'), business.get('suburb'), business.get('state')),
+            'job_type': business.get('category') or 'General'
+        }
+
+    rows = list(updates.values())
+    for chunk in _chunks(rows, chunk_size):
+        db.session.execute(update(Job), chunk)
+
+    # Commits the updates along with the inserts
+    inserted, updated = upsert_businesses(new, user_id, search_id=search_id, chunk_size=chunk_size)
+    return inserted, len(rows) + updated
@@ -0,0 +1,51 @@
+from models.models import Message
+from utils.pagination import parse_limit
+
+def _parse_message_id(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a message id')
+
+def page_messages(conversation_id, args):
+    """
+    Fetch one page of a conversation's messages using message ids as cursors.
+
+    Modes, chosen by request arguments:
+        (none)          latest `limit` messages
+        before=<id>     up to `limit` messages older than the given message
+        after=<id>      up to `limit` messages newer than the given message
+        since=<id>      same as after; used by polling clients
+
+    Args:
+        conversation_id (int): Conversation to read
+        args (dict): Request query arguments
+
+    Returns:
+        tuple: (list of Message oldest first, whether more messages exist
+                beyond this page in the direction being paged)
+
+    Raises:
+        ValueError: If limit or cursor arguments are invalid
+    """
+    limit = parse_limit(args.get('limit'))
+    before = args.get('before')
+    after = args.get('after') or args.get('since')
+    if before and after:
+        raise ValueError('Use either before or after/since, not both')
+
+    query = Message.query.filter(Message.conversation_id == conversation_id)
+
+    # Ids increase with insertion order, so they double as a stable time cursor
+    if after:
+        messages = query.filter(
+            Message.id > _parse_message_id(after, 'after')
+        ).order_by(Message.id.asc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        return messages[:limit], has_more
+
+    if before:
+        query = query.filter(Message.id < _parse_message_id(before, 'before'))
+    messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    has_more = len(messages) > limit
+    return list(reversed(messages[:limit])), has_more
@@ -0,0 +1,242 @@
+import time
+import bisect
+import logging
+import threading
+
+# Metrics kept by this process and served at /metrics in the Prometheus text
+# format. Recording one is a lock and a few additions, cheap enough to leave
+# on. Only the standard library is imported at the top: scrape pool processes
+# load this module with utils/scrape_pool.py.
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALL_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_metrics = []
+_collectors = []
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            lines.extend(self._samples(label_values, value))
+        return lines
+
+    def _samples(self, label_values, value):
+        return [f'{self.name}{_labels(self.label_names, label_values)} {_number(value)}']
+
+class Counter(_Metric):
+    """Count that only goes up, e.g. errors. Labels are passed in order."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+class Gauge(_Metric):
+    """Value that is set, e.g. a queue depth, usually by a collector just before rendering."""
+
+    kind = 'gauge'
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    """Counts of observations (e.g. durations in seconds) in cumulative buckets, with their sum."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # Per bucket, then one over the last bucket, then the sum
+                counts = self._values[labels] = [0] * (len(self.buckets) + 1) + [0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def _samples(self, label_values, counts):
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            total += count
+            le = f'le="{bound if bound == "+Inf" else _number(float(bound))}"'
+            lines.append(f'{self.name}_bucket{_labels(self.label_names, label_values, le)} {total}')
+        label_text = _labels(self.label_names, label_values)
+        lines.append(f'{self.name}_sum{label_text} {_number(float(counts[-1]))}')
+        lines.append(f'{self.name}_count{label_text} {total}')
+        return lines
+
+def collector(function):
+    """Register a function run before every render, to set gauges read on demand."""
+    _collectors.append(function)
+    return function
+
+def render():
+    """
+    Every metric of this process in the Prometheus text exposition format.
+
+    A collector that fails is logged and skipped, leaving its gauges at their
+    last values, so one broken source doesn't hide the rest.
+    """
+    for function in _collectors:
+        try:
+            function()
+        except Exception:
+            logger.exception(f'Metrics collector {function.__name__} failed')
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+class ExternalCall:
+    """
+    Context manager timing a call to an outside provider (an LLM or SMS API)
+    into EXTERNAL_CALL_SECONDS, counting it in EXTERNAL_CALL_ERRORS if it
+    raises or the caller marks it failed.
+
+        with ExternalCall('sms', 'twilio') as call:
+            response = send()
+            if not response.ok:
+                call.failed()
+    """
+
+    def __init__(self, kind, provider):
+        self.labels = (kind, provider)
+        self.ok = True
+
+    def failed(self):
+        self.ok = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        EXTERNAL_CALL_SECONDS.observe(time.perf_counter() - self.started, *self.labels)
+        if exc_type is not None or not self.ok:
+            EXTERNAL_CALL_ERRORS.inc(*self.labels)
+        return False
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to build a response, by route.',
+    ('method', 'route', 'status')
+)
+HTTP_REQUEST_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements run while building a response, by route.',
+    ('method', 'route'), QUERY_BUCKETS
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    'external_call_duration_seconds', 'Calls to LLM and SMS providers.',
+    ('kind', 'provider'), CALL_BUCKETS
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    'external_call_errors_total', 'Calls to LLM and SMS providers that failed.', ('kind', 'provider')
+)
+SCRAPE_STAGE_SECONDS = Histogram(
+    'scrape_stage_duration_seconds', 'Steps of the crawls run by this process\'s scrape workers.',
+    ('stage',), STAGE_BUCKETS
+)
+SEARCH_QUEUE_DEPTH = Gauge('search_queue_depth', 'Searches waiting or running, from all processes.', ('status',))
+SCRAPE_WORKERS = Gauge('scrape_workers', 'Scrape processes started by this process.')
+SCRAPE_ACTIVE_BROWSERS = Gauge('scrape_active_browsers', 'Scrape processes running a crawl, each with a browser open.')
+
+@collector
+def _search_queue_depth():
+    from extensions import db
+    from sqlalchemy import func
+    from models.models import SearchJob
+    from utils.search_queue import ACTIVE_STATUSES
+    counts = dict(db.session.query(SearchJob.status, func.count()).filter(
+        SearchJob.status.in_(ACTIVE_STATUSES)
+    ).group_by(SearchJob.status).all())
+    for status in ACTIVE_STATUSES:
+        SEARCH_QUEUE_DEPTH.set(counts.get(status, 0), status)
+
+@collector
+def _scrape_pool():
+    from utils.scrape_pool import scrape_pool
+    workers, busy = scrape_pool.stats()
+    SCRAPE_WORKERS.set(workers)
+    SCRAPE_ACTIVE_BROWSERS.set(busy)
+
+class _RequestState(threading.local):
+    started = None
+    queries = 0
+
+_request = _RequestState()
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    # Search workers and the supervisor count too, but only requests read it
+    _request.queries += 1
+
+def _start_request():
+    _request.started = time.perf_counter()
+    _request.queries = 0
+
+def _finish_request(response):
+    from flask import request
+    if _request.started is not None:
+        # Unmatched URLs share one label so scanners can't add a series per path
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - _request.started,
+                                     request.method, route, response.status_code)
+        HTTP_REQUEST_QUERIES.observe(_request.queries, request.method, route)
+        _request.started = None
+    return response
+
+def _metrics_view():
+    from flask import Response
+    return Response(render(), content_type=CONTENT_TYPE)
+
+def init_metrics(app):
+    """
+    Time the app's requests, count their SQL statements and serve /metrics.
+
+    Streamed responses (exports, the event stream) are timed to their first
+    byte, and the queries run while streaming aren't counted.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    if not event.contains(Engine, 'before_cursor_execute', _count_query):
+        event.listen(Engine, 'before_cursor_execute', _count_query)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.add_url_rule('/metrics', 'metrics', _metrics_view)
@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+
+# Page size limits shared by the list endpoints
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """
+    Parse a page size query parameter.
+
+    Raises:
+        ValueError: If the value is not a positive integer
+    """
+    if value in (None, ''):
+        return default
+    limit = int(value)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
+
+def encode_cursor(values):
+    """
+    Encode the sort key of the last row on a page as an opaque cursor string.
+
+    Args:
+        values: List of the row's sort column values (datetimes, strings, ints)
+
+    Returns:
+        str: URL-safe cursor
+    """
+    payload = [
+        {'dt': value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if not isinstance(payload, list):
+        raise ValueError('Invalid cursor')
+    return [
+        datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+        for value in payload
+    ]
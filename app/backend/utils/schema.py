@@ -0,0 +1,424 @@
+import logging
+
+from sqlalchemy import MetaData, Table, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from extensions import db
+from models.models import SchemaMigration
+from utils.job_search import create_job_search_index
+from utils.job_location import geocode_jobs
+from utils.data_versions import create_version_triggers, drop_version_triggers
+from utils.backfill_phones import backfill_job_phones
+
+logger = logging.getLogger(__name__)
+
+# Columns added after a table was first created. db.create_all() only creates
+# missing tables, so databases created before these columns existed need them
+# added. Each list belongs to one migration: once it has shipped, add new
+# columns in a list of their own rather than here.
+# table -> [(column, DDL type, index name or None, backfill SQL or None)]
+ADDED_COLUMNS = {
+    'job': [
+        ('phone_e164', 'VARCHAR(20)', 'ix_job_phone_e164', None),
+        ('search_id', 'VARCHAR(200)', 'ix_job_search_id', None),
+    ],
+    'conversation': [
+        ('last_message_id', 'INTEGER', None,
+         'UPDATE conversation SET last_message_id = ('
+         'SELECT id FROM message WHERE message.conversation_id = conversation.id '
+         'ORDER BY timestamp DESC, id DESC LIMIT 1)'),
+        ('last_message_text', 'VARCHAR(500)', None,
+         'UPDATE conversation SET last_message_text = ('
+         'SELECT text FROM message WHERE message.id = conversation.last_message_id)'),
+        ('unread_count', 'INTEGER NOT NULL DEFAULT 0', None, None),
+    ],
+    'search_job': [
+        ('query_key', 'VARCHAR(300)', 'ix_search_job_query_key',
+         'UPDATE search_job SET query_key = '
+         "lower(trim(what)) || '|' || lower(trim(\"where\")) || '|' || lower(trim(state))"),
+        ('saved_search_id', 'INTEGER REFERENCES saved_search (id)', None, None),
+    ],
+}
+
+JOB_LOCATION_COLUMNS = {
+    'job': [
+        ('latitude', 'FLOAT', None, None),
+        ('longitude', 'FLOAT', None, None),
+        ('geo_band', 'INTEGER', None, None),
+    ],
+}
+
+CHANGE_COUNTER_COLUMNS = {
+    'user': [
+        ('data_version', 'INTEGER NOT NULL DEFAULT 0', None, None),
+        ('search_version', 'INTEGER NOT NULL DEFAULT 0', None, None),
+    ],
+}
+
+SYNC_VERSION_COLUMNS = {
+    'job': [
+        ('updated_at', 'TIMESTAMP', None, 'UPDATE job SET updated_at = created_at'),
+        ('sync_version', 'INTEGER', None, None),
+    ],
+    'conversation': [
+        ('updated_at', 'TIMESTAMP', None, 'UPDATE conversation SET updated_at = last_message_time'),
+        ('sync_version', 'INTEGER', None, None),
+    ],
+    'user': [
+        ('sync_floor', 'INTEGER NOT NULL DEFAULT 0', None, None),
+    ],
+}
+
+# Foreign keys whose ON DELETE rule was added after the table was first created.
+# table -> [(column, referenced table, ON DELETE rule)]
+CHANGED_FOREIGN_KEYS = {
+    'conversation': [('job_id', 'job', 'CASCADE')],
+    'message': [('conversation_id', 'conversation', 'CASCADE')],
+}
+
+def add_columns(added_columns):
+    """
+    Add the columns of a migration's list that a table doesn't have yet.
+
+    Args:
+        added_columns (dict): table -> [(column, DDL type, index name, backfill SQL)]
+
+    Returns:
+        list: Names of the columns that were added, as "table.column"
+    """
+    inspector = inspect(db.engine)
+    quote = db.engine.dialect.identifier_preparer.quote  # "user" is reserved in PostgreSQL
+    added = []
+
+    for table, columns in added_columns.items():
+        existing = {column['name'] for column in inspector.get_columns(table)}
+        for column, ddl, index_name, backfill_sql in columns:
+            if column in existing:
+                continue
+            logger.info(f"Adding column {table}.{column}")
+            db.session.execute(text(f'ALTER TABLE {quote(table)} ADD COLUMN {column} {ddl}'))
+            if index_name:
+                db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON {quote(table)} ({column})'))
+            if backfill_sql:
+                db.session.execute(text(backfill_sql))
+            added.append(f'{table}.{column}')
+
+    db.session.commit()
+    return added
+
+def upgrade_schema():
+    """
+    Add the columns in ADDED_COLUMNS.
+
+    Returns:
+        list: Names of the columns that were added, as "table.column"
+    """
+    return add_columns(ADDED_COLUMNS)
+
+def _stale_foreign_keys(inspector, table, keys):
+    # (column, referenced table, rule, constraint name) for keys without the wanted ON DELETE rule
+    current = {
+        tuple(fk['constrained_columns']): fk for fk in inspector.get_foreign_keys(table)
+    }
+    stale = []
+    for column, referenced, rule in keys:
+        fk = current.get((column,))
+        ondelete = ((fk or {}).get('options') or {}).get('ondelete') or ''
+        if ondelete.upper() != rule:
+            stale.append((column, referenced, rule, (fk or {}).get('name')))
+    return stale
+
+def _rebuild_sqlite_table(connection, table_name):
+    # SQLite can't alter a foreign key: create the table afresh from the model,
+    # copy the rows across and swap it in (https://www.sqlite.org/lang_altertable.html).
+    # Only the columns it has now are kept; later migrations add (and backfill) the rest.
+    existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    metadata = MetaData()
+    for other in db.metadata.sorted_tables:
+        if other.name != table_name:
+            other.to_metadata(metadata)  # For its foreign keys to refer to
+    table = Table(table_name, metadata, *(
+        column._copy() for column in db.metadata.tables[table_name].columns if column.name in existing
+    ))
+    columns = ', '.join(f'"{column.name}"' for column in table.columns)
+    ddl = str(CreateTable(table).compile(dialect=connection.dialect))
+    connection.exec_driver_sql(ddl.replace(f'CREATE TABLE {table_name} (', f'CREATE TABLE {table_name}_new (', 1))
+    connection.exec_driver_sql(
+        f'INSERT INTO {table_name}_new ({columns}) SELECT {columns} FROM {table_name}'
+    )
+    connection.exec_driver_sql(f'DROP TABLE {table_name}')
+    connection.exec_driver_sql(f'ALTER TABLE {table_name}_new RENAME TO {table_name}')
+    for index in db.metadata.tables[table_name].indexes:
+        if {column.name for column in index.columns} <= existing:
+            index.create(connection, checkfirst=True)
+
+def upgrade_foreign_keys():
+    """
+    Give foreign keys the ON DELETE rules in CHANGED_FOREIGN_KEYS.
+
+    SQLite tables are rebuilt (with foreign key enforcement off while rows are
+    copied); other databases have the constraint dropped and re-added.
+
+    Returns:
+        list: Names of the tables whose foreign keys were changed
+    """
+    inspector = inspect(db.engine)
+    stale = {
+        table: keys for table, keys in (
+            (table, _stale_foreign_keys(inspector, table, keys)) for table, keys in CHANGED_FOREIGN_KEYS.items()
+        ) if keys
+    }
+    if not stale:
+        return []
+
+    with db.engine.connect() as connection:
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            # Only takes effect outside a transaction, so before the first write
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+        for table, keys in stale.items():
+            logger.info(f"Adding ON DELETE rules to foreign keys of {table}")
+            if sqlite:
+                _rebuild_sqlite_table(connection, table)
+                continue
+            for column, referenced, rule, name in keys:
+                name = name or f'{table}_{column}_fkey'
+                if name in {fk.get('name') for fk in inspector.get_foreign_keys(table)}:
+                    connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT {name}'))
+                connection.execute(text(
+                    f'ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({column}) '
+                    f'REFERENCES {referenced} (id) ON DELETE {rule}'
+                ))
+        if sqlite:
+            violations = connection.exec_driver_sql('PRAGMA foreign_key_check').fetchall()
+            if violations:
+                logger.warning(f"{len(violations)} rows reference missing parents: {violations[:10]}")
+        connection.commit()
+        if sqlite:
+            connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+
+    return list(stale)
+
+def _merge_conversation(source_id, target_id):
+    # Move a duplicate conversation's messages and unread count into another, then drop it
+    params = {'source': source_id, 'target': target_id}
+    db.session.execute(text('UPDATE message SET conversation_id = :target WHERE conversation_id = :source'), params)
+    db.session.execute(text(
+        'UPDATE conversation SET unread_count = COALESCE(unread_count, 0) + '
+        '(SELECT COALESCE(unread_count, 0) FROM conversation WHERE id = :source) WHERE id = :target'
+    ), params)
+    db.session.execute(text('DELETE FROM conversation WHERE id = :source'), params)
+
+def _refresh_last_message(conversation_ids):
+    # Recompute the denormalised last-message fields after messages moved between conversations
+    for conversation_id in conversation_ids:
+        last = db.session.execute(text(
+            'SELECT id, text, timestamp FROM message WHERE conversation_id = :id '
+            'ORDER BY timestamp DESC, id DESC LIMIT 1'
+        ), {'id': conversation_id}).first()
+        if last:
+            db.session.execute(text(
+                'UPDATE conversation SET last_message_id = :message_id, last_message_text = :text, '
+                'last_message_time = :timestamp WHERE id = :id'
+            ), {'id': conversation_id, 'message_id': last.id, 'text': last.text, 'timestamp': last.timestamp})
+
+def merge_duplicates():
+    """
+    Merge rows that the unique indexes on job and conversation would reject.
+
+    Older versions could store a business twice for a user, and a job could
+    get two conversations. Each job's conversations are merged into its oldest
+    one, then each user's duplicate jobs into the one with a conversation (or
+    the oldest), moving messages across so none are lost.
+
+    Returns:
+        int: Number of duplicate jobs and conversations removed
+    """
+    removed = 0
+    merged_into = set()
+
+    keep = {}  # job id -> conversation kept
+    for job_id, conversation_id in db.session.execute(text(
+        'SELECT job_id, id FROM conversation WHERE job_id IN '
+        '(SELECT job_id FROM conversation GROUP BY job_id HAVING COUNT(*) > 1) ORDER BY job_id, id'
+    )):
+        if job_id not in keep:
+            keep[job_id] = conversation_id
+            continue
+        _merge_conversation(conversation_id, keep[job_id])
+        merged_into.add(keep[job_id])
+        removed += 1
+
+    keep = {}  # (user_id, business_name, business_phone) -> (job id, conversation id) kept
+    for job_id, user_id, name, phone, conversation_id in db.session.execute(text(
+        'SELECT job.id, job.user_id, job.business_name, job.business_phone, conversation.id FROM job '
+        'JOIN (SELECT user_id, business_name, business_phone FROM job '
+        'GROUP BY user_id, business_name, business_phone HAVING COUNT(*) > 1) AS duplicate '
+        'ON duplicate.user_id = job.user_id AND duplicate.business_name = job.business_name '
+        'AND duplicate.business_phone = job.business_phone '
+        'LEFT JOIN conversation ON conversation.job_id = job.id '
+        'ORDER BY job.user_id, job.business_name, job.business_phone, conversation.id IS NULL, job.id'
+    )).all():
+        key = (user_id, name, phone)
+        if key not in keep:
+            keep[key] = (job_id, conversation_id)
+            continue
+        # Jobs with a conversation sort first, so the kept job has one whenever this one does
+        if conversation_id:
+            _merge_conversation(conversation_id, keep[key][1])
+            merged_into.add(keep[key][1])
+        db.session.execute(text('DELETE FROM job WHERE id = :id'), {'id': job_id})
+        removed += 1
+
+    _refresh_last_message(merged_into)
+    db.session.commit()
+    return removed
+
+def create_missing_indexes():
+    """
+    Create the model indexes missing from tables that already existed.
+
+    Indexes on columns a later migration adds are left for that migration,
+    which calls this again once they exist.
+
+    Returns:
+        list: Names of the indexes created
+    """
+    inspector = inspect(db.engine)
+    created = []
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for index in table.indexes:
+                if index.name not in existing and {column.name for column in index.columns} <= columns:
+                    logger.info(f"Creating index {index.name} on {table.name}")
+                    index.create(connection)
+                    created.append(index.name)
+    return created
+
+def add_job_locations():
+    """
+    Add the job coordinate columns and proximity index, and geocode the jobs
+    stored before them.
+
+    Returns:
+        list: Columns and indexes added, and the number of jobs geocoded
+    """
+    changes = add_columns(JOB_LOCATION_COLUMNS) + create_missing_indexes()
+    geocoded = geocode_jobs()
+    if geocoded:
+        changes.append(f'{geocoded} jobs geocoded')
+    return changes
+
+def add_change_counters():
+    """
+    Add the per-user change counters and the triggers that bump them.
+
+    Returns:
+        list: Columns added, and "triggers"
+    """
+    changes = add_columns(CHANGE_COUNTER_COLUMNS)
+    create_version_triggers()
+    return changes + ['triggers']
+
+def add_sync_versions():
+    """
+    Add the updated_at and sync_version columns of jobs and conversations and
+    their indexes, and replace the change counter triggers with ones that also
+    stamp sync_version and record deletions in tombstone.
+
+    Rows stored before have no sync_version; clients start from a full list,
+    so they only appear in deltas once they change. The triggers from
+    migration 7 already use sync_version, so they are dropped while it is
+    added and the rows are backfilled.
+
+    Returns:
+        list: Columns and indexes added, and "triggers"
+    """
+    drop_version_triggers()
+    changes = add_columns(SYNC_VERSION_COLUMNS) + create_missing_indexes()
+    create_version_triggers()
+    return changes + ['triggers']
+
+def ignore_read_marks():
+    """
+    Replace the change counter triggers with ones that ignore updates to a
+    conversation's unread_count alone, so viewing a conversation keeps the
+    user's ETags and sync cursors current.
+
+    Returns:
+        list: "triggers"
+    """
+    create_version_triggers()
+    return ['triggers']
+
+# Versioned schema migrations, applied in order by migrate() and recorded in the
+# schema_migration table. New databases get the latest schema from db.create_all(),
+# so each migration must leave changes that are already in place alone. Append new
+# migrations at the end; never renumber or change ones that have shipped.
+# [(version, name, function)]
+MIGRATIONS = [
+    (1, 'add columns introduced after the initial schema', upgrade_schema),
+    (2, 'merge duplicate jobs and conversations', merge_duplicates),
+    (3, 'cascade deletes from jobs to conversations and messages', upgrade_foreign_keys),
+    (4, 'hot path indexes and unique jobs and conversations', create_missing_indexes),
+    (5, 'full-text search index over jobs', create_job_search_index),
+    (6, 'job coordinates for proximity search', add_job_locations),
+    (7, 'per-user change counters for conditional requests', add_change_counters),
+    (8, 'row versions and tombstones for delta sync', add_sync_versions),
+    (9, 'leave read marks out of change counters', ignore_read_marks),
+]
+
+def migrate():
+    """
+    Apply the MIGRATIONS this database has not had yet.
+
+    Returns:
+        list: "version name" of each migration applied
+    """
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    done = []
+
+    for version, name, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+        changes = upgrade()
+        if changes:
+            logger.info(f"Migration {version} ({name}): {changes}")
+        db.session.add(SchemaMigration(version=version, name=name))
+        db.session.commit()
+        done.append(f'{version} {name}')
+
+    return done
+
+def schema_is_current():
+    """
+    Whether every migration in MIGRATIONS has been applied, and so every table
+    exists. Once true, startup can skip prepare_database().
+    """
+    if not inspect(db.engine).has_table(SchemaMigration.__tablename__):
+        return False
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+    return applied >= {version for version, _, _ in MIGRATIONS}
+
+def prepare_database():
+    """
+    Create missing tables, apply pending migrations and backfill rows stored by
+    older versions.
+
+    Returns:
+        list: "version name" of each migration applied
+    """
+    logger.info(f"Creating database tables at: {db.engine.url.render_as_string(hide_password=True)}")
+    db.create_all()
+    logger.info("Database tables created successfully")
+
+    # Bring tables created by older versions up to date
+    applied = migrate()
+    if applied:
+        logger.info(f"Applied migrations: {', '.join(applied)}")
+    backfilled = backfill_job_phones()
+    if backfilled:
+        logger.info(f"Backfilled E.164 phone numbers for {backfilled} jobs")
+    return applied
@@ -0,0 +1,299 @@
+import os
+import atexit
+import signal
+import logging
+import importlib
+import threading
+import traceback
+import multiprocessing
+import queue
+
+from utils.metrics import SCRAPE_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Crawler run in the worker processes, as "module:function" with the
+# main(what, where, state, save_results, callback) signature
+SCRAPE_TARGET = os.getenv('SCRAPE_TARGET', 'ClientContactDataFetcher.LocalSearchDataFetcher:main')
+# Scrape processes per server process; one per search queue worker thread
+SCRAPE_WORKERS = int(os.getenv('SEARCH_WORKERS', '2'))
+# A scrape process is replaced after running this many crawls
+SCRAPE_MAX_JOBS_PER_WORKER = int(os.getenv('SCRAPE_MAX_JOBS_PER_WORKER', '20'))
+# A scrape process (with its Chromium) using more memory than this is killed mid-crawl
+SCRAPE_MAX_MEMORY_MB = int(os.getenv('SCRAPE_MAX_MEMORY_MB', '1536'))
+# A crawl silent for this long (no progress messages) is killed
+SCRAPE_IDLE_TIMEOUT = int(os.getenv('SCRAPE_IDLE_TIMEOUT', '300'))
+
+# How often the parent checks on a running crawl
+POLL_SECONDS = 5
+
+class ScrapeError(Exception):
+    """Raised when a crawl fails or its worker process dies or is killed."""
+
+def _load_target(target):
+    module_name, function_name = target.split(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+def _worker_main(conn, target):
+    """
+    Scrape process loop: run crawls sent over `conn` until told to stop.
+
+    Messages to the parent:
+        ('timings', [(stage, seconds), ...])
+        ('progress', progress, message, new_businesses or None)
+        ('done', businesses)
+        ('error', message, traceback)
+    Businesses found so far are sent as the new ones since the last progress
+    message, so each page crosses the pipe once. The crawl's stage timings
+    (ClientContactDataFetcher.stage_timer) go just before each other message.
+    """
+    # The parent handles Ctrl+C and shuts workers down itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Own process group, so a kill also reaches the Playwright driver after this process is gone
+    os.setsid()
+    crawl = _load_target(target)
+    # Importable wherever the crawler is (the repository root is on sys.path)
+    from ClientContactDataFetcher.stage_timer import drain_timings
+
+    def send(message):
+        timings = drain_timings()
+        if timings:
+            conn.send(('timings', timings))
+        conn.send(message)
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+        what, where, state, known = task
+        sent = 0
+
+        def callback(progress, message, businesses=None):
+            nonlocal sent
+            new = None
+            if businesses is not None:
+                new = businesses[sent:]
+                sent = len(businesses)
+            send(('progress', progress, message, new))
+
+        try:
+            if known is None:
+                businesses = crawl(what, where, state, True, callback)
+            else:
+                businesses = crawl(what, where, state, True, callback, known=known)
+            send(('done', businesses))
+        except Exception as e:
+            send(('error', str(e), traceback.format_exc()))
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+def _process_tree(pid):
+    # pid and all its descendants (Playwright driver and Chromium processes)
+    pids = [pid]
+    for parent in pids:
+        pids.extend(_children(parent))
+    return pids
+
+def _rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0
+
+def _exited(worker):
+    # The pipe closes just before the exit code is available
+    worker.process.join(1)
+    return ScrapeError(f'Scrape worker exited with code {worker.process.exitcode}')
+
+class ScrapeWorker:
+    """One scrape process and the pipe used to talk to it."""
+
+    def __init__(self, context, target):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_conn, target),
+            name='scrape-worker',
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+
+    def memory_mb(self):
+        """Resident memory of the process and its browser, in MB (0 where /proc is unavailable)."""
+        return sum(_rss_mb(pid) for pid in _process_tree(self.process.pid))
+
+    def stop(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except OSError:
+                pass
+            self.process.join(5)
+        self.kill()
+
+    def kill(self):
+        # Take the browser down with the worker so no Chromium is orphaned
+        for pid in reversed(_process_tree(self.process.pid)):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+        self.process.join(5)
+        self.conn.close()
+
+class ScrapePool:
+    """
+    Supervised pool of processes that run crawls outside the web server process.
+
+    HTML parsing and the Playwright driver hold the GIL for long stretches, and
+    a browser crash can take its process down, so crawls run in separate
+    processes. run() blocks the calling thread (a search queue worker) while
+    relaying the crawler's progress callback over a pipe. Workers are replaced
+    after SCRAPE_MAX_JOBS_PER_WORKER crawls, and killed if they exceed
+    SCRAPE_MAX_MEMORY_MB, go silent for SCRAPE_IDLE_TIMEOUT seconds or die.
+    """
+
+    def __init__(self, size=SCRAPE_WORKERS, target=SCRAPE_TARGET,
+                 max_jobs_per_worker=SCRAPE_MAX_JOBS_PER_WORKER, max_memory_mb=SCRAPE_MAX_MEMORY_MB):
+        self.size = size
+        self.target = target
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.max_memory_mb = max_memory_mb
+        # spawn: a forked copy of the server would inherit its threads, sockets and DB connections
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._busy = 0
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            worker = ScrapeWorker(self._context, self.target)
+            logger.info(f"Started scrape worker {worker.process.pid}")
+        with self._lock:
+            self._workers.add(worker)
+            self._busy += 1
+        return worker
+
+    def _release(self, worker, healthy):
+        with self._lock:
+            self._busy -= 1
+        if healthy and worker.jobs < self.max_jobs_per_worker:
+            self._idle.put(worker)
+        else:
+            with self._lock:
+                self._workers.discard(worker)
+            if healthy:
+                logger.info(f"Recycling scrape worker {worker.process.pid} after {worker.jobs} crawls")
+                worker.stop()
+            else:
+                # Mid-crawl, dead or over its limits: don't wait for it
+                worker.kill()
+        self._slots.release()
+
+    def run(self, what, where, state, callback=None, known=None):
+        """
+        Run a crawl in a worker process.
+
+        Args:
+            what, where, state: Search parameters passed to the crawler
+            callback: Optional callback(progress, message, businesses_found_so_far),
+                      called in this thread
+            known: Optional dict of business key -> fingerprint for an
+                   incremental crawl (see ClientContactDataFetcher.business_keys)
+
+        Returns:
+            list: Business dictionaries returned by the crawler
+
+        Raises:
+            ScrapeError: If the crawl raised, or its worker died or was killed
+        """
+        worker = self._acquire()
+        healthy = False
+        try:
+            worker.jobs += 1
+            try:
+                worker.conn.send((what, where, state, known))
+            except OSError:
+                raise _exited(worker)
+            businesses = []
+            idle = 0
+
+            while True:
+                if not worker.conn.poll(POLL_SECONDS):
+                    if not worker.process.is_alive():
+                        raise _exited(worker)
+                    idle += POLL_SECONDS
+                    if idle >= SCRAPE_IDLE_TIMEOUT:
+                        raise ScrapeError(f'Crawl made no progress for {SCRAPE_IDLE_TIMEOUT} seconds')
+                    self._check_memory(worker)
+                    continue
+
+                try:
+                    message = worker.conn.recv()
+                except (EOFError, OSError):
+                    raise _exited(worker)
+                idle = 0
+
+                if message[0] == 'timings':
+                    for stage, seconds in message[1]:
+                        SCRAPE_STAGE_SECONDS.observe(seconds, stage)
+                elif message[0] == 'progress':
+                    _, progress, status_message, new = message
+                    if new is not None:
+                        businesses.extend(new)
+                    self._check_memory(worker)
+                    if callback:
+                        callback(progress, status_message, businesses if new is not None else None)
+                elif message[0] == 'done':
+                    healthy = True
+                    return message[1]
+                else:
+                    _, error, trace = message
+                    logger.error(f"Crawl failed in scrape worker {worker.process.pid}:\n{trace}")
+                    # The crawl raised but the process is intact
+                    healthy = True
+                    raise ScrapeError(error)
+        finally:
+            self._release(worker, healthy)
+
+    def _check_memory(self, worker):
+        memory = worker.memory_mb()
+        if memory > self.max_memory_mb:
+            raise ScrapeError(f'Crawl used {memory:.0f} MB, over the {self.max_memory_mb} MB limit')
+
+    def stats(self):
+        """
+        Returns:
+            tuple: (worker processes started, workers running a crawl, each with its browser open)
+        """
+        with self._lock:
+            return len(self._workers), self._busy
+
+    def shutdown(self):
+        """Stop every worker process."""
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
+
+# Process-wide pool used by the search queue
+scrape_pool = ScrapePool()
+atexit.register(scrape_pool.shutdown)
@@ -0,0 +1,338 @@
+import os
+import socket
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, text
+
+from extensions import db
+from models.models import SearchJob, SavedSearch
+from utils.crawl_cache import normalise_query, prune_crawl_cache
+from utils.sync import prune_tombstones
+
+logger = logging.getLogger(__name__)
+
+# Crawl threads per process. Each runs one headless Chromium at a time.
+SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', '2'))
+# Searches one user may have running at once, across all processes
+SEARCH_MAX_RUNNING_PER_USER = int(os.getenv('SEARCH_MAX_RUNNING_PER_USER', '1'))
+# Searches one user may have waiting or running
+SEARCH_MAX_QUEUED_PER_USER = int(os.getenv('SEARCH_MAX_QUEUED_PER_USER', '10'))
+# A search claimed this many times without finishing is marked as an error
+SEARCH_MAX_ATTEMPTS = 3
+# Finished searches kept per user (oldest are deleted first) and for at most this long
+SEARCH_HISTORY_PER_USER = int(os.getenv('SEARCH_HISTORY_PER_USER', '10'))
+SEARCH_HISTORY_TTL = timedelta(days=int(os.getenv('SEARCH_HISTORY_DAYS', '7')))
+
+# Idle workers re-check the table this often (enqueues in this process wake them at once)
+POLL_SECONDS = 2
+# Running searches refresh heartbeat_at this often
+HEARTBEAT_SECONDS = 15
+# Running searches without a heartbeat for this long belong to a dead worker
+STALE_AFTER = timedelta(seconds=90)
+# Finished searches, cached crawls and old tombstones are pruned this often
+PRUNE_SECONDS = 600
+
+ACTIVE_STATUSES = ('pending', 'running')
+FINISHED_STATUSES = ('completed', 'error')
+
+def search_slug(what, where, state):
+    """The what_where_state id clients use for a search."""
+    return f"{what}_{where}_{state}".lower().replace(" ", "_")
+
+class QueueFullError(Exception):
+    """Raised when a user already has SEARCH_MAX_QUEUED_PER_USER searches queued."""
+
+class SearchQueue:
+    """
+    Database-backed queue of search crawls with a fixed-size worker pool.
+
+    State lives in the search_job table so every process sees it. Each process
+    runs `workers` threads that claim pending searches, picking the user with the
+    fewest running searches first (oldest search breaks ties) and never more than
+    SEARCH_MAX_RUNNING_PER_USER running per user. Identical searches are
+    single-flight: a search is not claimed while a full crawl with the same
+    query_key is running, so it waits and then reuses that crawl. Incremental
+    re-crawls of saved searches stop early and aren't cached, so nothing waits
+    for them. A supervisor thread refreshes
+    heartbeats for this process's searches and re-queues searches whose worker
+    stopped heartbeating, e.g. after a restart, queues saved searches that are due
+    for a re-crawl, and prunes old finished searches so the table stays bounded.
+    """
+
+    def __init__(self, workers=SEARCH_WORKERS, max_running_per_user=SEARCH_MAX_RUNNING_PER_USER):
+        self.workers = workers
+        self.max_running_per_user = max_running_per_user
+        self.app = None
+        self.run_search = None
+        self._wakeup = threading.Event()
+        self._running = {}  # SearchJob.id -> worker id, for heartbeats
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self, app, run_search):
+        """
+        Start the worker and supervisor threads.
+
+        Args:
+            app: Flask app, used for application contexts in worker threads
+            run_search: Callable taking a claimed SearchJob id and running it to
+                        completion inside an application context; it must set
+                        the final status
+        """
+        if self._threads:
+            return
+        self.app = app
+        self.run_search = run_search
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'search-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        supervisor = threading.Thread(target=self._supervise, name='search-supervisor', daemon=True)
+        supervisor.start()
+        self._threads.append(supervisor)
+        logger.info(f"Started {self.workers} search workers")
+
+    def enqueue(self, user_id, search_id, what, where, state, saved_search_id=None):
+        """
+        Queue a search for a user. Must be called inside an application context.
+
+        Args:
+            saved_search_id (int): Saved search this is a scheduled re-crawl of;
+                                   such searches only import new or changed businesses
+
+        Returns:
+            SearchJob: The pending search
+
+        Raises:
+            QueueFullError: If the user has too many searches queued
+        """
+        queued = db.session.query(func.count(SearchJob.id)).filter(
+            SearchJob.user_id == user_id,
+            SearchJob.status.in_(ACTIVE_STATUSES)
+        ).scalar()
+        if queued >= SEARCH_MAX_QUEUED_PER_USER:
+            raise QueueFullError(f'You already have {queued} searches queued')
+
+        search = SearchJob(
+            user_id=user_id,
+            search_id=search_id,
+            query_key=normalise_query(what, where, state),
+            what=what,
+            where=where,
+            state=state,
+            saved_search_id=saved_search_id,
+            status='pending',
+            message='Search queued'
+        )
+        db.session.add(search)
+        db.session.commit()
+
+        self._wakeup.set()
+        return search
+
+    def pending_position(self, search):
+        """Number of pending searches queued before this one."""
+        return db.session.query(func.count(SearchJob.id)).filter(
+            SearchJob.status == 'pending',
+            SearchJob.created_at < search.created_at
+        ).scalar()
+
+    def _worker_id(self):
+        return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'
+
+    def _claim_next(self):
+        """Atomically claim the next search this worker may run, or return None."""
+        running = dict(db.session.query(SearchJob.user_id, func.count(SearchJob.id)).filter(
+            SearchJob.status == 'running'
+        ).group_by(SearchJob.user_id).all())
+
+        candidates = db.session.query(SearchJob.id, SearchJob.user_id, SearchJob.query_key).filter(
+            SearchJob.status == 'pending'
+        ).order_by(SearchJob.created_at, SearchJob.id).limit(200).all()
+
+        # Fair share: users with fewer running searches go first, oldest first within that
+        eligible = [c for c in candidates if running.get(c.user_id, 0) < self.max_running_per_user]
+        eligible.sort(key=lambda c: running.get(c.user_id, 0))
+
+        worker_id = self._worker_id()
+        now = datetime.utcnow()
+        for candidate in eligible:
+            # Only succeeds if nobody claimed it first, the user is still under quota
+            # and no identical full crawl is running (it will wait and reuse that crawl)
+            result = db.session.execute(text(
+                "UPDATE search_job SET status = 'running', worker_id = :worker_id, "
+                "started_at = :now, heartbeat_at = :now, attempts = attempts + 1, "
+                "message = 'Scraping in progress...' "
+                "WHERE id = :id AND status = 'pending' AND ("
+                "SELECT COUNT(*) FROM search_job WHERE user_id = :user_id AND status = 'running'"
+                ") < :max_running AND NOT EXISTS ("
+                "SELECT 1 FROM search_job AS leader WHERE leader.query_key = :query_key "
+                "AND leader.status = 'running' AND leader.saved_search_id IS NULL)"
+            ), {
+                'worker_id': worker_id,
+                'now': now,
+                'id': candidate.id,
+                'user_id': candidate.user_id,
+                'query_key': candidate.query_key,
+                'max_running': self.max_running_per_user
+            })
+            db.session.commit()
+            if result.rowcount == 1:
+                return candidate.id
+        return None
+
+    def _work(self):
+        while True:
+            search_job_id = None
+            try:
+                with self.app.app_context():
+                    search_job_id = self._claim_next()
+                    if search_job_id is None:
+                        db.session.remove()
+            except Exception:
+                logger.exception("Error claiming search job")
+
+            if search_job_id is None:
+                self._wakeup.wait(POLL_SECONDS)
+                self._wakeup.clear()
+                continue
+
+            with self._lock:
+                self._running[search_job_id] = self._worker_id()
+            try:
+                with self.app.app_context():
+                    self.run_search(search_job_id)
+            except Exception:
+                logger.exception(f"Search job {search_job_id} failed")
+            finally:
+                with self._lock:
+                    self._running.pop(search_job_id, None)
+                # Capacity freed up; let another worker look for more work
+                self._wakeup.set()
+
+    def _supervise(self):
+        last_pruned = 0
+        while True:
+            try:
+                with self.app.app_context():
+                    self._heartbeat()
+                    self._requeue_stale()
+                    self._queue_due_saved_searches()
+                    if time.monotonic() - last_pruned >= PRUNE_SECONDS:
+                        pruned = prune_finished_searches()
+                        if pruned:
+                            logger.info(f"Pruned {pruned} finished searches")
+                        pruned = prune_crawl_cache()
+                        if pruned:
+                            logger.info(f"Pruned {pruned} cached crawls")
+                        pruned = prune_tombstones()
+                        if pruned:
+                            logger.info(f"Pruned {pruned} sync tombstones")
+                        last_pruned = time.monotonic()
+                    db.session.remove()
+            except Exception:
+                logger.exception("Error in search queue supervisor")
+            time.sleep(HEARTBEAT_SECONDS)
+
+    def _heartbeat(self):
+        with self._lock:
+            running_ids = list(self._running)
+        if running_ids:
+            SearchJob.query.filter(
+                SearchJob.id.in_(running_ids),
+                SearchJob.status == 'running'
+            ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+
+    def _queue_due_saved_searches(self):
+        now = datetime.utcnow()
+        due = SavedSearch.query.filter(
+            SavedSearch.enabled.is_(True),
+            SavedSearch.next_run_at <= now
+        ).order_by(SavedSearch.next_run_at).limit(100).all()
+
+        for saved in due:
+            # Move next_run_at on; only the process whose update lands queues this run
+            claimed = SavedSearch.query.filter(
+                SavedSearch.id == saved.id,
+                SavedSearch.next_run_at == saved.next_run_at
+            ).update({
+                'next_run_at': now + timedelta(hours=saved.interval_hours),
+                'last_run_at': now
+            }, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue
+
+            search_id = search_slug(saved.what, saved.where, saved.state)
+            active = SearchJob.query.filter(
+                SearchJob.user_id == saved.user_id,
+                SearchJob.search_id == search_id,
+                SearchJob.status.in_(ACTIVE_STATUSES)
+            ).first()
+            if active:
+                logger.info(f"Saved search {saved.id} skipped, {search_id} is already queued")
+                continue
+
+            # Replace the finished search with the same id, as a manual search would
+            SearchJob.query.filter(
+                SearchJob.user_id == saved.user_id,
+                SearchJob.search_id == search_id
+            ).delete(synchronize_session=False)
+            try:
+                self.enqueue(saved.user_id, search_id, saved.what, saved.where, saved.state, saved.id)
+            except QueueFullError as e:
+                db.session.rollback()
+                logger.warning(f"Saved search {saved.id} skipped: {e}")
+
+    def _requeue_stale(self):
+        cutoff = datetime.utcnow() - STALE_AFTER
+        stale = SearchJob.query.filter(
+            SearchJob.status == 'running',
+            SearchJob.heartbeat_at < cutoff
+        ).all()
+        for search in stale:
+            if search.attempts >= SEARCH_MAX_ATTEMPTS:
+                search.status = 'error'
+                search.message = f'Search interrupted {search.attempts} times, giving up'
+                search.completed_at = datetime.utcnow()
+            else:
+                search.status = 'pending'
+                search.message = 'Search re-queued after the worker running it stopped'
+                search.worker_id = None
+            logger.warning(f"Search job {search.id} stale since {search.heartbeat_at}: now {search.status}")
+        if stale:
+            db.session.commit()
+            self._wakeup.set()
+
+def prune_finished_searches():
+    """
+    Delete finished searches older than SEARCH_HISTORY_TTL, and all but each
+    user's SEARCH_HISTORY_PER_USER most recent finished searches.
+
+    Returns:
+        int: Number of searches deleted
+    """
+    expired = SearchJob.query.filter(
+        SearchJob.status.in_(FINISHED_STATUSES),
+        SearchJob.completed_at < datetime.utcnow() - SEARCH_HISTORY_TTL
+    ).delete(synchronize_session=False)
+
+    # Least recently created beyond the per-user limit
+    overflow = db.session.execute(text(
+        "DELETE FROM search_job WHERE status IN ('completed', 'error') AND id NOT IN ("
+        "SELECT recent.id FROM search_job AS recent "
+        "WHERE recent.user_id = search_job.user_id AND recent.status IN ('completed', 'error') "
+        "ORDER BY recent.created_at DESC, recent.id DESC LIMIT :keep)"
+    ), {'keep': SEARCH_HISTORY_PER_USER}).rowcount
+
+    db.session.commit()
+    return expired + overflow
+
+# Process-wide queue started by create_app
+search_queue = SearchQueue()
@@ -0,0 +1,121 @@
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from extensions import db
+from models.models import User, Tombstone
+from utils.pagination import parse_limit, encode_cursor, decode_cursor
+
+# Days a deletion stays visible to delta sync. Clients whose cursor is older
+# than the tombstones pruned since must fetch the full list again.
+SYNC_TOMBSTONE_DAYS = int(os.getenv('SYNC_TOMBSTONE_DAYS', '30'))
+
+class CursorExpiredError(Exception):
+    """Raised when a since cursor predates deletions that have been forgotten."""
+
+def sync_state(user_id):
+    """
+    The user's data_version and sync_floor, in one read of the user row. The
+    list endpoints build their ETag, sync cursor and delta from it. Read it
+    before the rows it goes with, so changes made while they are read come
+    round again rather than being missed.
+
+    Returns:
+        tuple: (data_version, sync_floor)
+    """
+    return tuple(db.session.query(User.data_version, User.sync_floor).filter(User.id == user_id).one())
+
+def sync_cursor(version):
+    """Cursor for the since argument of the list endpoints, marking the user's data at a data_version."""
+    return encode_cursor([version])
+
+def _parse_since(cursor):
+    values = decode_cursor(cursor)
+    if len(values) != 1 or not isinstance(values[0], int):
+        raise ValueError('Invalid since cursor')
+    return values[0]
+
+def changes_since(query, model, user_id, args, state):
+    """
+    Fetch the user's rows of a synced table (job or conversation) created,
+    changed or deleted after a since cursor, oldest change first.
+
+    Every change bumps the user's data_version and stamps it on the row, or on
+    a tombstone for a deletion (utils/data_versions.py), so the changes after
+    a cursor are the rows and tombstones with a higher sync_version.
+
+    Args:
+        query: ORM query whose first entity is model, with any joins the
+               caller needs; each row is returned as the query gives it
+        model: Job or Conversation
+        user_id (int): Owner of the rows
+        args (dict): Request query arguments: since and limit
+        state (tuple): The user's (data_version, sync_floor) from sync_state()
+
+    Returns:
+        tuple: (list of changed rows, list of deleted row ids, cursor for the
+                next call, whether more changes are waiting)
+
+    Raises:
+        ValueError: If since or limit are invalid
+        CursorExpiredError: If deletions after the cursor have been pruned
+    """
+    since = _parse_since(args.get('since'))
+    limit = parse_limit(args.get('limit'))
+
+    current, floor = state
+    if since < floor:
+        raise CursorExpiredError('since cursor has expired; fetch the full list again')
+
+    # Fetch one extra of each to know whether more changes exist
+    rows = query.filter(
+        model.user_id == user_id,
+        model.sync_version > since
+    ).order_by(model.sync_version).limit(limit + 1).all()
+    tombstones = db.session.query(Tombstone.row_id, Tombstone.sync_version).filter(
+        Tombstone.user_id == user_id,
+        Tombstone.kind == model.__tablename__,
+        Tombstone.sync_version > since
+    ).order_by(Tombstone.sync_version).limit(limit + 1).all()
+
+    changes = sorted(
+        [(row[0].sync_version, row, None) for row in rows] +
+        [(tombstone.sync_version, None, tombstone.row_id) for tombstone in tombstones],
+        key=lambda change: change[0]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # A complete delta brings the client up to date, even when the last
+    # change was to a table it isn't syncing
+    version = changes[-1][0] if changes else since
+    if not has_more:
+        version = max(version, current)
+
+    return (
+        [row for _, row, _ in changes if row is not None],
+        [row_id for _, row, row_id in changes if row is None],
+        encode_cursor([version]),
+        has_more
+    )
+
+def prune_tombstones():
+    """
+    Delete tombstones older than SYNC_TOMBSTONE_DAYS, raising each user's
+    sync_floor past them so older cursors are refused.
+
+    Returns:
+        int: Number of tombstones deleted
+    """
+    cutoff = datetime.utcnow() - timedelta(days=SYNC_TOMBSTONE_DAYS)
+    floors = db.session.query(Tombstone.user_id, func.max(Tombstone.sync_version)).filter(
+        Tombstone.deleted_at < cutoff
+    ).group_by(Tombstone.user_id).all()
+    for user_id, floor in floors:
+        User.query.filter(User.id == user_id, User.sync_floor < floor).update(
+            {'sync_floor': floor}, synchronize_session=False
+        )
+    deleted = Tombstone.query.filter(Tombstone.deleted_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with a size limit and per-entry expiry.
+
+    Entries expire `ttl` seconds after they were last set. When the cache is
+    full, the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_entries, ttl):
+        """
+        Args:
+            max_entries (int): Most entries kept at once
+            ttl (float): Seconds an entry stays valid after being set
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value, or default if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting expired and then least recently used entries if full."""
+        with self._lock:
+            now = time.monotonic()
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                for stale_key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                    del self._entries[stale_key]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Remove and return a value, or default if missing."""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,51 @@
+import os
+
+from extensions import db
+from models.models import User
+from utils.ttl_cache import TTLCache
+
+# User settings the request handlers read. The change counters are left out:
+# ETags (utils/http_cache.py) must see every change, so they are always read
+# from the database.
+USER_FIELDS = ('id', 'email', 'phone_number', 'twilio_account_sid', 'twilio_auth_token',
+               'messaging_provider', 'httpssms_api_key')
+
+# Users resolved from JWTs, shared by the requests of this process. Settings
+# changed through another process are picked up within USER_CACHE_TTL seconds.
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '1000'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+_users = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+
+class CachedUser:
+    """
+    Snapshot of a user's settings, detached from any database session so it
+    can be shared between requests and threads. Treat it as read-only; change
+    settings through the User model and call invalidate_user().
+    """
+
+    __slots__ = USER_FIELDS
+
+    def __init__(self, user):
+        for field in USER_FIELDS:
+            setattr(self, field, getattr(user, field))
+
+def load_user(user_id):
+    """
+    The user with an id, from the cache or else the database.
+
+    Returns:
+        CachedUser, or None if there is no such user
+    """
+    user_id = int(user_id)
+    cached = _users.get(user_id)
+    if cached is None:
+        user = db.session.get(User, user_id)
+        if user is None:
+            return None
+        cached = CachedUser(user)
+        _users.set(user_id, cached)
+    return cached
+
+def invalidate_user(user_id):
+    """Drop a user from this process's cache after their settings change."""
+    _users.pop(int(user_id))
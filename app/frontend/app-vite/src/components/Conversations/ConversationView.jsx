@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import axios from 'axios';
+import { openEventStream } from '../../services/api';
 import styled from 'styled-components';
 
 const ConversationView = () => {
@@ -14,7 +15,19 @@ const ConversationView = () => {
   const [newMessage, setNewMessage] = useState('');
   const [conversationId, setConversationId] = useState(null);
   const [isSending, setIsSending] = useState(false);
-  const [pollingInterval, setPollingInterval] = useState(null);
+  const [hasEarlier, setHasEarlier] = useState(false);
+  const [loadingEarlier, setLoadingEarlier] = useState(false);
+  const lastMessageIdRef = useRef(null);
+  
+  // Append messages not already shown, remembering the newest id for polling
+  const appendMessages = (newMessages) => {
+    if (newMessages.length === 0) return;
+    setMessages(prev => {
+      const seen = new Set(prev.map(message => message.id));
+      return [...prev, ...newMessages.filter(message => !seen.has(message.id))];
+    });
+    lastMessageIdRef.current = Math.max(lastMessageIdRef.current || 0, newMessages[newMessages.length - 1].id);
+  };
   
   // Fetch conversation details
   useEffect(() => {
@@ -22,10 +35,15 @@ const ConversationView = () => {
       try {
         setLoading(true);
         const response = await axios.get(`/api/jobs/${jobId}/conversation`);
+        const conversation = response.data.conversation;
         
-        setJob(response.data.conversation.job);
-        setMessages(response.data.conversation.messages);
-        setConversationId(response.data.conversation.id);
+        setJob(conversation.job);
+        setMessages(conversation.messages);
+        setHasEarlier(conversation.has_more);
+        setConversationId(conversation.id);
+        lastMessageIdRef.current = conversation.messages.length > 0
+          ? conversation.messages[conversation.messages.length - 1].id
+          : 0;
         setLoading(false);
       } catch (err) {
         setError('Failed to load conversation. Please try again.');
@@ -34,19 +52,60 @@ const ConversationView = () => {
       }
     };
     
+    // Fetch only messages newer than the last one we have
+    const fetchNewMessages = async () => {
+      if (lastMessageIdRef.current === null) return;
+      try {
+        const response = await axios.get(`/api/jobs/${jobId}/conversation`, {
+          params: { since: lastMessageIdRef.current }
+        });
+        appendMessages(response.data.messages);
+      } catch (err) {
+        console.error(err);
+      }
+    };
+    
+    lastMessageIdRef.current = null;
     fetchConversation();
     
-    // Start polling for new messages every 10 seconds
-    const interval = setInterval(fetchConversation, 10000);
-    setPollingInterval(interval);
+    // New messages are pushed by the server; catch up after a dropped connection
+    const handleMessageEvent = (event) => {
+      if (String(event.job_id) === String(jobId)) {
+        appendMessages([event.message]);
+      }
+    };
+    const source = openEventStream({
+      'message.received': handleMessageEvent,
+      'message.sent': handleMessageEvent
+    });
+    if (source) {
+      source.onopen = fetchNewMessages;
+    }
     
     return () => {
-      if (pollingInterval) {
-        clearInterval(pollingInterval);
+      if (source) {
+        source.close();
       }
     };
   }, [jobId]);
   
+  const handleLoadEarlier = async () => {
+    if (messages.length === 0) return;
+    try {
+      setLoadingEarlier(true);
+      const response = await axios.get(`/api/jobs/${jobId}/conversation`, {
+        params: { before: messages[0].id }
+      });
+      setMessages(prev => [...response.data.conversation.messages, ...prev]);
+      setHasEarlier(response.data.conversation.has_more);
+    } catch (err) {
+      setError('Failed to load earlier messages. Please try again.');
+      console.error(err);
+    } finally {
+      setLoadingEarlier(false);
+    }
+  };
+  
   // Scroll to bottom of messages
   useEffect(() => {
     if (messagesEndRef.current) {
@@ -68,7 +127,7 @@ const ConversationView = () => {
       });
       
       // Add the new message to the list
-      setMessages([...messages, response.data.message_data]);
+      appendMessages([response.data.message_data]);
       
       // Clear the input
       setNewMessage('');
@@ -152,6 +211,12 @@ const ConversationView = () => {
       
       <PhoneContainer>
         <MessagesContainer>
+          {hasEarlier && (
+            <LoadEarlierButton onClick={handleLoadEarlier} disabled={loadingEarlier}>
+              {loadingEarlier ? 'Loading...' : 'Load earlier messages'}
+            </LoadEarlierButton>
+          )}
+          
           {Object.keys(groupedMessages).map(date => (
             <MessageGroup key={date}>
               <DateDivider>
@@ -254,6 +319,25 @@ const MessagesContainer = styled.div`
   background-color: #f5f5f5;
 `;
 
+const LoadEarlierButton = styled.button`
+  display: block;
+  margin: 0 auto 15px;
+  background: none;
+  border: none;
+  color: #4a90e2;
+  font-size: 13px;
+  cursor: pointer;
+  
+  &:hover {
+    text-decoration: underline;
+  }
+  
+  &:disabled {
+    color: #999;
+    cursor: not-allowed;
+  }
+`;
+
 const MessageGroup = styled.div`
   margin-bottom: 20px;
 `;
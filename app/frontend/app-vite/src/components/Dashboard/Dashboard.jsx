@@ -6,6 +6,7 @@ import api, { jobsAPI } from '../../services/api';
 
 const Dashboard = () => {
   const [jobs, setJobs] = useState([]);
+  const [stats, setStats] = useState({ total: 0, contacted: 0, conversations: 0 });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   
@@ -23,17 +24,26 @@ const Dashboard = () => {
         setLoading(true);
         console.log('Fetching dashboard data with token:', token);
         
-        // Fetch jobs using our API service instead of global axios
-        const jobsResponse = await jobsAPI.getJobs();
+        // Fetch only the jobs shown plus the totals for the stats, not every job
+        const [contactedResponse, recentResponse, conversationsResponse] = await Promise.all([
+          jobsAPI.getJobs({ status: 'contacted', limit: 5 }),
+          jobsAPI.getJobs({ limit: 5 }),
+          jobsAPI.getJobs({ has_conversation: true, limit: 1 })
+        ]);
         
-        // Sort by status (contacted first, then pending)
-        const sortedJobs = jobsResponse.data.jobs.sort((a, b) => {
-          if (a.status === 'contacted' && b.status !== 'contacted') return -1;
-          if (a.status !== 'contacted' && b.status === 'contacted') return 1;
-          return new Date(b.created_at) - new Date(a.created_at);
-        });
+        // Contacted jobs first, then the most recent ones
+        const contactedIds = new Set(contactedResponse.data.jobs.map(job => job.id));
+        const sortedJobs = [
+          ...contactedResponse.data.jobs,
+          ...recentResponse.data.jobs.filter(job => !contactedIds.has(job.id))
+        ];
         
         setJobs(sortedJobs);
+        setStats({
+          total: recentResponse.data.total,
+          contacted: contactedResponse.data.total,
+          conversations: conversationsResponse.data.total
+        });
         setLoading(false);
       } catch (err) {
         setError('Failed to load dashboard data. Please try again.');
@@ -113,18 +123,18 @@ const Dashboard = () => {
             </SectionHeader>
             <StatsGrid>
               <StatCard>
-                <StatValue>{jobs.length}</StatValue>
+                <StatValue>{stats.total}</StatValue>
                 <StatLabel>Total Jobs</StatLabel>
               </StatCard>
               <StatCard>
                 <StatValue>
-                  {jobs.filter(job => job.status === 'contacted').length}
+                  {stats.contacted}
                 </StatValue>
                 <StatLabel>Contacted</StatLabel>
               </StatCard>
               <StatCard>
                 <StatValue>
-                  {jobs.filter(job => job.has_conversation).length}
+                  {stats.conversations}
                 </StatValue>
                 <StatLabel>Active Conversations</StatLabel>
               </StatCard>
@@ -1,8 +1,11 @@
-import React, { useState, useEffect, useContext, useRef } from 'react';
+import React, { useState, useEffect, useContext } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import styled from 'styled-components';
 import { AuthContext } from '../../context/AuthContext';
-import api, { jobsAPI, conversationsAPI } from '../../services/api';
+import api, { jobsAPI, conversationsAPI, openEventStream } from '../../services/api';
+
+// Number of jobs requested per page from the server
+const JOBS_PAGE_SIZE = 100;
 
 const JobList = () => {
   const navigate = useNavigate();
@@ -17,12 +20,18 @@ const JobList = () => {
   const [showBatchMessageForm, setShowBatchMessageForm] = useState(false);
   const [isSendingBatch, setIsSendingBatch] = useState(false);
   const [filters, setFilters] = useState({
+    search: '',
     jobType: '',
     location: '',
+    near: '',
+    withinKm: '',
     phonePrefix: ''
   });
   const [showFilters, setShowFilters] = useState(true);
-  const [filteredJobs, setFilteredJobs] = useState([]);
+  const [totalJobs, setTotalJobs] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [syncCursor, setSyncCursor] = useState(null);
   const [formData, setFormData] = useState({
     business_name: '',
     business_phone: '',
@@ -40,7 +49,7 @@ const JobList = () => {
   const [searchError, setSearchError] = useState('');
   const [activeSearches, setActiveSearches] = useState([]);
   const [expandedSearches, setExpandedSearches] = useState({});
-  const searchStatusIntervalRef = useRef(null);
+  const [jobsVersion, setJobsVersion] = useState(0);
   
   const { token, loading: authLoading } = useContext(AuthContext);
 
@@ -50,58 +59,71 @@ const JobList = () => {
       return;
     }
     
-    fetchJobs();
     fetchSearchStatus();
   }, [token, authLoading]);
 
   useEffect(() => {
-    // Apply filters whenever jobs or filter values change
-    if (jobs.length > 0) {
-      applyFilters();
-    } else {
-      setFilteredJobs([]);
+    if (authLoading || !token) {
+      return;
     }
-  }, [jobs, filters]);
 
-  // Cleanup interval on unmount
+    // Filtering happens on the server; wait for typing to pause before refetching
+    const timeout = setTimeout(fetchJobs, 300);
+    return () => clearTimeout(timeout);
+  }, [filters, token, authLoading]);
+
   useEffect(() => {
-    return () => {
-      if (searchStatusIntervalRef.current) {
-        clearInterval(searchStatusIntervalRef.current);
-      }
-    };
-  }, []);
+    if (authLoading || !token || jobsVersion === 0) {
+      return;
+    }
+
+    syncJobs();
+  }, [jobsVersion]);
 
-  // Set up polling for search status
+  // Search progress and imports are pushed by the server instead of polled
   useEffect(() => {
-    // Clear any existing interval
-    if (searchStatusIntervalRef.current) {
-      clearInterval(searchStatusIntervalRef.current);
+    if (authLoading || !token) {
+      return;
     }
     
-    // Check for active searches
-    const hasActiveSearch = activeSearches.some(search => search.status === 'in_progress');
-    
-    if (hasActiveSearch) {
-      // Set up polling if there are active searches
-      searchStatusIntervalRef.current = setInterval(fetchSearchStatus, 3000);
-    } else {
-      searchStatusIntervalRef.current = null;
-    }
+    const source = openEventStream({
+      'search.progress': (search) => {
+        setActiveSearches(prev => [search, ...prev.filter(s => s.id !== search.id)]
+          .sort((a, b) => (b.created_at || '').localeCompare(a.created_at || ''))
+          .slice(0, 10));
+      },
+      // Bring the job list up to date once new jobs land
+      'jobs.imported': () => setJobsVersion(version => version + 1)
+    });
     
     return () => {
-      if (searchStatusIntervalRef.current) {
-        clearInterval(searchStatusIntervalRef.current);
+      if (source) {
+        source.close();
       }
     };
-  }, [activeSearches]);
+  }, [token, authLoading]);
+
+  // Map the filter inputs to the job list query parameters
+  const buildJobParams = () => ({
+    // Searches without letters or digits are rejected by the API
+    search: /[\p{L}\p{N}]/u.test(filters.search) ? filters.search.trim() : undefined,
+    job_type: filters.jobType.trim() || undefined,
+    location: filters.location.trim() || undefined,
+    // Wait for a whole postcode; the API rejects unknown ones
+    near: /^\d{4}$/.test(filters.near.trim()) ? filters.near.trim() : undefined,
+    within_km: /^\d{4}$/.test(filters.near.trim()) ? filters.withinKm.trim() || undefined : undefined,
+    phone_prefix: filters.phonePrefix.trim() || undefined,
+    limit: JOBS_PAGE_SIZE
+  });
 
   const fetchJobs = async () => {
     try {
       setLoading(true);
-      const response = await jobsAPI.getJobs();
+      const response = await jobsAPI.getJobs(buildJobParams());
       setJobs(response.data.jobs);
-      setFilteredJobs(response.data.jobs); // Initialize filteredJobs with all jobs
+      setTotalJobs(response.data.total);
+      setNextCursor(response.data.next_cursor);
+      setSyncCursor(response.data.sync_cursor);
       setLoading(false);
     } catch (error) {
       setError('Failed to load jobs. Please try again.');
@@ -110,21 +132,71 @@ const JobList = () => {
     }
   };
 
+  // Fetch only the jobs created, changed or deleted since the list was loaded
+  // and merge them in, instead of downloading the whole list again
+  const syncJobs = async () => {
+    // Changes aren't filtered on the server, so filtered lists are refetched
+    if (!syncCursor || Object.values(filters).some(value => value.trim())) {
+      fetchJobs();
+      return;
+    }
+    try {
+      let cursor = syncCursor;
+      let changed = [];
+      let deleted = [];
+      let hasMore = true;
+      while (hasMore) {
+        const response = await jobsAPI.getJobs({ since: cursor, limit: 500 });
+        changed = [...changed, ...response.data.jobs];
+        deleted = [...deleted, ...response.data.deleted];
+        cursor = response.data.sync_cursor;
+        hasMore = response.data.has_more;
+      }
+      setSyncCursor(cursor);
+
+      const gone = new Set(deleted);
+      const loaded = new Set(jobs.map(job => job.id));
+      // The list holds every job newer than its oldest one, so an unseen job in
+      // that range is new; older ones belong to pages not loaded yet
+      const oldest = nextCursor && jobs.length ? jobs[jobs.length - 1].created_at : '';
+      const added = changed.filter(job => !loaded.has(job.id) && !gone.has(job.id) && job.created_at >= oldest);
+      const changedById = new Map(changed.map(job => [job.id, job]));
+      setJobs(prev => [
+        ...added.filter(job => !prev.some(other => other.id === job.id)),
+        ...prev.map(job => changedById.get(job.id) || job)
+      ]
+        .filter(job => !gone.has(job.id))
+        .sort((a, b) => b.created_at.localeCompare(a.created_at) || b.id - a.id));
+      setTotalJobs(total => total + added.length - deleted.filter(id => loaded.has(id)).length);
+    } catch (error) {
+      // The cursor has expired (410) or the sync failed; start afresh
+      console.error(error);
+      fetchJobs();
+    }
+  };
+
+  const fetchMoreJobs = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await jobsAPI.getJobs({ ...buildJobParams(), cursor: nextCursor });
+      setJobs(prev => [...prev, ...response.data.jobs]);
+      setTotalJobs(response.data.total);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      setError('Failed to load more jobs. Please try again.');
+      console.error(error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const fetchSearchStatus = async () => {
     try {
       const response = await jobsAPI.getSearchStatus();
       if (response.data.searches) {
         // Update the active searches
         setActiveSearches(response.data.searches);
-        
-        // Check if any completed searches
-        const completedSearch = response.data.searches.find(search => 
-          search.status === 'completed' && search.progress === 100);
-        
-        // Refresh job list if a search just completed
-        if (completedSearch) {
-          fetchJobs();
-        }
       }
     } catch (err) {
       console.error('Error checking search status:', err);
@@ -171,7 +243,7 @@ const JobList = () => {
       setShowForm(false);
       
       // Refresh jobs list
-      fetchJobs();
+      syncJobs();
     } catch (err) {
       if (err.response && err.response.status === 409) {
         setFormError('A job with this business name and phone already exists');
@@ -224,6 +296,7 @@ const JobList = () => {
       
       // Update local state
       setJobs(jobs.filter(job => job.id !== jobId));
+      setTotalJobs(total => total - 1);
     } catch (err) {
       setError('Failed to delete job. Please try again.');
       console.error(err);
@@ -260,7 +333,7 @@ const JobList = () => {
   // Add a function to handle selecting/deselecting all eligible jobs
   const handleSelectAllJobs = () => {
     // If all eligible jobs are already selected, deselect them all
-    const eligibleJobs = filteredJobs.filter(job => !job.has_conversation && job.status === 'pending').map(job => job.id);
+    const eligibleJobs = jobs.filter(job => !job.has_conversation && job.status === 'pending').map(job => job.id);
     
     if (eligibleJobs.length === 0) {
       // No eligible jobs to select
@@ -359,7 +432,7 @@ const JobList = () => {
       setSelectedJobs([]);
       setBatchMessageText('');
       setShowBatchMessageForm(false);
-      fetchJobs();
+      syncJobs();
       if (successCount > 0) navigate('/messages');
     } catch (err) {
       setError('Batch messaging failed.');
@@ -377,40 +450,14 @@ const JobList = () => {
     }));
   };
 
-  // Apply filters to jobs
-  const applyFilters = () => {
-    let result = [...jobs];
-    
-    // Filter by job type if provided
-    if (filters.jobType.trim()) {
-      result = result.filter(job => 
-        job.job_type?.toLowerCase().includes(filters.jobType.toLowerCase())
-      );
-    }
-    
-    // Filter by location if provided
-    if (filters.location.trim()) {
-      result = result.filter(job => {
-        const jobLocation = [job.suburb, job.state, job.postcode].filter(Boolean).join(' ').toLowerCase();
-        return jobLocation.includes(filters.location.toLowerCase());
-      });
-    }
-    
-    // Filter by phone prefix if provided
-    if (filters.phonePrefix.trim()) {
-      result = result.filter(job => 
-        job.business_phone.startsWith(filters.phonePrefix)
-      );
-    }
-    
-    setFilteredJobs(result);
-  };
-
   // Clear all filters
   const clearFilters = () => {
     setFilters({
+      search: '',
       jobType: '',
       location: '',
+      near: '',
+      withinKm: '',
       phonePrefix: ''
     });
   };
@@ -420,12 +467,11 @@ const JobList = () => {
     if (selectedJobs.length === 0) return;
     if (!window.confirm(`Delete ${selectedJobs.length} selected jobs?`)) return;
     try {
-      for (const id of selectedJobs) {
-        await jobsAPI.deleteJob(id);
-      }
+      // One request; conversations and messages are deleted with the jobs
+      const response = await jobsAPI.bulkJobs('delete', { ids: selectedJobs });
       // Update local state
       setJobs(jobs.filter(job => !selectedJobs.includes(job.id)));
-      setFilteredJobs(filteredJobs.filter(job => !selectedJobs.includes(job.id)));
+      setTotalJobs(total => total - response.data.deleted);
       setSelectedJobs([]);
     } catch (err) {
       setError('Failed to delete selected jobs. Please try again.');
@@ -663,6 +709,17 @@ const JobList = () => {
       {/* Filters section */}
       {showFilters && (
         <FiltersContainer>
+          <FilterInputGroup>
+            <FilterLabel>Search</FilterLabel>
+            <FilterInput 
+              type="text" 
+              name="search" 
+              value={filters.search} 
+              onChange={handleFilterChange}
+              placeholder="Business, trade, street or suburb"
+            />
+          </FilterInputGroup>
+          
           <FilterInputGroup>
             <FilterLabel>Job Type</FilterLabel>
             <FilterInput 
@@ -685,6 +742,30 @@ const JobList = () => {
             />
           </FilterInputGroup>
           
+          <FilterInputGroup>
+            <FilterLabel>Near Postcode</FilterLabel>
+            <FilterInput 
+              type="text" 
+              name="near" 
+              value={filters.near} 
+              onChange={handleFilterChange}
+              placeholder="E.g. 4870"
+            />
+          </FilterInputGroup>
+          
+          <FilterInputGroup>
+            <FilterLabel>Within (km)</FilterLabel>
+            <FilterInput 
+              type="number" 
+              name="withinKm" 
+              min="1"
+              max="500"
+              value={filters.withinKm} 
+              onChange={handleFilterChange}
+              placeholder="25"
+            />
+          </FilterInputGroup>
+          
           <FilterInputGroup>
             <FilterLabel>Phone Prefix</FilterLabel>
             <FilterInput 
@@ -703,7 +784,7 @@ const JobList = () => {
           </FilterButtonGroup>
           
           <FilterStats>
-            Showing {filteredJobs.length} of {jobs.length} jobs
+            Showing {jobs.length} of {totalJobs} jobs
           </FilterStats>
         </FiltersContainer>
       )}
@@ -712,7 +793,7 @@ const JobList = () => {
         <LoadingMessage>Loading jobs...</LoadingMessage>
       ) : error ? (
         <ErrorMessage>{error}</ErrorMessage>
-      ) : jobs.length === 0 ? (
+      ) : jobs.length === 0 && !Object.values(filters).some(value => value.trim()) ? (
         <EmptyState>
           <p>You haven't added any jobs yet.</p>
           <ButtonGroup>
@@ -729,10 +810,10 @@ const JobList = () => {
                   <SelectAllContainer>
                     <SelectAllButton 
                       onClick={handleSelectAllJobs}
-                      $isActive={filteredJobs.filter(job => !job.has_conversation && job.status === 'pending').length > 0}
+                      $isActive={jobs.filter(job => !job.has_conversation && job.status === 'pending').length > 0}
                       title="Select/deselect all eligible jobs"
                     >
-                      {selectedJobs.length === filteredJobs.filter(job => !job.has_conversation && job.status === 'pending').length 
+                      {selectedJobs.length === jobs.filter(job => !job.has_conversation && job.status === 'pending').length 
                         && selectedJobs.length > 0 ? 'Deselect All' : 'Select All'}
                     </SelectAllButton>
                   </SelectAllContainer>
@@ -745,7 +826,7 @@ const JobList = () => {
               </tr>
             </thead>
             <tbody>
-              {filteredJobs.map((job) => (
+              {jobs.map((job) => (
                 <tr key={job.id}>
                   <td>
                     {!job.has_conversation && job.status === 'pending' && (
@@ -763,6 +844,7 @@ const JobList = () => {
                   <td>{job.job_type || 'General Labor'}</td>
                   <td>
                     {[job.suburb, job.state, job.postcode].filter(Boolean).join(', ')}
+                    {job.distance_km != null && ` (${job.distance_km} km)`}
                   </td>
                   <td>
                     <StatusBadge status={job.status}>
@@ -790,6 +872,12 @@ const JobList = () => {
             </tbody>
           </JobsTable>
 
+          {nextCursor && (
+            <LoadMoreButton onClick={fetchMoreJobs} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : `Load more (${totalJobs - jobs.length} remaining)`}
+            </LoadMoreButton>
+          )}
+
           {/* Batch message form (appears when "Send Messages" is clicked) */}
           {showBatchMessageForm && (
             <BatchMessageFormOverlay>
@@ -1519,6 +1607,27 @@ const FilterStats = styled.div`
   color: #666;
 `;
 
+const LoadMoreButton = styled.button`
+  display: block;
+  margin: 20px auto;
+  background-color: #f5f5f5;
+  color: #333;
+  border: 1px solid #ddd;
+  border-radius: 4px;
+  padding: 10px 16px;
+  font-size: 14px;
+  cursor: pointer;
+
+  &:hover {
+    background-color: #eeeeee;
+  }
+
+  &:disabled {
+    opacity: 0.6;
+    cursor: not-allowed;
+  }
+`;
+
 const ActiveSearchesContainer = styled.div`
   background-color: white;
   border-radius: 8px;
@@ -44,6 +44,10 @@ const Messages = () => {
   useEffect(() => {
     if (selectedConversation) {
       fetchMessages(selectedConversation.id);
+      // Fetching the messages marks them read on the server
+      setConversations(prev => prev.map(conv =>
+        conv.id === selectedConversation.id && conv.unread_count ? { ...conv, unread_count: 0 } : conv
+      ));
       // Update URL without reloading if conversation has a job_id
       if (selectedConversation.job_id && !jobId) {
         navigate(`/messages/${selectedConversation.job_id}`, { replace: true });
@@ -61,8 +65,15 @@ const Messages = () => {
   const fetchConversations = async () => {
     try {
       setLoading(true);
-      const response = await conversationsAPI.getConversations();
-      setConversations(response.data.conversations || []);
+      // Follow next_cursor through every page, so older conversations (and the jobId lookup) aren't cut off
+      const loaded = [];
+      let cursor = null;
+      do {
+        const response = await conversationsAPI.getConversations(cursor ? { limit: 200, cursor } : { limit: 200 });
+        loaded.push(...(response.data.conversations || []));
+        cursor = response.data.next_cursor;
+      } while (cursor);
+      setConversations(loaded);
       setLoading(false);
     } catch (error) {
       console.error('Error fetching conversations:', error);
@@ -88,7 +99,7 @@ const Messages = () => {
     try {
       setIsSending(true);
       await axios.post(`/api/conversations/${selectedConversation.id}/messages`, {
-        content: newMessage,
+        text: newMessage,
         send_sms: true
       });
       setNewMessage('');
@@ -142,7 +153,7 @@ const Messages = () => {
     const groups = {};
     
     messages.forEach(message => {
-      const date = new Date(message.created_at).toLocaleDateString();
+      const date = new Date(message.timestamp).toLocaleDateString();
       if (!groups[date]) {
         groups[date] = [];
       }
@@ -174,6 +185,9 @@ const Messages = () => {
               >
                 <ConversationTitle>
                   {conversation.business_name || conversation.job_title || 'Untitled Conversation'}
+                  {conversation.unread_count > 0 && (
+                    <UnreadBadge>{conversation.unread_count}</UnreadBadge>
+                  )}
                 </ConversationTitle>
                 <ConversationPreview>
                   {conversation.last_message || 'No messages yet'}
@@ -211,10 +225,10 @@ const Messages = () => {
                       </DateDivider>
                       
                       {dateMessages.map((message) => (
-                        <MessageItem key={message.id} isUser={message.is_user}>
-                          <MessageContent isUser={message.is_user}>
-                            {message.content}
-                            <MessageTime>{formatTime(message.created_at)}</MessageTime>
+                        <MessageItem key={message.id} isUser={message.is_from_user}>
+                          <MessageContent isUser={message.is_from_user}>
+                            {message.text}
+                            <MessageTime>{formatTime(message.timestamp)}</MessageTime>
                           </MessageContent>
                         </MessageItem>
                       ))}
@@ -310,6 +324,18 @@ const ConversationTitle = styled.div`
   color: #333;
 `;
 
+const UnreadBadge = styled.span`
+  display: inline-block;
+  margin-left: 8px;
+  min-width: 18px;
+  padding: 1px 6px;
+  border-radius: 9px;
+  background-color: #0084ff;
+  color: white;
+  font-size: 11px;
+  text-align: center;
+`;
+
 const ConversationPreview = styled.div`
   font-size: 14px;
   color: #888;
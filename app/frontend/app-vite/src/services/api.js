@@ -72,10 +72,12 @@ export const authAPI = {
 
 // Jobs API calls
 export const jobsAPI = {
-  getJobs: () => api.get('/api/jobs'),
+  getJobs: (params = {}) => api.get('/api/jobs', { params }),
   createJob: (jobData) => api.post('/api/jobs', jobData),
   deleteJob: (jobId) => api.delete(`/api/jobs/${jobId}`),
   updateJob: (jobId, jobData) => api.put(`/api/jobs/${jobId}`, jobData),
+  // action: 'update_status' | 'delete' | 'create_conversations'; target: { ids: [...] } or { filter: {...} }
+  bulkJobs: (action, target, extra = {}) => api.post('/api/jobs/bulk', { action, ...target, ...extra }),
   getJobById: (jobId) => api.get(`/api/jobs/${jobId}`),
   searchJobs: (searchParams) => api.post('/api/search-jobs', searchParams),
   getSearchStatus: (searchId = null) => {
@@ -88,7 +90,8 @@ export const jobsAPI = {
 
 // Conversations API calls
 export const conversationsAPI = {
-  getConversations: () => api.get('/api/conversations'),
+  // Paged with limit and cursor; pass the response's next_cursor back as cursor for the next page
+  getConversations: (params = {}) => api.get('/api/conversations', { params }),
   getConversation: (jobId) => api.get(`/api/jobs/${jobId}/conversation`),
   createConversation: (jobId) => api.post(`/api/jobs/${jobId}/conversation`),
   createMessage: (conversationId, messageData) => 
@@ -96,4 +99,18 @@ export const conversationsAPI = {
   generateMessage: (data) => api.post('/api/generate-message', data),
 };
 
+// Open the server-sent event stream for the logged-in user.
+// handlers maps event names (e.g. 'search.progress') to callbacks taking the parsed payload.
+// EventSource reconnects by itself and resumes from the last event it received.
+export const openEventStream = (handlers) => {
+  const token = localStorage.getItem('token');
+  if (!token) return null;
+  
+  const source = new EventSource(`${api.defaults.baseURL}/api/events?token=${encodeURIComponent(token)}`);
+  Object.entries(handlers).forEach(([eventName, handler]) => {
+    source.addEventListener(eventName, (event) => handler(JSON.parse(event.data)));
+  });
+  return source;
+};
+
 export default api; 
\ No newline at end of file